@@ -126,6 +126,9 @@ class Action(object):
     permissions = ()
     schema = {'type': 'object'}
 
+    # Top level resource keys the action reads, None if unknown.
+    resource_keys = None
+
     def __init__(self, data=None, manager=None, log_dir=None):
         self.data = data or {}
         self.manager = manager
@@ -134,6 +137,10 @@ class Action(object):
     def get_permissions(self):
         return self.permissions
 
+    def get_resource_keys(self):
+        """Return the top level resource keys the action reads, None if unknown."""
+        return utils.declared_resource_keys(self)
+
     def validate(self):
         return self
 
@@ -18,8 +18,12 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 
 from six.moves import cPickle as pickle
 
+import hashlib
+import json
+import mmap
 import os
 import logging
+import tempfile
 import time
 
 log = logging.getLogger('custodian.cache')
@@ -39,6 +43,13 @@ def factory(config):
     return FileCacheManager(config)
 
 
+def file_cache_enabled(config):
+    """Whether config specifies an on disk cache."""
+    return bool(
+        config and getattr(config, 'cache', None) and
+        config.cache != 'memory' and getattr(config, 'cache_period', None))
+
+
 class NullCache(object):
 
     def __init__(self, config):
@@ -73,6 +84,23 @@ class InMemoryCache(object):
 
 
 class FileCacheManager(object):
+    """Sharded file cache, one file per key.
+
+    Each key is stored in its own file within the cache directory, named
+    after a digest of the key (and account). A file holds a small pickled
+    header with the key's expiration time followed by the pickled value,
+    so keys are loaded lazily on first access and a save only rewrites
+    the key being saved.
+
+    Writes go to a temporary file in the cache directory which is then
+    renamed into place, so concurrent processes sharing a cache directory
+    (ie. c7n-org workers) only ever observe complete entries.
+
+    If a maximum size (in megabytes) is configured, the least recently
+    used entries are evicted after a save until the cache fits.
+    """
+
+    suffix = '.cache'
 
     def __init__(self, config):
         self.config = config
@@ -81,40 +109,141 @@ class FileCacheManager(object):
             os.path.expanduser(
                 os.path.expandvars(
                     config.cache)))
+        self.max_size = getattr(config, 'cache_max_size', None)
         self.data = {}
 
+    def get_key_path(self, key):
+        account_id = getattr(self.config, 'account_id', None)
+        digest = hashlib.sha1(json.dumps(
+            [account_id, key], sort_keys=True, default=str).encode('utf8'))
+        return os.path.join(
+            self.cache_path, "%s%s" % (digest.hexdigest(), self.suffix))
+
     def get(self, key):
-        k = pickle.dumps(key)
-        return self.data.get(k)
+        path = self.get_key_path(key)
+        if path in self.data:
+            return self.data[path]
+        data = self.read(key)
+        if data is not None:
+            self.data[path] = data
+        return data
+
+    def read(self, key):
+        """Read a key from disk, without retaining it in memory."""
+        path = self.get_key_path(key)
+        try:
+            with open(path, 'rb') as fh:
+                data = self._read(fh)
+        except (IOError, OSError, ValueError, EOFError, pickle.UnpicklingError):
+            return None
+        if data is None:
+            return None
+        # Track recency for lru eviction
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return data
+
+    def _read(self, fh):
+        buf = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            header = pickle.load(buf)
+            now = time.time()
+            if (header['expires'] < now or
+                    now - header['created'] > self.cache_period * 60):
+                return None
+            return pickle.load(buf)
+        finally:
+            buf.close()
 
     def load(self):
-        if self.data:
-            return True
+        if not self.cache_period:
+            return False
         if os.path.isfile(self.cache_path):
-            if (time.time() - os.stat(self.cache_path).st_mtime >
-                    self.config.cache_period * 60):
+            # Single file cache from older versions
+            log.info("Removing old cache file %s" % self.cache_path)
+            try:
+                os.remove(self.cache_path)
+            except OSError as e:
+                log.warning("Could not remove old cache file %s err: %s" % (
+                    self.cache_path, e))
                 return False
-            with open(self.cache_path, 'rb') as fh:
-                try:
-                    self.data = pickle.load(fh)
-                except EOFError:
+        if not os.path.isdir(self.cache_path):
+            log.info('Generating Cache directory: %s.' % self.cache_path)
+            try:
+                os.makedirs(self.cache_path)
+            except OSError as e:
+                if not os.path.isdir(self.cache_path):
+                    log.warning("Could not create directory: %s err: %s" % (
+                        self.cache_path, e))
                     return False
-            log.debug("Using cache file %s" % self.cache_path)
-            return True
+        log.debug("Using cache directory %s" % self.cache_path)
+        return True
 
-    def save(self, key, data):
+    def save(self, key, data, ttl=None):
+        path = self.write(key, data, ttl)
+        if path is None:
+            return
+        self.data[path] = data
+        if self.max_size:
+            self.evict()
+
+    def write(self, key, data, ttl=None):
+        """Write a key to disk, returning its path or None on failure.
+
+        Unlike save, the value isn't retained in memory and no entries
+        are evicted.
+        """
+        if not self.load():
+            return None
+        path = self.get_key_path(key)
+        if ttl is None:
+            ttl = self.cache_period * 60
+        now = time.time()
+        header = {'created': now, 'expires': now + ttl}
+        tmp_path = None
         try:
-            with open(self.cache_path, 'wb') as fh:
-                self.data[pickle.dumps(key)] = data
-                pickle.dump(self.data, fh, protocol=2)
+            fd, tmp_path = tempfile.mkstemp(
+                dir=self.cache_path, prefix='.tmp-')
+            with os.fdopen(fd, 'wb') as fh:
+                pickle.dump(header, fh, protocol=2)
+                pickle.dump(data, fh, protocol=2)
+            _replace(tmp_path, path)
         except Exception as e:
-            log.warning("Could not save cache %s err: %s" % (
-                self.cache_path, e))
-            if not os.path.exists(self.cache_path):
-                directory = os.path.dirname(self.cache_path)
-                log.info('Generating Cache directory: %s.' % directory)
-                try:
-                    os.makedirs(directory)
-                except Exception as e:
-                    log.warning("Could not create directory: %s err: %s" % (
-                        directory, e))
+            log.warning("Could not save cache %s err: %s" % (path, e))
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None
+        return path
+
+    def evict(self):
+        """Remove least recently used entries until under the size cap."""
+        entries = []
+        for n in os.listdir(self.cache_path):
+            if not n.endswith(self.suffix):
+                continue
+            try:
+                st = os.stat(os.path.join(self.cache_path, n))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, n))
+
+        size = sum([e[1] for e in entries])
+        max_size = self.max_size * 1024 * 1024
+        for mtime, esize, n in sorted(entries):
+            if size <= max_size:
+                break
+            path = os.path.join(self.cache_path, n)
+            log.debug("Evicting cache entry %s" % path)
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            size -= esize
+            self.data.pop(path, None)
+
+
+def _replace(src, dst):
+    # os.replace is py3 only, os.rename is atomic on posix
+    getattr(os, 'replace', os.rename)(src, dst)
@@ -108,6 +108,10 @@ def _default_options(p, blacklist=""):
         p.add_argument(
             "--cache-period", default=15, type=int,
             help="Cache validity in minutes (default %(default)i)")
+        p.add_argument(
+            "--cache-max-size", default=1024, type=int,
+            help="Maximum cache size in megabytes, least recently used "
+                 "entries are evicted (default %(default)i)")
     else:
         p.add_argument("--cache", default=None, help=argparse.SUPPRESS)
 
@@ -335,6 +339,26 @@ def setup_parser():
         "-m", "--metrics-enabled",
         default=False, action="store_true",
         help="Emit metrics to CloudWatch Metrics")
+    run.add_argument(
+        "--stream", default=False, action="store_true",
+        help="Process resources a page at a time to bound memory usage, "
+             "results are not cached or shared across policies")
+    run.add_argument(
+        "--parallel", default=1, type=int, metavar='N',
+        help="Number of policies to execute concurrently (default %(default)i)")
+    run.add_argument(
+        "--parallel-executor", default='thread', choices=['thread', 'process'],
+        help="Execute concurrent policies in threads or processes "
+             "(default %(default)s)")
+    run.add_argument(
+        "--service-concurrency", default=2, type=int,
+        help="Maximum concurrent policies per service and region when "
+             "running in parallel (default %(default)i)")
+    run.add_argument(
+        "--coalesce-tags", default='off', choices=['off', 'on', 'report'],
+        help="Buffer tag, untag and mark-for-op api calls across policies "
+             "and issue them in bulk at the end of the run, or only report "
+             "the calls that would be saved (default %(default)s)")
 
     return parser
 
@@ -14,6 +14,7 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 from collections import Counter, defaultdict
+from concurrent.futures import wait, FIRST_COMPLETED
 from datetime import timedelta, datetime
 from functools import wraps
 import inspect
@@ -27,12 +28,15 @@ import time
 import six
 import yaml
 
+from c7n.executor import executor, policy_context
 from c7n.policy import Policy, PolicyCollection, load as policy_load
 from c7n.reports import report as do_report
 from c7n.utils import Bag, dumps, load_file
 from c7n.manager import resources
 from c7n.resources import load_resources
-from c7n import schema
+from c7n.ratelimit import limiters as rate_limiters
+from c7n.snapshot import ResourceSnapshot
+from c7n import schema, tags
 
 
 log = logging.getLogger('custodian.commands')
@@ -42,7 +46,6 @@ def policy_command(f):
 
     @wraps(f)
     def _load_policies(options):
-        load_resources()
         vars = _load_vars(options)
 
         errors = 0
@@ -142,13 +145,13 @@ def _print_no_policies_warning(options, policies):
 
 
 def validate(options):
-    load_resources()
     if len(options.configs) < 1:
         log.error('no config files specified')
         sys.exit(1)
 
     used_policy_names = set()
-    schm = schema.generate()
+    # Schemas cover just the resource types used by a file, keyed by them.
+    schemas = {}
     errors = []
     for config_file in options.configs:
         config_file = os.path.expanduser(config_file)
@@ -166,7 +169,11 @@ def validate(options):
                 log.error("The config file must end in .json, .yml or .yaml.")
                 raise ValueError("The config file must end in .json, .yml or .yaml.")
 
-        errors += schema.validate(data, schm)
+        resource_types = schema.load_policy_resources(data)
+        key = resource_types and frozenset(resource_types)
+        if key not in schemas:
+            schemas[key] = schema.generate(resource_types)
+        errors += schema.validate(data, schemas[key])
         conf_policy_names = {p['name'] for p in data.get('policies', ())}
         dupes = conf_policy_names.intersection(used_policy_names)
         if len(dupes) >= 1:
@@ -211,20 +218,114 @@ def validate(options):
 @policy_command
 def run(options, policies):
     exit_code = 0
-    for policy in policies:
-        try:
-            policy()
-        except Exception:
-            exit_code = 2
-            if options.debug:
-                raise
-            log.exception(
-                "Error while executing policy %s, continuing" % (
-                    policy.name))
+    with ResourceSnapshot(policies) as snapshot:
+        if getattr(options, 'parallel', 1) > 1:
+            exit_code = _run_parallel(options, policies)
+        else:
+            for policy in policies:
+                try:
+                    policy()
+                except Exception:
+                    exit_code = 2
+                    if options.debug:
+                        raise
+                    log.exception(
+                        "Error while executing policy %s, continuing" % (
+                            policy.name))
+        tags.flush_tag_operations(log)
+        snapshot.report()
+    rate_limiters.report()
     if exit_code != 0:
         sys.exit(exit_code)
 
 
+def _policy_service_key(policy):
+    service = getattr(policy.resource_manager.get_model(), 'service', None)
+    return (service or policy.resource_type, policy.options.region)
+
+
+def _run_policy(policy):
+    t = time.time()
+    with policy_context(policy):
+        policy()
+    return time.time() - t
+
+
+def _run_policy_data(data, options):
+    # Process pool entry point, policies are rebuilt in the worker and
+    # any tag operations they buffered are issued from it.
+    try:
+        return _run_policy(Policy(
+            data, options, session_factory=PolicyCollection.session_factory()))
+    finally:
+        tags.flush_tag_operations(log)
+
+
+def _future_exc_info(f):
+    # The python 2 futures backport keeps the traceback separately.
+    if hasattr(f, 'exception_info'):
+        e, tb = f.exception_info()
+    else:
+        e = f.exception()
+        tb = e.__traceback__
+    return (type(e), e, tb)
+
+
+def _run_parallel(options, policies):
+    """Execute policies concurrently on a thread or process pool.
+
+    At most options.service_concurrency policies run at once against
+    the same service in a region, so the service's api rate budget is
+    shared by a bounded number of policies.
+    """
+    exit_code = 0
+    service_limit = getattr(options, 'service_concurrency', None) or 2
+    executor_name = getattr(options, 'parallel_executor', None) or 'thread'
+    pending = list(policies)
+    running = {}
+    in_flight = Counter()
+    policy_time = 0.0
+    t = time.time()
+
+    with executor(executor_name, max_workers=options.parallel) as w:
+        while pending or running:
+            for p in list(pending):
+                if len(running) >= options.parallel:
+                    break
+                service_key = _policy_service_key(p)
+                if in_flight[service_key] >= service_limit:
+                    continue
+                pending.remove(p)
+                in_flight[service_key] += 1
+                if executor_name == 'process':
+                    f = w.submit(_run_policy_data, p.data, p.options)
+                else:
+                    f = w.submit(_run_policy, p)
+                running[f] = (p, service_key)
+
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for f in done:
+                p, service_key = running.pop(f)
+                in_flight[service_key] -= 1
+                if f.exception() is None:
+                    policy_time += f.result()
+                    continue
+                exit_code = 2
+                if options.debug:
+                    raise f.exception()
+                log.error(
+                    "Error while executing policy %s, continuing" % p.name,
+                    exc_info=_future_exc_info(f))
+
+    wall_time = time.time() - t
+    log.info(
+        "parallel run policies:%d workers:%d wall_time:%0.2f "
+        "policy_time:%0.2f speedup:%0.2fx" % (
+            len(policies), options.parallel, wall_time, policy_time,
+            wall_time and policy_time / wall_time or 0))
+    return exit_code
+
+
 @policy_command
 def report(options, policies):
     if len(policies) == 0:
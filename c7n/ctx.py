@@ -16,6 +16,7 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 import time
 
 from c7n.output import FSOutput, MetricsOutput, CloudWatchLogOutput
+from c7n.ratelimit import limiters as rate_limiters
 from c7n.utils import reset_session_cache
 
 
@@ -28,6 +29,7 @@ class ExecutionContext(object):
         self.session_factory = session_factory
         self.cloudwatch_logs = None
         self.start_time = None
+        self.api_stats = None
 
         metrics_enabled = getattr(options, 'metrics_enabled', None)
         factory = MetricsOutput.select(metrics_enabled)
@@ -55,9 +57,24 @@ class ExecutionContext(object):
         if self.cloudwatch_logs:
             self.cloudwatch_logs.__enter__()
         self.start_time = time.time()
+        self.api_stats = rate_limiters.totals()
         return self
 
     def __exit__(self, exc_type=None, exc_value=None, exc_traceback=None):
+        # Client side rate limiting is shared across concurrent policies,
+        # so these are approximate when running in parallel.
+        if self.api_stats is not None:
+            api_stats = rate_limiters.totals()
+            throttles = api_stats['throttles'] - self.api_stats['throttles']
+            wait_time = api_stats['wait_time'] - self.api_stats['wait_time']
+            if throttles or wait_time:
+                self.metrics.put_metric(
+                    "ApiThrottles", throttles, "Count",
+                    Scope="Policy", buffer=True)
+                self.metrics.put_metric(
+                    "ApiWaitTime", wait_time, "Seconds",
+                    Scope="Policy", buffer=True)
+            self.api_stats = None
         self.metrics.flush()
         # clear policy execution thread local session cache
         reset_session_cache()
@@ -13,13 +13,50 @@
 # limitations under the License.
 from __future__ import absolute_import, division, print_function, unicode_literals
 
-from concurrent.futures import (
-    ProcessPoolExecutor, ThreadPoolExecutor)
+from concurrent import futures
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 
 from c7n.registry import PluginRegistry
 
 import threading
 
+# The policy executing in the current thread, see policy_context.
+_context = threading.local()
+
+
+def get_policy_context():
+    """Return the policy executing in the current thread, if known."""
+    return getattr(_context, 'policy', None)
+
+
+@contextmanager
+def policy_context(policy):
+    """Mark the current thread, and thread pools it submits to, as
+    executing the policy.
+    """
+    previous = get_policy_context()
+    _context.policy = policy
+    try:
+        yield policy
+    finally:
+        _context.policy = previous
+
+
+def _in_policy_context(policy, func):
+    def run(*args, **kw):
+        with policy_context(policy):
+            return func(*args, **kw)
+    return run
+
+
+class ThreadPoolExecutor(futures.ThreadPoolExecutor):
+    """Thread pool whose workers inherit the submitter's policy context."""
+
+    def submit(self, fn, *args, **kw):
+        return super(ThreadPoolExecutor, self).submit(
+            _in_policy_context(get_policy_context(), fn), *args, **kw)
+
 
 class ExecutorRegistry(PluginRegistry):
 
@@ -15,6 +15,9 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 
 from .core import (
     ANNOTATION_KEY,
+    COST_MEMORY,
+    COST_API,
+    COST_RESOURCE_API,
     FilterValidationError,
     OPERATORS,
     FilterRegistry,
@@ -23,7 +26,9 @@ from .core import (
     And,
     ValueFilter,
     AgeFilter,
-    EventFilter)
+    EventFilter,
+    key_roots,
+    plan_filters)
 from .iamaccess import CrossAccountAccessFilter
 from .metrics import MetricsFilter
 from .vpc import DefaultVpcBase
@@ -21,6 +21,7 @@ import fnmatch
 import logging
 import operator
 import re
+import time
 
 from dateutil.tz import tzutc
 from dateutil.parser import parse
@@ -31,7 +32,9 @@ import six
 from c7n.executor import ThreadPoolExecutor
 from c7n.registry import PluginRegistry
 from c7n.resolver import ValuesFrom
-from c7n.utils import set_annotation, type_schema, parse_cidr
+from c7n.utils import (
+    set_annotation, type_schema, parse_cidr, get_tag_index, CidrSet,
+    declared_resource_keys)
 
 
 class FilterValidationError(Exception):
@@ -56,6 +59,17 @@ def regex_match(value, regex):
     return bool(re.match(regex, value, flags=re.IGNORECASE))
 
 
+def compile_regex_match(regex):
+    """Return a regex_match equivalent with the pattern precompiled."""
+    pattern = re.compile(regex, flags=re.IGNORECASE)
+
+    def match(value, _regex=None):
+        if not isinstance(value, six.string_types):
+            return False
+        return bool(pattern.match(value))
+    return match
+
+
 def operator_in(x, y):
     return x in y
 
@@ -68,6 +82,10 @@ def intersect(x, y):
     return bool(set(x).intersection(y))
 
 
+def cidr_overlaps(x, y):
+    return y.overlaps(x)
+
+
 OPERATORS = {
     'eq': operator.eq,
     'equal': operator.eq,
@@ -90,6 +108,103 @@ OPERATORS = {
     'intersect': intersect}
 
 
+# Filter evaluation costs, used to order filters within and blocks.
+#
+# Evaluated in memory against the resource data.
+COST_MEMORY = 1
+# Api calls per resource set.
+COST_API = 10
+# Api calls per resource.
+COST_RESOURCE_API = 100
+
+
+def plan_filters(filters):
+    """Order filters for evaluation within an and block.
+
+    Filters with a lower cost are moved ahead of more expensive ones, as
+    long as they don't read annotations of the filters they move past.
+    Filters without a known cost are never moved and nothing is moved
+    across them, so the plan is equivalent to the written order.
+    """
+    planned = []
+    barrier = 0
+    for f in filters:
+        cost = f.get_cost()
+        if cost is None:
+            planned.append(f)
+            barrier = len(planned)
+            continue
+        i = len(planned)
+        while (i > barrier and planned[i - 1].get_cost() >= cost and
+               not f.depends_on(planned[i - 1])):
+            i -= 1
+        # Keep the written order amongst filters of equal cost.
+        while i < len(planned) and planned[i].get_cost() == cost:
+            i += 1
+        planned.insert(i, f)
+    return planned
+
+
+def describe_plan(filters):
+    return ", ".join([
+        "%s(cost:%s)" % (f.type_name(), f.get_cost()) for f in filters])
+
+
+# Leading identifier of a value filter key expression.
+KEY_ROOT = re.compile(r'[A-Za-z_][A-Za-z0-9_:]*$')
+
+# JMESPath nodes which evaluate their first child against the resource,
+# the rest against its result.
+KEY_LEFT_NODES = (
+    'subexpression', 'index_expression', 'projection', 'filter_projection',
+    'value_projection', 'flatten', 'pipe')
+
+# JMESPath nodes which evaluate all their children against the resource.
+KEY_ALL_NODES = (
+    'or_expression', 'and_expression', 'not_expression', 'comparator',
+    'multi_select_list', 'multi_select_dict', 'key_val_pair',
+    'function_expression')
+
+
+def _ast_roots(node):
+    t = node['type']
+    if t == 'field':
+        if not KEY_ROOT.match(node['value']):
+            return None
+        return set([node['value']])
+    elif t in ('literal', 'expref'):
+        # Expression references evaluate against values of other arguments.
+        return set()
+    elif t in KEY_LEFT_NODES:
+        return _ast_roots(node['children'][0])
+    elif t in KEY_ALL_NODES:
+        roots = set()
+        for c in node['children']:
+            c_roots = _ast_roots(c)
+            if c_roots is None:
+                return None
+            roots.update(c_roots)
+        return roots
+    # The resource itself (@) or unknown expressions.
+    return None
+
+
+def key_roots(key):
+    """Return the top level resource keys read by a value filter key.
+
+    Returns None when they can't be determined statically.
+    """
+    if key.startswith('tag:'):
+        return ('Tags',)
+    try:
+        roots = _ast_roots(jmespath.compile(key).parsed)
+    except jmespath.exceptions.JMESPathError:
+        return None
+    if roots is None:
+        return None
+    return tuple(sorted(roots))
+
+
 class FilterRegistry(PluginRegistry):
 
     def __init__(self, *args, **kw):
@@ -154,6 +269,19 @@ class Filter(object):
     permissions = ()
     schema = {'type': 'object'}
 
+    # Whether the filter evaluates each resource independently, and so
+    # can be applied to batches of resources when streaming.
+    streaming = True
+
+    # Evaluation cost, one of the COST_ constants, None if unknown.
+    cost = None
+
+    # Resource keys the filter adds or fetches onto resources.
+    annotations = ()
+
+    # Top level resource keys the filter reads, None if unknown.
+    resource_keys = None
+
     def __init__(self, data, manager=None):
         self.data = data
         self.manager = manager
@@ -161,6 +289,32 @@ class Filter(object):
     def get_permissions(self):
         return self.permissions
 
+    def get_cost(self):
+        """Return the filter's evaluation cost.
+
+        An in memory cost is only trusted when declared by the filter's
+        own class, subclasses commonly fetch additional resource data.
+        """
+        for klass in type(self).__mro__:
+            if 'cost' not in klass.__dict__:
+                continue
+            if klass.cost == COST_MEMORY and klass is not type(self):
+                return None
+            return klass.cost
+
+    def depends_on(self, other):
+        """Whether this filter reads data added by the other filter."""
+        return False
+
+    def get_resource_keys(self):
+        """Return the top level resource keys the filter reads, None if unknown."""
+        return declared_resource_keys(self)
+
+    def type_name(self):
+        if isinstance(self.data, dict):
+            return self.data.get('type', type(self).__name__)
+        return type(self).__name__
+
     def validate(self):
         """validate filter config, return validation error or self"""
         return self
@@ -170,7 +324,34 @@ class Filter(object):
         return list(filter(self, resources))
 
 
-class Or(Filter):
+class BooleanGroup(Filter):
+    """Common cost and dependency handling for boolean filter blocks."""
+
+    def get_cost(self):
+        costs = [f.get_cost() for f in self.filters]
+        if None in costs:
+            return None
+        return sum(costs)
+
+    def depends_on(self, other):
+        return any([f.depends_on(other) for f in self.filters])
+
+    def get_resource_keys(self):
+        keys = set()
+        for f in self.filters:
+            f_keys = f.get_resource_keys()
+            if f_keys is None:
+                return None
+            keys.update(f_keys)
+        return tuple(sorted(keys))
+
+    def type_name(self):
+        return list(self.data.keys())[0]
+
+
+class Or(BooleanGroup):
+
+    streaming = False
 
     def __init__(self, data, registry, manager):
         super(Or, self).__init__(data)
@@ -191,29 +372,81 @@ class Or(Filter):
         return False
 
     def process_set(self, resources, event):
+        # Cheap branches are evaluated first. Expensive branches skip
+        # resources matched by an earlier branch when the policy doesn't
+        # read their annotations, other branches see the full set so
+        # that the annotations of all matching branches are recorded.
         resource_type = self.manager.get_model()
-        resource_map = {r[resource_type.id]: r for r in resources}
         results = set()
-        for f in self.filters:
-            results = results.union([
-                r[resource_type.id] for r in f.process(resources, event)])
-        return [resource_map[r_id] for r_id in results]
+        for f in plan_filters(self.filters):
+            if self.skip_matched(f):
+                candidates = [
+                    r for r in resources if r[resource_type.id] not in results]
+            else:
+                candidates = resources
+            if not candidates:
+                continue
+            results.update([
+                r[resource_type.id] for r in f.process(candidates, event)])
+        return [r for r in resources if r[resource_type.id] in results]
+
+    def skip_matched(self, f):
+        """Whether a branch can skip resources already matched."""
+        cost = f.get_cost()
+        if cost is None or cost <= COST_MEMORY:
+            return False
+        leaves = filter_leaves(f)
+        annotations = set()
+        for leaf in leaves:
+            annotations.update(leaf.annotations)
+            if isinstance(leaf, ValueFilter) and leaf.annotate:
+                annotations.add(ANNOTATION_KEY)
+        if not annotations:
+            return True
+        policy_filters = getattr(self.manager, 'filters', None)
+        policy_actions = getattr(self.manager, 'actions', None)
+        if policy_filters is None or policy_actions is None:
+            return False
+        for a in policy_actions:
+            keys = a.get_resource_keys()
+            if keys is None or annotations.intersection(keys):
+                return False
+        return not any([
+            g.depends_on(leaf) for g in policy_filters for leaf in leaves])
+
+
+def filter_leaves(f):
+    """Return the filters within a boolean block, or the filter itself."""
+    if not isinstance(f, BooleanGroup):
+        return [f]
+    leaves = []
+    for c in f.filters:
+        leaves.extend(filter_leaves(c))
+    return leaves
 
 
-class And(Filter):
+class And(BooleanGroup):
 
     def __init__(self, data, registry, manager):
         super(And, self).__init__(data)
         self.registry = registry
         self.filters = registry.parse(list(self.data.values())[0], manager)
 
+    @property
+    def streaming(self):
+        return all([f.streaming for f in self.filters])
+
     def process(self, resources, events=None):
-        for f in self.filters:
+        for f in plan_filters(self.filters):
+            if not resources:
+                break
             resources = f.process(resources, events)
         return resources
 
 
-class Not(Filter):
+class Not(BooleanGroup):
+
+    streaming = False
 
     def __init__(self, data, registry, manager):
         super(Not, self).__init__(data)
@@ -278,10 +511,58 @@ class ValueFilter(Filter):
             'op': {'enum': list(OPERATORS.keys())}}}
 
     annotate = True
+    cost = COST_MEMORY
+
+    # Value types that leave the filter's value (sentinel) unmodified,
+    # for these a regex value can be compiled once.
+    sentinel_value_types = (None, 'normalize', 'expr', 'integer', 'size', 'cidr_size')
 
     def __init__(self, data, manager=None):
         super(ValueFilter, self).__init__(data, manager)
         self.expr = {}
+        self._op = None
+        self._now = None
+        self._thresholds = {}
+
+    @property
+    def streaming(self):
+        return self.data.get('value_type') != 'resource_count'
+
+    def get_cost(self):
+        if self.data.get('value_type') == 'resource_count':
+            return None
+        return super(ValueFilter, self).get_cost()
+
+    def depends_on(self, other):
+        keys = list(self.data.keys())
+        if len(self.data) != 1:
+            keys = [self.data.get('key') or '']
+            if self.data.get('value_type') == 'expr':
+                keys.append(six.text_type(self.data.get('value')))
+        for k in keys:
+            if 'c7n' in k or any([a in k for a in other.annotations]):
+                return True
+        return False
+
+    def get_resource_keys(self):
+        # Subclasses commonly apply the key to related resources.
+        if type(self) is not ValueFilter:
+            return super(ValueFilter, self).get_resource_keys()
+        if len(self.data) == 1:
+            keys = list(self.data.keys())
+        elif self.data.get('value_type') == 'resource_count':
+            return ()
+        else:
+            keys = [self.data.get('key') or '']
+            if self.data.get('value_type') == 'expr':
+                keys.append(six.text_type(self.data.get('value')))
+        roots = set()
+        for k in keys:
+            k_roots = key_roots(k)
+            if k_roots is None:
+                return None
+            roots.update(k_roots)
+        return tuple(sorted(roots))
 
     def _validate_resource_count(self):
         """ Specific validation for `resource_count` type
@@ -357,26 +638,38 @@ class ValueFilter(Filter):
         return super(ValueFilter, self).process(resources, event)
 
     def get_resource_value(self, k, i):
+        getter = self.expr.get(k)
+        if getter is None:
+            getter = self.expr[k] = self._compile_getter(k)
+        return getter(i)
+
+    @staticmethod
+    def _compile_getter(k):
+        """Compile a value key into an accessor function."""
         if k.startswith('tag:'):
             tk = k.split(':', 1)[1]
-            r = None
-            for t in i.get("Tags", []):
-                if t.get('Key') == tk:
-                    r = t.get('Value')
-                    break
-        elif k in i:
-            r = i.get(k)
-        elif k not in self.expr:
-            self.expr[k] = jmespath.compile(k)
-            r = self.expr[k].search(i)
-        else:
-            r = self.expr[k].search(i)
-        return r
 
-    def match(self, i):
-        if self.v is None and len(self.data) == 1:
+            def get_tag(i):
+                return get_tag_index(i).tags.get(tk)
+            return get_tag
+
+        # Some keys are present verbatim but aren't valid jmespath
+        # expressions, so compile lazily on first use.
+        compiled = []
+
+        def get_value(i):
+            if k in i:
+                return i.get(k)
+            if not compiled:
+                compiled.append(jmespath.compile(k))
+            return compiled[0].search(i)
+        return get_value
+
+    def _compile(self):
+        """Resolve the filter's key, operator and value once."""
+        if len(self.data) == 1:
             [(self.k, self.v)] = self.data.items()
-        elif self.v is None:
+        else:
             self.k = self.data.get('key')
             self.op = self.data.get('op')
             if 'value_from' in self.data:
@@ -386,13 +679,31 @@ class ValueFilter(Filter):
                 self.v = self.data.get('value')
             self.vtype = self.data.get('value_type')
 
+        self._op = self.op and OPERATORS[self.op] or None
+        if self.vtype == 'cidr' and isinstance(self.v, (list, tuple, set)):
+            # Index the ranges once, membership and overlap against large
+            # value_from lists are then a bisect per resource value.
+            self.v = CidrSet(self.v)
+            if self.op == 'intersect':
+                self._op = cidr_overlaps
+        if (self.op == 'regex' and self.vtype in self.sentinel_value_types and
+                isinstance(self.v, six.string_types)):
+            try:
+                self._op = compile_regex_match(self.v)
+            except re.error:
+                pass
+
+    def match(self, i):
+        if self.v is None:
+            self._compile()
+
         if i is None:
             return False
 
         # value extract
         r = self.get_resource_value(self.k, i)
 
-        if self.op in ('in', 'not-in') and r is None:
+        if r is None and self.op in ('in', 'not-in'):
             r = ()
 
         # value type conversion
@@ -410,10 +721,9 @@ class ValueFilter(Filter):
             return True
         elif v == 'empty' and not r:
             return True
-        elif self.op:
-            op = OPERATORS[self.op]
+        elif self._op:
             try:
-                return op(r, v)
+                return self._op(r, v)
             except TypeError:
                 return False
         elif r == self.v:
@@ -421,6 +731,23 @@ class ValueFilter(Filter):
 
         return False
 
+    def get_now(self):
+        """Current time, reevaluated at most once a second."""
+        t = time.time()
+        if self._now is None or t - self._now[0] > 1:
+            self._now = (t, datetime.now(tz=tzutc()))
+            self._thresholds = {}
+        return self._now[1]
+
+    def get_threshold(self, days, future=False):
+        """Relative date for age and expiration value types."""
+        now = self.get_now()
+        k = (days, future)
+        if k not in self._thresholds:
+            self._thresholds[k] = future and (
+                now + timedelta(days)) or now - timedelta(days)
+        return self._thresholds[k]
+
     def process_value_type(self, sentinel, value, resource):
         if self.vtype == 'normalize' and isinstance(value, six.string_types):
             return sentinel, value.strip().lower()
@@ -442,13 +769,13 @@ class ValueFilter(Filter):
             return value, sentinel
         elif self.vtype == 'age':
             if not isinstance(sentinel, datetime):
-                sentinel = datetime.now(tz=tzutc()) - timedelta(sentinel)
+                sentinel = self.get_threshold(sentinel)
 
             if not isinstance(value, datetime):
                 # EMR bug when testing ages in EMR. This is due to
                 # EMR not having more functionality.
                 try:
-                    value = parse(value, default=datetime.now(tz=tzutc()))
+                    value = parse(value, default=self.get_now())
                 except (AttributeError, TypeError, ValueError):
                     value = 0
 
@@ -457,6 +784,8 @@ class ValueFilter(Filter):
             # comparisons is intuitively wrong.
             return value, sentinel
         elif self.vtype == 'cidr':
+            if isinstance(sentinel, CidrSet):
+                return sentinel, parse_cidr(value)
             s = parse_cidr(sentinel)
             v = parse_cidr(value)
             if (isinstance(s, ipaddress._BaseAddress) and isinstance(v, ipaddress._BaseNetwork)):
@@ -472,11 +801,11 @@ class ValueFilter(Filter):
         # to events in the past which age filtering allows for.
         elif self.vtype == 'expiration':
             if not isinstance(sentinel, datetime):
-                sentinel = datetime.now(tz=tzutc()) + timedelta(sentinel)
+                sentinel = self.get_threshold(sentinel, future=True)
 
             if not isinstance(value, datetime):
                 try:
-                    value = parse(value, default=datetime.now(tz=tzutc()))
+                    value = parse(value, default=self.get_now())
                 except (AttributeError, TypeError, ValueError):
                     value = 0
 
@@ -533,6 +862,8 @@ class EventFilter(ValueFilter):
     """Filter against a cloudwatch event associated to a resource type."""
 
     schema = type_schema('event', rinherit=ValueFilter.schema)
+    cost = COST_MEMORY
+    resource_keys = ()
 
     def validate(self):
         if 'mode' not in self.manager.data:
@@ -16,7 +16,7 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 import itertools
 
 from c7n.utils import local_session, chunks, type_schema
-from .core import Filter
+from .core import Filter, COST_API
 
 
 class HealthEventFilter(Filter):
@@ -37,6 +37,8 @@ class HealthEventFilter(Filter):
 
     permissions = ('health:DescribeEvents', 'health:DescribeAffectedEntities',
                    'health:DescribeEventDetails')
+    cost = COST_API
+    annotations = ('c7n:HealthEvent',)
 
     def process(self, resources, event=None):
         if not resources:
@@ -33,12 +33,15 @@ References
 """
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import copy
 import fnmatch
+import hashlib
 import json
+import re
 
 import six
 
-from c7n.filters import Filter
+from c7n.filters import Filter, COST_RESOURCE_API
 from c7n.resolver import ValuesFrom
 from c7n.utils import type_schema
 
@@ -61,6 +64,11 @@ class CrossAccountAccessFilter(Filter):
 
     policy_attribute = 'Policy'
     annotation_key = 'CrossAccountViolations'
+    cost = COST_RESOURCE_API
+
+    @property
+    def annotations(self):
+        return (self.policy_attribute, self.annotation_key)
 
     def process(self, resources, event=None):
         self.everyone_only = self.data.get('everyone_only', False)
@@ -69,6 +77,8 @@ class CrossAccountAccessFilter(Filter):
             ("aws:sourcevpce", "aws:sourcevpc", "aws:userid", "aws:username")))
         self.actions = self.data.get('actions', ())
         self.accounts = self.get_accounts()
+        self.checker = PolicyChecker(
+            self.accounts, self.everyone_only, self.conditions, self.actions)
         return super(CrossAccountAccessFilter, self).process(resources, event)
 
     def get_accounts(self):
@@ -87,8 +97,7 @@ class CrossAccountAccessFilter(Filter):
         p = self.get_resource_policy(r)
         if p is None:
             return False
-        violations = check_cross_account(
-            p, self.accounts, self.everyone_only, self.conditions, self.actions)
+        violations = self.checker.check(p)
         if violations:
             r[self.annotation_key] = violations
             return True
@@ -102,6 +111,84 @@ def _account(arn):
     return arn.split(':', 5)[4]
 
 
+# Bound on the memoized documents, verdicts and action patterns below.
+cache_size = 4096
+
+# Canonical document digests keyed by policy text.
+_digests = {}
+
+# Violations keyed by (document digest, checker options), shared across
+# resources and policies, as many resources carry identical policies.
+_verdicts = {}
+
+# Statement action globs compiled to a single regex.
+_action_patterns = {}
+
+
+def _bounded(cache):
+    if len(cache) >= cache_size:
+        cache.clear()
+    return cache
+
+
+def policy_digest(policy_text):
+    """Digest of a policy's canonical json form.
+
+    Documents differing only in key order or whitespace share a digest.
+    """
+    is_text = isinstance(policy_text, six.string_types)
+    if is_text and policy_text in _digests:
+        return _digests[policy_text]
+    policy = is_text and json.loads(policy_text) or policy_text
+    digest = hashlib.sha256(json.dumps(
+        policy, sort_keys=True, separators=(',', ':')).encode('utf8')).hexdigest()
+    if is_text:
+        _bounded(_digests)[policy_text] = digest
+    return digest
+
+
+def compile_actions(actions):
+    """Compile statement action globs into a single regex match."""
+    key = tuple(actions)
+    match = _action_patterns.get(key)
+    if match is None:
+        match = _bounded(_action_patterns)[key] = re.compile(
+            '|'.join(['(?:%s)' % fnmatch.translate(a) for a in actions])).match
+    return match
+
+
+class PolicyChecker(object):
+    """Find cross account access grants in resource policies.
+
+    Options are fixed per checker, and verdicts are memoized per canonical
+    policy document and options, so identical documents are evaluated once.
+    """
+
+    def __init__(self, allowed_accounts, everyone_only=False,
+                 conditions=(), check_actions=()):
+        self.allowed_accounts = set(allowed_accounts)
+        self.everyone_only = everyone_only
+        self.conditions = set(conditions or ())
+        self.check_actions = tuple(check_actions or ())
+        self.options = (
+            frozenset(self.allowed_accounts), bool(everyone_only),
+            frozenset(self.conditions), frozenset(self.check_actions))
+
+    def check(self, policy_text):
+        key = (policy_digest(policy_text), self.options)
+        violations = _verdicts.get(key)
+        if violations is None:
+            # Evaluate a copy, evaluation edits statements.
+            if isinstance(policy_text, six.string_types):
+                policy = json.loads(policy_text)
+            else:
+                policy = copy.deepcopy(policy_text)
+            violations = _bounded(_verdicts)[key] = check_cross_account(
+                policy, self.allowed_accounts, self.everyone_only,
+                self.conditions, self.check_actions)
+        return copy.deepcopy(violations)
+
+
 def check_cross_account(policy_text, allowed_accounts, everyone_only,
                         conditions, check_actions):
     """Find cross account access policy grant not explicitly allowed
@@ -122,9 +209,10 @@ def check_cross_account(policy_text, allowed_accounts, everyone_only,
         if check_actions:
             actions = s.get('Action')
             actions = isinstance(actions, six.string_types) and (actions,) or actions
+            match = compile_actions(actions)
             found = False
-            for a in actions:
-                if fnmatch.filter(check_actions, a):
+            for a in check_actions:
+                if match(a):
                     found = True
                     break
             if not found:
@@ -18,10 +18,291 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 
 from concurrent.futures import as_completed
 from datetime import datetime, timedelta
+import calendar
+import json
+import logging
+import os
+import threading
 
-from c7n.filters import Filter, OPERATORS
+from botocore.exceptions import ClientError
+from dateutil.tz import tzutc
+
+from c7n import snapshot
+from c7n.cache import FileCacheManager, file_cache_enabled
+from c7n.filters import Filter, OPERATORS, COST_RESOURCE_API
+from c7n.ratelimit import session_account
 from c7n.utils import local_session, type_schema, chunks
 
+log = logging.getLogger('custodian.filters.metrics')
+
+
+def epoch(dt):
+    return calendar.timegm(dt.utctimetuple())
+
+
+class MetricsCache(FileCacheManager):
+    """On disk cache of metric datapoint series.
+
+    A series is keyed by (account, region, namespace, metric, dimensions,
+    statistic, granularity) and holds the datapoints fetched so far, at
+    the cache granularity, along with the time up to which those points
+    are considered final. Series unused for ``max_age`` days expire,
+    points older than that are dropped on save, and the cache directory
+    is capped at the configured cache size.
+
+    Series aren't retained in memory, and saving a series doesn't evict
+    entries, callers evict once after saving a batch of series.
+    """
+
+    max_age = 31
+
+    def __init__(self, config):
+        super(MetricsCache, self).__init__(config)
+        self.cache_path = os.path.join(self.cache_path, 'metrics')
+        self.cache_period = self.max_age * 24 * 60
+
+    @classmethod
+    def factory(cls, config):
+        if not file_cache_enabled(config):
+            return None
+        return cls(config)
+
+    def get(self, key):
+        return self.read(key)
+
+    def save_series(self, key, series):
+        cutoff = series['complete'] - self.max_age * 86400
+        if series['start'] < cutoff:
+            series['start'] = cutoff
+            series['points'] = {
+                t: v for t, v in series['points'].items() if t >= cutoff}
+        self.write(key, series)
+
+
+class MetricDataFetcher(object):
+    """Batched metric statistics retrieval via GetMetricData.
+
+    Queries are packed into requests of up to ``batch_size`` metrics, and
+    identical queries (account, region, namespace, metric, dimensions,
+    statistic, period and window) are only fetched once. A fetcher is
+    shared by all metrics filters for the duration of a run.
+
+    Datapoints are returned in the GetMetricStatistics shape, ie. a list
+    of dicts with the Timestamp and statistic, most recent first.
+
+    Given a :class:`MetricsCache` store, queries whose period is a
+    multiple of ``granularity`` are instead answered from cached series
+    of ``granularity`` datapoints, fetching only the part of the window
+    not already cached and computing the statistic locally. Averages are
+    computed from cached Sum and SampleCount series. Datapoints within
+    ``settle`` seconds of the end of a fetch are refetched next time, as
+    CloudWatch may still be aggregating them.
+    """
+
+    batch_size = 100
+    granularity = 3600
+    settle = 3600
+
+    def __init__(self, store=None):
+        self.store = store
+        self.results = {}
+        self.lock = threading.Lock()
+        self.stats = {
+            'queries': 0, 'fetched': 0, 'requests': 0, 'cached': 0}
+
+    @staticmethod
+    def query_key(account, region, query):
+        return json.dumps([account, region, query], sort_keys=True)
+
+    def get(self, client, queries, start, end, account=None):
+        """Return datapoints for each query, None for failed queries.
+
+        Each query is a dict of Namespace, MetricName, Dimensions,
+        Statistic and Period.
+        """
+        region = client.meta.region_name
+        keys = [self.query_key(account, region, q) for q in queries]
+        with self.lock:
+            self.stats['queries'] += len(keys)
+            missing = {}
+            for k, q in zip(keys, queries):
+                if k not in self.results:
+                    missing[k] = q
+        cached = {}
+        if self.store is not None:
+            for k, q in list(missing.items()):
+                if q['Period'] % self.granularity == 0:
+                    cached[k] = missing.pop(k)
+        if cached:
+            self.get_cached(client, cached, start, end, account)
+        if missing:
+            results = self.fetch(client, missing, start, end)
+            with self.lock:
+                for k, datapoints in results.items():
+                    stat = missing[k]['Statistic']
+                    self.results[k] = [
+                        {'Timestamp': t, stat: v} for t, v in datapoints]
+        with self.lock:
+            return [self.results.get(k) for k in keys]
+
+    def get_cached(self, client, queries, start, end, account):
+        """Answer queries from cached series, fetching missing tails."""
+        region = client.meta.region_name
+        g = self.granularity
+        start = int(epoch(start) // g * g)
+        end = int(epoch(end) // g * g)
+
+        # Load the series backing each query, grouping those that need
+        # fetching by the start of their missing window.
+        series = {}
+        pending = {}
+        for q in queries.values():
+            for stat in self.series_stats(q['Statistic']):
+                sq = dict(q, Statistic=stat, Period=g)
+                sq.pop('Days', None)
+                sk = self.query_key(account, region, sq)
+                if sk in series:
+                    continue
+                s = self.store.get(sk)
+                if (s is None or s['start'] > start or
+                        s['complete'] < start):
+                    s = {'start': start, 'complete': start, 'points': {}}
+                series[sk] = s
+                if s['complete'] < end:
+                    pending.setdefault(s['complete'], {})[sk] = sq
+
+        with self.lock:
+            self.stats['cached'] += len(series) - sum(map(len, pending.values()))
+
+        for fetch_start, group in pending.items():
+            results = self.fetch(
+                client, group,
+                datetime.utcfromtimestamp(fetch_start),
+                datetime.utcfromtimestamp(end))
+            for sk, datapoints in results.items():
+                s = series[sk]
+                points = {t: v for t, v in s['points'].items()
+                          if t < fetch_start}
+                for t, v in datapoints:
+                    points[epoch(t)] = v
+                s['points'] = points
+                s['complete'] = max(fetch_start, end - self.settle)
+                self.store.save_series(sk, s)
+            for sk in set(group).difference(results):
+                series.pop(sk)
+
+        if pending and self.store.max_size:
+            self.store.evict()
+
+        for k, q in queries.items():
+            stat_series = []
+            for stat in self.series_stats(q['Statistic']):
+                sq = dict(q, Statistic=stat, Period=g)
+                sq.pop('Days', None)
+                stat_series.append(
+                    series.get(self.query_key(account, region, sq)))
+            if None in stat_series:
+                continue
+            datapoints = self.aggregate(
+                q['Statistic'], q['Period'], start, end,
+                [s['points'] for s in stat_series])
+            with self.lock:
+                self.results[k] = datapoints
+
+    @staticmethod
+    def series_stats(stat):
+        if stat == 'Average':
+            return ('Sum', 'SampleCount')
+        return (stat,)
+
+    @staticmethod
+    def aggregate(stat, period, start, end, series):
+        """Compute statistic datapoints of period over [start, end)."""
+        buckets = {}
+        for idx, points in enumerate(series):
+            for t, v in points.items():
+                if t < start or t >= end:
+                    continue
+                b = start + (t - start) // period * period
+                buckets.setdefault(b, ([], []))[idx].append(v)
+
+        datapoints = []
+        for b, values in sorted(buckets.items(), reverse=True):
+            if stat == 'Average':
+                count = sum(values[1])
+                if not count:
+                    continue
+                value = sum(values[0]) / count
+            elif stat in ('Sum', 'SampleCount'):
+                value = sum(values[0])
+            elif stat == 'Maximum':
+                value = max(values[0])
+            else:
+                value = min(values[0])
+            datapoints.append({
+                'Timestamp': datetime.fromtimestamp(b, tzutc()),
+                stat: value})
+        return datapoints
+
+    def fetch(self, client, queries, start, end):
+        """Fetch datapoints for queries keyed by id.
+
+        Returns a mapping of key to (timestamp, value) pairs, keys for
+        failed requests are omitted.
+        """
+        results = {}
+        for batch in chunks(sorted(queries.items()), self.batch_size):
+            ids = {}
+            params = []
+            for idx, (k, q) in enumerate(batch):
+                qid = 'm%d' % idx
+                ids[qid] = k
+                params.append({
+                    'Id': qid,
+                    'MetricStat': {
+                        'Metric': {
+                            'Namespace': q['Namespace'],
+                            'MetricName': q['MetricName'],
+                            'Dimensions': q['Dimensions']},
+                        'Period': q['Period'],
+                        'Stat': q['Statistic']},
+                    'ReturnData': True})
+            try:
+                datapoints = self.fetch_batch(client, params, start, end)
+            except ClientError as e:
+                log.warning("CW Retrieval error: %s", e)
+                continue
+            with self.lock:
+                self.stats['fetched'] += len(ids)
+            for qid, k in ids.items():
+                results[k] = datapoints[qid]
+        return results
+
+    def fetch_batch(self, client, params, start, end):
+        datapoints = {p['Id']: [] for p in params}
+        kw = dict(MetricDataQueries=params, StartTime=start, EndTime=end)
+        while True:
+            response = client.get_metric_data(**kw)
+            with self.lock:
+                self.stats['requests'] += 1
+            for result in response.get('MetricDataResults', ()):
+                datapoints[result['Id']].extend(
+                    zip(result['Timestamps'], result['Values']))
+            if not response.get('NextToken'):
+                break
+            kw['NextToken'] = response['NextToken']
+        return datapoints
+
+
+def get_fetcher(config=None):
+    """Return the run's metric data fetcher, or a new one outside a run."""
+    def factory():
+        return MetricDataFetcher(MetricsCache.factory(config))
+    active = snapshot.active()
+    if active is None:
+        return factory()
+    return active.get_scoped('metrics', factory)
+
 
 class MetricsFilter(Filter):
     """Supports cloud watch metrics filters on resources.
@@ -68,7 +349,9 @@ class MetricsFilter(Filter):
            'percent-attr': {'type': 'string'},
            'required': ('value', 'name')})
 
-    permissions = ("cloudwatch:GetMetricStatistics",)
+    permissions = ("cloudwatch:GetMetricStatistics", "cloudwatch:GetMetricData")
+    cost = COST_RESOURCE_API
+    annotations = ('c7n.metrics',)
 
     MAX_QUERY_POINTS = 50850
     MAX_RESULT_POINTS = 1440
@@ -123,6 +406,11 @@ class MetricsFilter(Filter):
         self.namespace = ns
 
         self.log.debug("Querying metrics for %d", len(resources))
+        client = local_session(
+            self.manager.session_factory).client('cloudwatch')
+        if hasattr(client, 'get_metric_data'):
+            return self.process_batched(client, resources)
+
         matched = []
         with self.executor_factory(max_workers=3) as w:
             futures = []
@@ -142,21 +430,47 @@ class MetricsFilter(Filter):
         return [{'Name': self.model.dimension,
                  'Value': resource[self.model.dimension]}]
 
+    def get_metric_key(self):
+        # Note this annotation cache is policy scoped, not across
+        # policies, still the lack of full qualification on the key
+        # means multiple filters within a policy using the same metric
+        # across different periods or dimensions would be problematic.
+        return "%s.%s.%s" % (self.namespace, self.metric, self.statistics)
+
+    def process_batched(self, client, resources):
+        key = self.get_metric_key()
+        pending = [r for r in resources
+                   if key not in r.get('c7n.metrics', {})]
+        queries = [{
+            'Namespace': self.namespace,
+            'MetricName': self.metric,
+            'Dimensions': self.get_dimensions(r),
+            'Statistic': self.statistics,
+            'Period': self.period,
+            'Days': self.data.get('days', 14)} for r in pending]
+        fetcher = get_fetcher(self.manager.config)
+        results = fetcher.get(
+            client, queries, self.start, self.end,
+            session_account(self.manager.session_factory))
+        for r, datapoints in zip(pending, results):
+            if datapoints is not None:
+                r.setdefault('c7n.metrics', {})[key] = datapoints
+        self.log.debug(
+            "metric data queries:%d fetched:%d requests:%d cached:%d",
+            fetcher.stats['queries'], fetcher.stats['fetched'],
+            fetcher.stats['requests'], fetcher.stats['cached'])
+        return [r for r in resources if self.match_resource(r)]
+
     def process_resource_set(self, resource_set):
         client = local_session(
             self.manager.session_factory).client('cloudwatch')
 
-        matched = []
+        key = self.get_metric_key()
         for r in resource_set:
             # if we overload dimensions with multiple resources we get
             # the statistics/average over those resources.
             dimensions = self.get_dimensions(r)
             collected_metrics = r.setdefault('c7n.metrics', {})
-            # Note this annotation cache is policy scoped, not across
-            # policies, still the lack of full qualification on the key
-            # means multiple filters within a policy using the same metric
-            # across different periods or dimensions would be problematic.
-            key = "%s.%s.%s" % (self.namespace, self.metric, self.statistics)
             if key not in collected_metrics:
                 collected_metrics[key] = client.get_metric_statistics(
                     Namespace=self.namespace,
@@ -166,16 +480,16 @@ class MetricsFilter(Filter):
                     EndTime=self.end,
                     Period=self.period,
                     Dimensions=dimensions)['Datapoints']
-            if len(collected_metrics[key]) == 0:
-                continue
-            if self.data.get('percent-attr'):
-                rvalue = r[self.data.get('percent-attr')]
-                if self.data.get('attr-multiplier'):
-                    rvalue = rvalue * self.data['attr-multiplier']
-                percent = (collected_metrics[key][0][self.statistics] /
-                           rvalue * 100)
-                if self.op(percent, self.value):
-                    matched.append(r)
-            elif self.op(collected_metrics[key][0][self.statistics], self.value):
-                matched.append(r)
-        return matched
+        return [r for r in resource_set if self.match_resource(r)]
+
+    def match_resource(self, r):
+        datapoints = r.get('c7n.metrics', {}).get(self.get_metric_key())
+        if not datapoints:
+            return False
+        if self.data.get('percent-attr'):
+            rvalue = r[self.data.get('percent-attr')]
+            if self.data.get('attr-multiplier'):
+                rvalue = rvalue * self.data['attr-multiplier']
+            percent = (datapoints[0][self.statistics] / rvalue * 100)
+            return self.op(percent, self.value)
+        return self.op(datapoints[0][self.statistics], self.value)
@@ -211,8 +211,8 @@ from os.path import join
 
 from dateutil import zoneinfo
 
-from c7n.filters import Filter, FilterValidationError
-from c7n.utils import type_schema, dumps
+from c7n.filters import Filter, FilterValidationError, COST_MEMORY
+from c7n.utils import type_schema, dumps, get_tag_index
 
 log = logging.getLogger('custodian.offhours')
 
@@ -244,6 +244,11 @@ class Time(Filter):
     DEFAULT_TAG = "maid_offhours"
     DEFAULT_TZ = 'et'
 
+    # Bound on distinct schedules compiled per filter, and on
+    # timezones resolved (shared across filters).
+    compiled_cache_size = 1024
+    tz_cache = {}
+
     TZ_ALIASES = {
         'pdt': 'America/Los_Angeles',
         'pt': 'America/Los_Angeles',
@@ -282,6 +287,8 @@ class Time(Filter):
         self.tag_key = self.data.get('tag', self.DEFAULT_TAG).lower()
         self.default_schedule = self.get_default_schedule()
         self.parser = ScheduleParser(self.default_schedule)
+        self.compiled = {}
+        self.now = None
 
         self.id_key = None
 
@@ -299,7 +306,13 @@ class Time(Filter):
         return self
 
     def process(self, resources, event=None):
-        resources = super(Time, self).process(resources)
+        # Evaluate every resource against the same hour, resolved once
+        # per timezone for the run.
+        self.now = {}
+        try:
+            resources = super(Time, self).process(resources)
+        finally:
+            self.now = None
         if self.parse_errors and self.manager and self.manager.log_dir:
             self.log.warning("parse errors %d", len(self.parse_errors))
             with open(join(
@@ -347,36 +360,76 @@ class Time(Filter):
     def process_resource_schedule(self, i, value, time_type):
         """Does the resource tag schedule and policy match the current time."""
         rid = i[self.id_key]
+        value, hours, tz_name = self.compile_schedule(value, time_type)
+        if hours is None:
+            log.warning(
+                "Invalid schedule on resource:%s value:%s", rid, value)
+            self.parse_errors.append((rid, value))
+            return False
+        tz = self.get_tz(tz_name)
+        if not tz:
+            log.warning(
+                "Could not resolve tz on resource:%s value:%s", rid, value)
+            self.parse_errors.append((rid, value))
+            return False
+        now = self.get_now(tz_name, tz)
+        return bool(hours >> (now.weekday() * 24 + now.hour) & 1)
+
+    def compile_schedule(self, value, time_type):
+        """Compile a tag value to its normalized form, hours and timezone.
+
+        The hours of the week the schedule matches are returned as a bitmap,
+        bit ``weekday * 24 + hour``, or None if the schedule is invalid.
+        Resources share a handful of distinct tag values, so results are
+        memoized per filter.
+        """
+        key = (value, time_type)
+        if key in self.compiled:
+            return self.compiled[key]
+        if len(self.compiled) >= self.compiled_cache_size:
+            self.compiled.clear()
+
         # this is to normalize trailing semicolons which when done allows
         # dateutil.parser.parse to process: value='off=(m-f,1);' properly.
         # before this normalization, some cases would silently fail.
         value = ';'.join(filter(None, value.split(';')))
+        schedule = self.get_schedule(value, time_type)
+        hours = tz_name = None
+        if schedule is not None:
+            hours = 0
+            for item in schedule.get(time_type, ()):
+                for day in item.get('days') or ():
+                    hours |= 1 << (day * 24 + item['hour'])
+            tz_name = schedule['tz']
+        self.compiled[key] = result = (value, hours, tz_name)
+        return result
+
+    def get_schedule(self, value, time_type):
+        """Parse a normalized tag value into a schedule, None if invalid."""
         if self.parser.has_resource_schedule(value, time_type):
-            schedule = self.parser.parse(value)
+            return self.parser.parse(value)
         elif self.parser.keys_are_valid(value):
             # respect timezone from tag
             raw_data = self.parser.raw_data(value)
             if 'tz' in raw_data:
                 schedule = dict(self.default_schedule)
                 schedule['tz'] = raw_data['tz']
-            else:
-                schedule = self.default_schedule
-        else:
-            schedule = None
-        if schedule is None:
-            log.warning(
-                "Invalid schedule on resource:%s value:%s", rid, value)
-            self.parse_errors.append((rid, value))
-            return False
-        tz = self.get_tz(schedule['tz'])
-        if not tz:
-            log.warning(
-                "Could not resolve tz on resource:%s value:%s", rid, value)
-            self.parse_errors.append((rid, value))
-            return False
+                return schedule
+            return self.default_schedule
+        return None
+
+    def get_now(self, tz_name, tz):
+        """The current hour in the given timezone.
+
+        Within process this is resolved once per timezone.
+        """
+        if self.now is not None and tz_name in self.now:
+            return self.now[tz_name]
         now = datetime.datetime.now(tz).replace(
             minute=0, second=0, microsecond=0)
-        return self.match(now, schedule)
+        if self.now is not None:
+            self.now[tz_name] = now
+        return now
 
     def match(self, now, schedule):
         time = schedule.get(self.time_type, ())
@@ -389,11 +442,7 @@ class Time(Filter):
     def get_tag_value(self, i):
         """Get the resource's tag value specifying its schedule."""
         # Look for the tag, Normalize tag key and tag value
-        found = False
-        for t in i.get('Tags', ()):
-            if t['Key'].lower() == self.tag_key:
-                found = t['Value']
-                break
+        found = get_tag_index(i).normalized.get(self.tag_key, False)
         if found is False:
             return False
         # enforce utf8, or do translate tables via unicode ord mapping
@@ -405,7 +454,14 @@ class Time(Filter):
 
     @classmethod
     def get_tz(cls, tz):
-        return zoneinfo.gettz(cls.TZ_ALIASES.get(tz, tz))
+        try:
+            return cls.tz_cache[tz]
+        except KeyError:
+            pass
+        if len(cls.tz_cache) >= cls.compiled_cache_size:
+            cls.tz_cache.clear()
+        result = cls.tz_cache[tz] = zoneinfo.gettz(cls.TZ_ALIASES.get(tz, tz))
+        return result
 
     def get_default_schedule(self):
         raise NotImplementedError("use subclass")
@@ -417,6 +473,7 @@ class OffHour(Time):
         'offhour', rinherit=Time.schema, required=['offhour', 'default_tz'],
         offhour={'type': 'integer', 'minimum': 0, 'maximum': 23})
     time_type = "off"
+    cost = COST_MEMORY
 
     DEFAULT_HR = 19
 
@@ -439,6 +496,7 @@ class OnHour(Time):
         'onhour', rinherit=Time.schema, required=['onhour', 'default_tz'],
         onhour={'type': 'integer', 'minimum': 0, 'maximum': 23})
     time_type = "on"
+    cost = COST_MEMORY
 
     DEFAULT_HR = 7
 
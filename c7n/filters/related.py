@@ -14,12 +14,100 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 import importlib
+import threading
 
 import jmespath
 
+from c7n import snapshot
 from .core import ValueFilter
 
 
+class RelatedResources(object):
+    """Run scoped index of related resources.
+
+    Related resources are indexed by id per (manager class, region,
+    account, source). A related type is enumerated at most once per run,
+    lookups for a few ids prior to that are fetched by id and cached,
+    including ids that don't resolve.
+
+    Indexed resources are shared between all consumers and must not be
+    modified.
+    """
+
+    def __init__(self):
+        self.indexes = {}
+        self.lock = threading.Lock()
+        self.key_locks = {}
+        self.stats = {'lookups': 0, 'gets': 0, 'enumerations': 0}
+
+    @staticmethod
+    def index_key(manager):
+        return (
+            "%s.%s" % (manager.__class__.__module__,
+                       manager.__class__.__name__),
+            manager.config.region,
+            getattr(manager.config, 'account_id', None),
+            manager.source_type)
+
+    def _get_index(self, manager):
+        k = self.index_key(manager)
+        with self.lock:
+            if k not in self.indexes:
+                self.indexes[k] = {'complete': False, 'resources': {}}
+                self.key_locks[k] = threading.Lock()
+            return self.indexes[k], self.key_locks[k]
+
+    def _enumerate(self, manager, index):
+        model = manager.get_model()
+        index['resources'] = {r[model.id]: r for r in manager.resources()}
+        index['complete'] = True
+        self.stats['enumerations'] += 1
+
+    def get(self, manager, ids, threshold):
+        """Return a mapping of id to resource for the ids which exist.
+
+        If fewer than threshold ids are unknown they're fetched by id,
+        else all resources of the type are enumerated.
+        """
+        index, lock = self._get_index(manager)
+        model = manager.get_model()
+        with lock:
+            self.stats['lookups'] += 1
+            resources = index['resources']
+            missing = [i for i in ids if i not in resources]
+            if missing and not index['complete']:
+                if len(missing) < threshold:
+                    self.stats['gets'] += 1
+                    for i in missing:
+                        resources[i] = None
+                    for r in manager.get_resources(missing):
+                        resources[r[model.id]] = r
+                else:
+                    self._enumerate(manager, index)
+                    resources = index['resources']
+            return {i: resources[i] for i in ids if resources.get(i)}
+
+    def resources(self, manager):
+        """Return all resources of the manager's type."""
+        index, lock = self._get_index(manager)
+        with lock:
+            self.stats['lookups'] += 1
+            if not index['complete']:
+                self._enumerate(manager, index)
+            return list(index['resources'].values())
+
+
+def get_related_resources():
+    """Return the run's related resource index, or a new one outside a run."""
+    active = snapshot.active()
+    if active is None:
+        return RelatedResources()
+    return active.get_scoped('related', RelatedResources)
+
+
+_manager_classes = {}
+
+
 class RelatedResourceFilter(ValueFilter):
 
     RelatedResource = None
@@ -49,20 +137,23 @@ class RelatedResourceFilter(ValueFilter):
             "[].%s" % self.RelatedIdsExpression, resources))
 
     def get_related(self, resources):
-        resource_manager = self.get_resource_manager()
-        related_ids = self.get_related_ids(resources)
-        model = resource_manager.get_model()
-        if len(related_ids) < self.FetchThreshold:
-            related = resource_manager.get_resources(list(related_ids))
-        else:
-            related = resource_manager.resources()
-        return {r[model.id]: r for r in related
-                if r[model.id] in related_ids}
+        """Return a mapping of related id to related resource.
+
+        Related resources are shared for the duration of a run and must
+        not be modified.
+        """
+        return get_related_resources().get(
+            self.get_resource_manager(),
+            sorted(filter(None, self.get_related_ids(resources))),
+            self.FetchThreshold)
 
     def get_resource_manager(self):
-        mod_path, class_name = self.RelatedResource.rsplit('.', 1)
-        module = importlib.import_module(mod_path)
-        manager_class = getattr(module, class_name)
+        manager_class = _manager_classes.get(self.RelatedResource)
+        if manager_class is None:
+            mod_path, class_name = self.RelatedResource.rsplit('.', 1)
+            module = importlib.import_module(mod_path)
+            manager_class = _manager_classes[self.RelatedResource] = getattr(
+                module, class_name)
         return manager_class(self.manager.ctx, {})
 
     def process_resource(self, resource, related):
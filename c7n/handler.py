@@ -19,13 +19,14 @@ an event.
 """
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import copy
+import importlib
 import logging
 import os
 import uuid
 import json
 
 from c7n.policy import PolicyCollection
-from c7n.resources import load_resources
 from c7n.utils import format_event, get_account_id_from_sts
 
 
@@ -46,13 +47,8 @@ class Config(dict):
     @classmethod
     def empty(cls, **kw):
         account_id = None
-        if 'AWS_LAMBDA_FUNCTION_NAME' in os.environ:
-            try:
-                import boto3
-                session = boto3.Session()
-                account_id = get_account_id_from_sts(session)
-            except:
-                pass
+        if 'account_id' not in kw:
+            account_id = get_account_id()
 
         d = {}
         d.update({
@@ -79,6 +75,63 @@ class Config(dict):
         return cls(d)
 
 
+# State kept across warm invocations of the lambda function.
+_warm = {}
+
+
+def get_account_id():
+    """The function's account id, looked up once per container."""
+    if 'AWS_LAMBDA_FUNCTION_NAME' not in os.environ:
+        return None
+    if 'account_id' in _warm:
+        return _warm['account_id']
+    try:
+        import boto3
+        session = boto3.Session()
+        account_id = get_account_id_from_sts(session)
+    except:
+        return None
+    _warm['account_id'] = account_id
+    return account_id
+
+
+def load_policy_resources(policy_config):
+    """Import the resource modules the policies need.
+
+    Lambda archives record the modules for their policy's resource
+    type, importing just those avoids loading every resource module
+    on cold start. Other resource types are loaded on first use.
+    """
+    for module in policy_config.get('resource_modules', ()):
+        importlib.import_module(module)
+
+
+def load_policies(policy_text):
+    """Parse the policies, the config is only parsed and its resource
+    modules loaded once while it is unchanged.
+
+    Policies are rebuilt per invocation, filters and actions keep per
+    instance state (ie. the current date) which must not outlive an event.
+    """
+    if _warm.get('policy_text') != policy_text:
+        policy_config = json.loads(policy_text)
+        if policy_config and policy_config.get('policies'):
+            load_policy_resources(policy_config)
+        _warm['policy_text'] = policy_text
+        _warm['policy_config'] = policy_config
+
+    policy_config = _warm['policy_config']
+    if not policy_config or not policy_config.get('policies'):
+        return None
+
+    # TODO. This enshrines an assumption of a single policy per lambda.
+    options_overrides = policy_config[
+        'policies'][0].get('mode', {}).get('execution-options', {})
+    options = Config.empty(**options_overrides)
+
+    return PolicyCollection.from_data(copy.deepcopy(policy_config), options)
+
+
 def dispatch_event(event, context):
 
     error = event.get('detail', {}).get('errorCode')
@@ -92,18 +145,11 @@ def dispatch_event(event, context):
 
     # policies file should always be valid in lambda so do loading naively
     with open('config.json') as f:
-        policy_config = json.load(f)
+        policies = load_policies(f.read())
 
-    if not policy_config or not policy_config.get('policies'):
+    if policies is None:
         return False
 
-    # TODO. This enshrines an assumption of a single policy per lambda.
-    options_overrides = policy_config[
-        'policies'][0].get('mode', {}).get('execution-options', {})
-    options = Config.empty(**options_overrides)
-
-    load_resources()
-    policies = PolicyCollection.from_data(policy_config, options)
     if policies:
         for p in policies:
             p.push(event, context)
@@ -13,15 +13,29 @@
 # limitations under the License.
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import itertools
 import logging
 
 from c7n import cache
 from c7n.executor import ThreadPoolExecutor
+from c7n.filters.core import describe_plan, plan_filters
 from c7n.registry import PluginRegistry
 from c7n.utils import dumps
 
 
-resources = PluginRegistry('resources')
+class ResourceRegistry(PluginRegistry):
+    """Registry of resource types, importing their modules on first use."""
+
+    def get(self, name):
+        klass = super(ResourceRegistry, self).get(name)
+        if klass is None and name:
+            from c7n.resources import load_resources
+            load_resources((name,))
+            klass = super(ResourceRegistry, self).get(name)
+        return klass
+
+
+resources = ResourceRegistry('resources')
 
 
 class ResourceManager(object):
@@ -66,22 +80,49 @@ class ResourceManager(object):
     def resources(self):
         raise NotImplementedError("")
 
+    def iter_resources(self):
+        """Iterate over batches of filtered resources."""
+        yield self.resources()
+
     def get_resource_manager(self, resource_type, data=None):
         klass = resources.get(resource_type)
         if klass is None:
             raise ValueError(resource_type)
         # if we're already querying via config carry it forward
-        if not data and self.source_type == 'config' and getattr(
-                klass.get_model(), 'config_type', None):
-            return klass(self.ctx, {'source': self.config_type})
+        if not data and self.source_type in (
+                'config', 'config-incremental') and getattr(
+                    klass.get_model(), 'config_type', None):
+            return klass(self.ctx, {'source': self.source_type})
         return klass(self.ctx, data or {})
 
+    def get_resource_keys(self):
+        """Return the top level resource keys read by the policy.
+
+        Collected statically from the policy's filters and actions,
+        None if any of them may read arbitrary resource data.
+        """
+        keys = set()
+        for p in itertools.chain(
+                getattr(self, 'filters', ()), getattr(self, 'actions', ())):
+            p_keys = p.get_resource_keys()
+            if p_keys is None:
+                return None
+            keys.update(p_keys)
+        return keys
+
+    def get_filter_plan(self):
+        """Filters in evaluation order, see :func:`c7n.filters.plan_filters`."""
+        plan = plan_filters(self.filters)
+        if plan != self.filters:
+            self.log.debug("filter plan %s", describe_plan(plan))
+        return plan
+
     def filter_resources(self, resources, event=None):
         original = len(resources)
         if event and event.get('debug', False):
             self.log.info(
                 "Filtering resources with %s", self.filters)
-        for f in self.filters:
+        for f in self.get_filter_plan():
             if not resources:
                 break
             rcount = len(resources)
@@ -93,6 +134,51 @@ class ResourceManager(object):
             original, len(resources), self.__class__.__name__.lower()))
         return resources
 
+    def iter_filter_resources(self, batches, event=None):
+        """Filter an iterator of resource batches.
+
+        Filters that evaluate each resource independently are applied to
+        batches as they arrive. At the first set level filter (ie.
+        resource_count, or/not) the remaining batches are materialized
+        and the rest of the filters are applied to the full set.
+        """
+        filters = self.get_filter_plan()
+        stream_filters = list(itertools.takewhile(
+            lambda f: f.streaming, filters))
+        set_filters = filters[len(stream_filters):]
+
+        original = matched = 0
+        results = []
+        for resources in batches:
+            original += len(resources)
+            for f in stream_filters:
+                if not resources:
+                    break
+                resources = f.process(resources, event)
+            if not resources:
+                continue
+            if set_filters:
+                results.extend(resources)
+                continue
+            matched += len(resources)
+            yield resources
+
+        if set_filters:
+            self.log.debug(
+                "Materializing %d %s for filter %s" % (
+                    len(results), self.__class__.__name__.lower(),
+                    set_filters[0]))
+            for f in set_filters:
+                if not results:
+                    break
+                results = f.process(results, event)
+            matched = len(results)
+            if results:
+                yield results
+
+        self.log.debug("Filtered from %d to %d %s" % (
+            original, matched, self.__class__.__name__.lower()))
+
     def get_model(self):
         """Returns the resource meta-model.
         """
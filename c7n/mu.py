@@ -64,13 +64,13 @@ class PythonPackageArchive(object):
 
     """
 
-    def __init__(self, *modules):
+    def __init__(self, *modules, **kw):
         self._temp_archive_file = tempfile.NamedTemporaryFile()
         self._zip_file = zipfile.ZipFile(
             self._temp_archive_file, mode='w',
             compression=zipfile.ZIP_DEFLATED)
         self._closed = False
-        self.add_modules(*modules)
+        self.add_modules(*modules, **kw)
 
     @property
     def path(self):
@@ -82,12 +82,18 @@ class PythonPackageArchive(object):
             raise ValueError("Archive not closed, size not accurate")
         return os.stat(self._temp_archive_file.name).st_size
 
-    def add_modules(self, *modules):
+    def add_modules(self, *modules, **kw):
         """Add the named Python modules to the archive. For consistency's sake
         we only add ``*.py`` files, not ``*.pyc``. We also don't add other
         files, including compiled modules. You'll have to add such files
         manually using :py:meth:`add_file`.
+
+        Archive paths of package files or directories to leave out can be
+        given as ``excludes``, ie. ``excludes=('c7n/cli.py', 'c7n/reports')``.
         """
+        excludes = set(kw.pop('excludes', ()))
+        if kw:
+            raise TypeError("Unknown arguments %s" % ", ".join(kw))
         for module in modules:
             path = imp.find_module(module)[1]
             if os.path.isfile(path):
@@ -97,11 +103,15 @@ class PythonPackageArchive(object):
             elif os.path.isdir(path):
                 for root, dirs, files in os.walk(path):
                     arc_prefix = os.path.relpath(root, os.path.dirname(path))
+                    dirs[:] = [d for d in dirs if os.path.join(
+                        arc_prefix, d) not in excludes]
                     for f in files:
                         if not f.endswith('.py'):
                             continue
                         f_path = os.path.join(root, f)
                         dest_path = os.path.join(arc_prefix, f)
+                        if dest_path in excludes:
+                            continue
                         self.add_file(f_path, dest_path)
 
     def add_file(self, src, dest=None):
@@ -195,9 +205,14 @@ def checksum(fh, hasher, blocksize=65536):
     return hasher.digest()
 
 
-def custodian_archive():
+# Modules only used by the cli, not needed to execute a policy.
+CLI_MODULES = ('c7n/cli.py', 'c7n/commands.py', 'c7n/reports')
+
+
+def custodian_archive(excludes=()):
     """Create a lambda code archive for running custodian."""
-    return PythonPackageArchive('c7n', 'pkg_resources', 'ipaddress')
+    return PythonPackageArchive(
+        'c7n', 'pkg_resources', 'ipaddress', excludes=excludes)
 
 
 class LambdaManager(object):
@@ -628,7 +643,7 @@ class PolicyLambda(AbstractLambdaFunction):
 
     def __init__(self, policy):
         self.policy = policy
-        self.archive = custodian_archive()
+        self.archive = custodian_archive(excludes=CLI_MODULES)
 
     @property
     def name(self):
@@ -690,10 +705,18 @@ class PolicyLambda(AbstractLambdaFunction):
                     self.policy.data['mode'], session_factory))
         return events
 
+    def get_resource_modules(self):
+        """Modules the handler imports to run the policy.
+
+        Other resource types the policy reaches are loaded on demand.
+        """
+        return [self.policy.resource_manager.__class__.__module__]
+
     def get_archive(self):
         self.archive.add_contents(
             'config.json', json.dumps(
-                {'policies': [self.policy.data]}, indent=2))
+                {'policies': [self.policy.data],
+                 'resource_modules': self.get_resource_modules()}, indent=2))
         self.archive.add_contents('custodian_policy.py', PolicyHandlerTemplate)
         self.archive.close()
         return self.archive
@@ -29,6 +29,7 @@ import tempfile
 import os
 
 from boto3.s3.transfer import S3Transfer
+from c7n.executor import get_policy_context
 from c7n.utils import local_session, parse_s3, get_retry
 from c7n.log import CloudWatchLogHandler
 
@@ -108,6 +109,21 @@ class NullMetricsOutput(MetricsOutput):
         return l
 
 
+class PolicyFilter(logging.Filter):
+    """Filter log records to those emitted while executing the policy.
+
+    Includes records from the thread pools of the policy's filters and
+    actions, see :func:`c7n.executor.policy_context`.
+    """
+
+    def __init__(self, policy):
+        super(PolicyFilter, self).__init__()
+        self.policy = policy
+
+    def filter(self, record):
+        return get_policy_context() is self.policy
+
+
 class LogOutput(object):
 
     log_format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
@@ -132,6 +148,10 @@ class LogOutput(object):
         self.handler = self.get_handler()
         self.handler.setLevel(logging.DEBUG)
         self.handler.setFormatter(logging.Formatter(self.log_format))
+        # When policies execute concurrently in threads, only capture
+        # records emitted while executing this policy.
+        if getattr(self.ctx.options, 'parallel', 1) > 1:
+            self.handler.addFilter(PolicyFilter(self.ctx.policy))
         mlog = logging.getLogger('custodian')
         mlog.addHandler(self.handler)
 
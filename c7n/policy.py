@@ -32,7 +32,6 @@ from c7n.ctx import ExecutionContext
 from c7n.credentials import SessionFactory
 from c7n.manager import resources
 from c7n.output import DEFAULT_NAMESPACE
-from c7n.resources import load_resources
 from c7n import mu
 from c7n import utils
 from c7n.logs_support import (
@@ -51,7 +50,6 @@ def load(options, path, format='yaml', validate=True, vars=None):
     if not os.path.exists(path):
         raise IOError("Invalid path for config %r" % path)
 
-    load_resources()
     data = utils.load_file(path, format=format, vars=vars)
 
     if format == 'json':
@@ -294,6 +292,11 @@ class PullMode(PolicyExecutionMode):
                 self.policy.options.region)
             return
 
+        # Bounding the resource count needs the full set before actions.
+        if (getattr(self.policy.options, 'stream', False) and
+                self.policy.max_resources is None):
+            return self.run_stream()
+
         with self.policy.ctx:
             self.policy.log.debug(
                 "Running policy %s resource: %s region:%s c7n:%s",
@@ -348,6 +351,71 @@ class PullMode(PolicyExecutionMode):
                 "ActionTime", time.time() - at, "Seconds", Scope="Policy")
             return resources
 
+    def run_stream(self):
+        """Run the policy over batches of resources.
+
+        Resources are enumerated, filtered and acted upon a batch at a
+        time, with matched resources written to resources.json as they
+        are processed. The resources are not retained, so nothing is
+        returned.
+        """
+        with self.policy.ctx:
+            self.policy.log.debug(
+                "Streaming policy %s resource: %s region:%s c7n:%s",
+                self.policy.name, self.policy.resource_type,
+                self.policy.options.region or 'default',
+                version)
+
+            s = time.time()
+            count = 0
+            action_time = 0
+            action_results = {}
+            path = os.path.join(self.policy.ctx.log_dir, 'resources.json')
+            with open(path, 'w') as fh:
+                fh.write('[')
+                for batch in self.policy.resource_manager.iter_resources():
+                    for r in batch:
+                        fh.write(count and ',\n' or '\n')
+                        fh.write(utils.dumps(r, indent=2))
+                        count += 1
+                    if self.policy.options.dryrun:
+                        continue
+                    at = time.time()
+                    for a in self.policy.resource_manager.actions:
+                        results = a.process(batch)
+                        if results:
+                            action_results.setdefault(a.name, []).append(
+                                results)
+                    action_time += time.time() - at
+                fh.write('\n]')
+            rt = time.time() - s - action_time
+
+            self.policy.log.info(
+                "policy: %s resource:%s region:%s count:%d time:%0.2f" % (
+                    self.policy.name,
+                    self.policy.resource_type,
+                    self.policy.options.region,
+                    count, rt))
+            self.policy.ctx.metrics.put_metric(
+                "ResourceCount", count, "Count", Scope="Policy")
+            self.policy.ctx.metrics.put_metric(
+                "ResourceTime", rt, "Seconds", Scope="Policy")
+
+            if self.policy.options.dryrun:
+                self.policy.log.debug("dryrun: skipping actions")
+                return
+
+            for a in self.policy.resource_manager.actions:
+                self.policy.log.info(
+                    "policy: %s action: %s resources: %d" % (
+                        self.policy.name, a.name, count))
+                if a.name in action_results:
+                    self.policy._write_file(
+                        "action-%s" % a.name,
+                        utils.dumps(action_results[a.name]))
+            self.policy.ctx.metrics.put_metric(
+                "ActionTime", action_time, "Seconds", Scope="Policy")
+
     def get_logs(self, start, end):
         log_source = self.policy.ctx.output
         log_gen = ()
@@ -18,22 +18,43 @@ tags_spec -> s3, elb, rds
 """
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+from datetime import datetime
 import functools
 import itertools
 import jmespath
 import json
+import math
+import os
+import time
 
 import six
+import botocore.session
 from botocore.client import ClientError
-from concurrent.futures import as_completed
 
 from c7n.actions import ActionRegistry
-from c7n.filters import FilterRegistry, MetricsFilter
+from c7n.cache import FileCacheManager, file_cache_enabled
+from c7n.filters import FilterRegistry, MetricsFilter, key_roots
 from c7n.tags import register_ec2_tags, register_universal_tags
 from c7n.utils import (
     local_session, generate_arn, get_retry, chunks, camelResource)
 from c7n.registry import PluginRegistry
 from c7n.manager import ResourceManager
+from c7n import snapshot
+
+
+_paging_configs = {}
+
+
+def get_paging_config(client, enum_op):
+    """Return the botocore pagination config of a client operation."""
+    model = client.meta.service_model
+    key = (model.service_name, model.api_version, enum_op)
+    if key not in _paging_configs:
+        paginators = botocore.session.get_session().get_paginator_model(
+            model.service_name, model.api_version)
+        _paging_configs[key] = paginators.get_paginator(
+            client.meta.method_to_api_mapping[enum_op])
+    return _paging_configs[key]
 
 
 class ResourceQuery(object):
@@ -64,6 +85,60 @@ class ResourceQuery(object):
 
         return data
 
+    def _iter_client_enum(self, client, enum_op, params, path, retry=None):
+        if client.can_paginate(enum_op) and retry:
+            # Page explicitly so each page request can be retried, as a
+            # page iterator can't be resumed once a request has failed.
+            pages = self._iter_pages(client, enum_op, params, retry)
+        elif client.can_paginate(enum_op):
+            pages = client.get_paginator(enum_op).paginate(**params)
+        else:
+            op = getattr(client, enum_op)
+            if retry:
+                op = functools.partial(retry, op)
+            pages = [op(**params)]
+
+        if path:
+            path = jmespath.compile(path)
+
+        for page in pages:
+            if path:
+                page = path.search(page)
+            yield page or []
+
+    @staticmethod
+    def _iter_pages(client, enum_op, params, retry):
+        config = get_paging_config(client, enum_op)
+        input_tokens = config['input_token']
+        output_tokens = config['output_token']
+        if not isinstance(input_tokens, list):
+            input_tokens = [input_tokens]
+            output_tokens = [output_tokens]
+        output_tokens = [jmespath.compile(t) for t in output_tokens]
+        more_results = config.get('more_results')
+        if more_results:
+            more_results = jmespath.compile(more_results)
+
+        op = getattr(client, enum_op)
+        params = dict(params)
+        previous = None
+        while True:
+            page = retry(op, **params)
+            yield page
+            if more_results and not more_results.search(page):
+                return
+            tokens = [t.search(page) for t in output_tokens]
+            # Stop when there are no more tokens, or the service hands
+            # back the tokens of the previous request.
+            if not any(tokens) or tokens == previous:
+                return
+            previous = tokens
+            for name, token in zip(input_tokens, tokens):
+                if token is None:
+                    params.pop(name, None)
+                else:
+                    params[name] = token
+
     def filter(self, resource_type, **params):
         """Query a set of resources."""
         m = self.resolve(resource_type)
@@ -74,6 +149,19 @@ class ResourceQuery(object):
             params.update(extra_args)
         return self._invoke_client_enum(client, enum_op, params, path) or []
 
+    def filter_pages(self, resource_type, retry=None, **params):
+        """Query a set of resources, yielding a page of results at a time.
+
+        Page requests are made via retry, if given.
+        """
+        m = self.resolve(resource_type)
+        client = local_session(self.session_factory).client(
+            m.service)
+        enum_op, path, extra_args = m.enum_spec
+        if extra_args:
+            params.update(extra_args)
+        return self._iter_client_enum(client, enum_op, params, path, retry)
+
     def get(self, resource_type, identities):
         """Get resources by identities
         """
@@ -148,6 +236,106 @@ class ChildResourceQuery(ResourceQuery):
         return results
 
 
+# Server side filters usable to partition describe calls, values are
+# either static or discovered via an api call on the resource's service.
+shard_keys = {
+    'availability-zone': {
+        'op': 'describe_availability_zones',
+        'path': 'AvailabilityZones[].ZoneName'},
+    'encrypted': {'values': ['true', 'false']},
+    'is-public': {'values': ['true', 'false']},
+    'image-type': {'values': ['machine', 'kernel', 'ramdisk']},
+}
+
+
+class ShardedResourceQuery(ResourceQuery):
+    """A resource query that partitions enumeration by server side filters.
+
+    Resource types declare a ``shard_spec`` of filter names from
+    :data:`shard_keys`, the describe call is split into one call per
+    combination of filter values which are fetched concurrently and
+    deduplicated on the resource type's id. Filter names already present
+    in the query are not sharded on.
+    """
+
+    def __init__(self, session_factory, manager):
+        self.session_factory = session_factory
+        self.manager = manager
+
+    def get_shards(self, client, m, params):
+        existing = set([f['Name'] for f in params.get('Filters', ())])
+        shards = [[]]
+        for k in getattr(m, 'shard_spec', None) or ():
+            if k in existing:
+                continue
+            spec = shard_keys[k]
+            values = spec.get('values')
+            if values is None:
+                values = jmespath.search(
+                    spec['path'], getattr(client, spec['op'])())
+            shards = [s + [{'Name': k, 'Values': [v]}]
+                      for s in shards for v in values]
+        return [dict(params, Filters=list(params.get('Filters', [])) + s)
+                for s in shards]
+
+    def _prepare(self, resource_type, params):
+        m = self.resolve(resource_type)
+        client = local_session(self.session_factory).client(m.service)
+        enum_op, path, extra_args = m.enum_spec
+        if extra_args:
+            params.update(extra_args)
+        if m.filter_name and m.filter_name in params:
+            return m, client, enum_op, path, [params]
+        return m, client, enum_op, path, self.get_shards(client, m, params)
+
+    def _dedupe(self, m, resources, seen):
+        results = []
+        for r in resources:
+            if r[m.id] in seen:
+                continue
+            seen.add(r[m.id])
+            results.append(r)
+        return results
+
+    def filter(self, resource_type, **params):
+        """Query a set of resources, fetching shards concurrently."""
+        m, client, enum_op, path, shards = self._prepare(resource_type, params)
+        if len(shards) == 1:
+            return self._invoke_client_enum(
+                client, enum_op, shards[0], path) or []
+
+        def _fetch(shard_params):
+            return self._invoke_client_enum(
+                client, enum_op, shard_params, path) or []
+
+        with self.manager.executor_factory(
+                max_workers=self.manager.enum_concurrency) as w:
+            results = list(w.map(_fetch, shards))
+        return self._dedupe(m, itertools.chain(*results), set())
+
+    def filter_pages(self, resource_type, retry=None, **params):
+        """Query a set of resources a page at a time, shard by shard."""
+        if retry:
+            m, client, enum_op, path, shards = retry(
+                self._prepare, resource_type, params)
+        else:
+            m, client, enum_op, path, shards = self._prepare(
+                resource_type, params)
+        seen = set()
+        for shard_params in shards:
+            for page in self._iter_client_enum(
+                    client, enum_op, shard_params, path, retry):
+                yield self._dedupe(m, page, seen)
+
+    def get_permissions(self, resource_type):
+        m = self.resolve(resource_type)
+        perms = []
+        for k in getattr(m, 'shard_spec', None) or ():
+            if 'op' in shard_keys[k]:
+                perms.append('%s:%s' % (m.service, _napi(shard_keys[k]['op'])))
+        return perms
+
+
 class QueryMeta(type):
 
     def __new__(cls, name, parents, attrs):
@@ -207,6 +395,10 @@ class DescribeSource(object):
             resources = self.query.filter(self.manager.resource_type, **query)
         return resources
 
+    def iter_resources(self, query):
+        return self.query.filter_pages(
+            self.manager.resource_type, retry=self.manager.retry, **query)
+
     def get_permissions(self):
         m = self.manager.get_model()
         perms = ['%s:%s' % (m.service, _napi(m.enum_spec[0]))]
@@ -224,15 +416,46 @@ class DescribeSource(object):
             _augment = _batch_augment
         else:
             return resources
+        # Skip details when resources already have every key the policy uses.
+        projection = self.manager.get_augment_projection(pruned=True)
+        if projection is not None and all([
+                isinstance(r, dict) and projection.issubset(r)
+                for r in resources]):
+            return resources
         _augment = functools.partial(
             _augment, self.manager, model, detail_spec)
-        with self.manager.executor_factory(
-                max_workers=self.manager.max_workers) as w:
-            results = list(w.map(
-                _augment, chunks(resources, self.manager.chunk_size)))
+        max_workers = self.manager.max_workers
+        chunk_size = self.manager.chunk_size
+        if _augment.func is _scalar_augment and self.manager.detail_concurrency:
+            # Scalar detail calls are one per resource, spread them over
+            # all the workers, the shared rate limiter backs off on throttles.
+            max_workers = self.manager.detail_concurrency
+            chunk_size = max(1, min(
+                chunk_size, int(math.ceil(len(resources) / max_workers))))
+        with self.manager.executor_factory(max_workers=max_workers) as w:
+            results = list(w.map(_augment, chunks(resources, chunk_size)))
             return list(itertools.chain(*results))
 
 
+@sources.register('describe-sharded')
+class ShardedDescribeSource(DescribeSource):
+    """Describe source enumerating resources in concurrent shards.
+
+    For resource types without a ``shard_spec`` this is equivalent to
+    the describe source.
+    """
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.query = ShardedResourceQuery(
+            self.manager.session_factory, self.manager)
+
+    def get_permissions(self):
+        perms = super(ShardedDescribeSource, self).get_permissions()
+        perms.extend(self.query.get_permissions(self.manager.resource_type))
+        return perms
+
+
 @sources.register('describe-child')
 class ChildDescribeSource(DescribeSource):
 
@@ -241,6 +464,9 @@ class ChildDescribeSource(DescribeSource):
         self.query = ChildResourceQuery(
             self.manager.session_factory, self.manager)
 
+    def iter_resources(self, query):
+        yield self.resources(query)
+
 
 @sources.register('config')
 class ConfigSource(object):
@@ -248,12 +474,49 @@ class ConfigSource(object):
     def __init__(self, manager):
         self.manager = manager
 
+    # Whether configuration items can be retrieved via batch, sources
+    # needing item attributes not present on batch items disable this.
+    batch_get = True
+    batch_size = 100
+
     def get_permissions(self):
         return ["config:GetResourceConfigHistory",
+                "config:BatchGetResourceConfig",
                 "config:ListDiscoveredResources"]
 
     def get_resources(self, ids, cache=True):
+        return [r for _, r in self.load_resources(ids, raise_errors=True)]
+
+    def get_resource_items(self, ids):
+        """Return (resource id, resource) pairs for ids with config items.
+
+        Items are retrieved in a single batch call where supported, with
+        history lookups for unsupported resource types and unprocessed ids.
+        """
         client = local_session(self.manager.session_factory).client('config')
+        m = self.manager.get_model()
+        if not self.batch_get or not hasattr(
+                client, 'batch_get_resource_config'):
+            return self.get_history_items(client, ids)
+        try:
+            response = client.batch_get_resource_config(resourceKeys=[
+                {'resourceType': m.config_type, 'resourceId': i} for i in ids])
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ValidationException':
+                raise
+            self.manager.log.debug(
+                "config batch retrieval unsupported for %s: %s",
+                m.config_type, e)
+            self.batch_get = False
+            return self.get_history_items(client, ids)
+        items = {i['resourceId']: i for i in response.get(
+            'baseConfigurationItems', ())}
+        results = [(i, self.load_resource(items[i])) for i in ids if i in items]
+        unprocessed = [k['resourceId'] for k in response.get(
+            'unprocessedResourceKeys', ())]
+        return results + self.get_history_items(client, unprocessed)
+
+    def get_history_items(self, client, ids):
         results = []
         m = self.manager.get_model()
         for i in ids:
@@ -263,7 +526,7 @@ class ConfigSource(object):
                 limit=1).get('configurationItems')
             if not revisions:
                 continue
-            results.append(self.load_resource(revisions[0]))
+            results.append((i, self.load_resource(revisions[0])))
         return results
 
     def load_resource(self, item):
@@ -273,37 +536,184 @@ class ConfigSource(object):
             item_config = item['configuration']
         return camelResource(item_config)
 
-    def resources(self, query=None):
-        client = local_session(self.manager.session_factory).client('config')
+    def get_resource_ids(self, client):
         paginator = client.get_paginator('list_discovered_resources')
         pages = paginator.paginate(
             resourceType=self.manager.get_model().config_type)
-        results = []
+        return [
+            r['resourceId'] for r in
+            pages.build_full_result()['resourceIdentifiers']]
+
+    def load_resources(self, resource_ids, raise_errors=False):
+        """Return (resource id, resource) pairs for the given ids.
 
+        Batches of ids are retrieved concurrently. Failed batches are
+        logged and skipped, unless raise_errors is set.
+        """
+        results = []
         with self.manager.executor_factory(max_workers=5) as w:
-            resource_ids = [
-                r['resourceId'] for r in
-                pages.build_full_result()['resourceIdentifiers']]
-            self.manager.log.debug(
-                "querying %d %s resources",
-                len(resource_ids),
-                self.manager.__class__.__name__.lower())
-
-            for resource_set in chunks(resource_ids, 50):
-                futures = []
-                futures.append(w.submit(self.get_resources, resource_set))
-                for f in as_completed(futures):
-                    if f.exception():
-                        self.manager.log.error(
-                            "Exception getting resources from config \n %s" % (
-                                f.exception()))
-                    results.extend(f.result())
+            futures = [
+                w.submit(self.get_resource_items, resource_set)
+                for resource_set in chunks(resource_ids, self.batch_size)]
+            for f in futures:
+                if f.exception():
+                    if raise_errors:
+                        raise f.exception()
+                    self.manager.log.error(
+                        "Exception getting resources from config \n %s" % (
+                            f.exception()))
+                    continue
+                results.extend(f.result())
         return results
 
+    def resources(self, query=None):
+        client = local_session(self.manager.session_factory).client('config')
+        resource_ids = self.get_resource_ids(client)
+        self.manager.log.debug(
+            "querying %d %s resources",
+            len(resource_ids),
+            self.manager.__class__.__name__.lower())
+        return [r for _, r in self.load_resources(resource_ids)]
+
+    def iter_resources(self, query=None):
+        client = local_session(self.manager.session_factory).client('config')
+        paginator = client.get_paginator('list_discovered_resources')
+        pages = paginator.paginate(
+            resourceType=self.manager.get_model().config_type)
+        for page in pages:
+            resource_ids = [
+                r['resourceId'] for r in page['resourceIdentifiers']]
+            for resource_set in chunks(resource_ids, self.batch_size):
+                yield [r for _, r in self.get_resource_items(resource_set)]
+
     def augment(self, resources):
         return resources
 
 
+class InventoryCache(FileCacheManager):
+    """On disk store of config resource inventories.
+
+    Inventories expire after ``max_age`` days, bounding any drift from
+    changes missed by incremental updates with a periodic full refresh.
+    """
+
+    max_age = 7
+
+    def __init__(self, config):
+        super(InventoryCache, self).__init__(config)
+        self.cache_path = os.path.join(self.cache_path, 'inventory')
+        self.cache_period = self.max_age * 24 * 60
+
+    @classmethod
+    def factory(cls, config):
+        if not file_cache_enabled(config):
+            return None
+        return cls(config)
+
+
+@sources.register('config-incremental')
+class IncrementalConfigSource(object):
+    """Config source maintaining a local inventory of the resource type.
+
+    The inventory is stored in the cache directory along with the time
+    it was captured. Later runs list the discovered resource ids, drop
+    resources no longer present, and only fetch configuration items for
+    new resources and those with a configuration item captured since
+    the previous run, as found via a config advanced query.
+
+    Without a file cache, or with an api version lacking advanced
+    queries, the full inventory is fetched each run.
+    """
+
+    # Seconds of overlap with the previous capture, to allow for
+    # configuration item recording delays.
+    overlap = 900
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.source = manager.get_source('config')
+
+    def get_permissions(self):
+        perms = self.source.get_permissions()
+        perms.append('config:SelectResourceConfig')
+        return perms
+
+    def get_resources(self, ids, cache=True):
+        return self.source.get_resources(ids, cache)
+
+    def augment(self, resources):
+        return self.source.augment(resources)
+
+    def iter_resources(self, query=None):
+        yield self.resources(query)
+
+    def get_inventory_key(self):
+        return {'inventory': 'config',
+                'region': self.manager.config.region,
+                'resource': self.manager.get_model().config_type}
+
+    def resources(self, query=None):
+        client = local_session(self.manager.session_factory).client('config')
+        store = InventoryCache.factory(self.manager.config)
+        key = self.get_inventory_key()
+        inventory = store and store.load() and store.get(key) or None
+        captured = time.time() - self.overlap
+
+        resource_ids = self.source.get_resource_ids(client)
+        changed = None
+        if inventory is not None:
+            changed = self.get_changed_ids(client, inventory['captured'])
+        if changed is None:
+            inventory = {'resources': {}}
+            changed = set()
+
+        known = inventory['resources']
+        fetch = [i for i in resource_ids if i not in known or i in changed]
+        self.manager.log.debug(
+            "config inventory resource:%s count:%d fetching:%d",
+            key['resource'], len(resource_ids), len(fetch))
+        fetched = dict(self.source.load_resources(fetch))
+
+        current = {}
+        for i in resource_ids:
+            if i in fetched:
+                current[i] = fetched[i]
+            elif i in known and i not in changed:
+                current[i] = known[i]
+        if store:
+            store.save(key, {'captured': captured, 'resources': current})
+        return [current[i] for i in resource_ids if i in current]
+
+    def get_changed_ids(self, client, since):
+        """Ids of resources with config items captured since the time.
+
+        Returns None if changes can't be determined.
+        """
+        if not hasattr(client, 'select_resource_config'):
+            return None
+        expression = (
+            "SELECT resourceId WHERE resourceType = '%s' "
+            "AND configurationItemCaptureTime > '%s'") % (
+                self.manager.get_model().config_type,
+                datetime.utcfromtimestamp(since).strftime(
+                    '%Y-%m-%dT%H:%M:%S.000Z'))
+        changed = set()
+        params = {'Expression': expression}
+        try:
+            while True:
+                response = client.select_resource_config(**params)
+                for r in response.get('Results', ()):
+                    changed.add(json.loads(r)['resourceId'])
+                if not response.get('NextToken'):
+                    break
+                params['NextToken'] = response['NextToken']
+        except ClientError as e:
+            self.manager.log.warning(
+                "Could not query config changes, full refresh: %s", e)
+            return None
+        return changed
+
+
 @six.add_metaclass(QueryMeta)
 class QueryResourceManager(ResourceManager):
 
@@ -314,6 +724,10 @@ class QueryResourceManager(ResourceManager):
     # TODO Check if we can move to describe source
     max_workers = 3
     chunk_size = 20
+    # Number of concurrent detail calls when augmenting via a detail_spec
+    detail_concurrency = 16
+    # Number of concurrent shards when enumerating via describe-sharded
+    enum_concurrency = 8
 
     permissions = ()
 
@@ -348,10 +762,111 @@ class QueryResourceManager(ResourceManager):
             perms.extend(self.permissions)
         return perms
 
-    def resources(self, query=None):
+    def prepare_query(self, query):
+        """Return the source query to use for the given query.
+
+        Subclasses may extend this with policy level query configuration.
+        """
+        return query
+
+    def get_model_keys(self):
+        """Return the top level keys of the resource's identity and report fields.
+
+        None if any of them can't be determined.
+        """
+        model = self.get_model()
+        fields = [model.id, model.name, getattr(model, 'date', None)]
+        fields.extend(getattr(model, 'default_report_fields', ()))
+        keys = set()
+        for f in filter(None, fields):
+            for prefix in ('list:', 'count:'):
+                if f.startswith(prefix):
+                    f = f[len(prefix):]
+            roots = key_roots(f)
+            if roots is None:
+                return None
+            keys.update(roots)
+        return keys
+
+    def get_projection(self):
+        """Return the top level resource keys the policy uses.
+
+        These are the keys read by the policy's filters and actions, along
+        with the resource's identity and default report fields. None when
+        the policy may use any key, or has neither filters nor actions.
+        """
+        if not (self.data.get('filters') or self.data.get('actions')):
+            return None
+        keys = self.get_resource_keys()
+        model_keys = self.get_model_keys()
+        if keys is None or model_keys is None:
+            return None
+        return keys.union(model_keys)
+
+    def get_augment_projection(self, pruned=False):
+        """Return the resource keys augments need to fetch, None for all.
+
+        Within a run snapshot this is the projection of all the run's
+        policies for the resource type, so they share one enumeration.
+
+        Augments omitting data otherwise present in policy outputs (ie.
+        tags, detail calls) pass pruned, which is None unless the
+        policies enable prune-keys, as report fields and other
+        consumers of the outputs are unknown.
+        """
+        run_snapshot = snapshot.active()
+        if run_snapshot is not None:
+            return run_snapshot.get_projection(self, pruned)
+        if pruned and not self.data.get('prune-keys'):
+            return None
+        return self.get_projection()
+
+    def get_augment_key(self):
+        """Return a key for a partial augment, None if resources are complete.
+
+        Included in cache and run snapshot keys, so partially augmented
+        resources are only shared with policies selecting the same data.
+        """
+        projection = self.get_augment_projection(pruned=True)
+        if projection is None:
+            return None
+        return sorted(projection)
+
+    def prune_resources(self, resources):
+        """Drop top level keys the policy doesn't use, when enabled via prune-keys.
+
+        Custodian annotations are always kept.
+        """
+        if not self.data.get('prune-keys'):
+            return resources
+        keys = self.get_projection()
+        if keys is None:
+            return resources
+        return [{k: v for k, v in r.items() if k in keys or k.startswith('c7n')}
+                for r in resources]
+
+    def get_cache_key(self, query):
         key = {'region': self.config.region,
                'resource': str(self.__class__.__name__),
                'q': query}
+        augment_key = self.get_augment_key()
+        if augment_key is not None:
+            key['augment'] = augment_key
+        return key
+
+    def resources(self, query=None):
+        query = self.prepare_query(query)
+        run_snapshot = snapshot.active()
+        if run_snapshot is not None:
+            resources = run_snapshot.get(
+                run_snapshot.group_key(self, query),
+                functools.partial(self._fetch_resources, query))
+        else:
+            resources = self._fetch_resources(query)
+        return self.filter_resources(self.prune_resources(resources))
+
+    def _fetch_resources(self, query):
+        key = self.get_cache_key(query)
 
         if self._cache.load():
             resources = self._cache.get(key)
@@ -360,19 +875,32 @@ class QueryResourceManager(ResourceManager):
                     "%s.%s" % (self.__class__.__module__,
                                self.__class__.__name__),
                     len(resources)))
-                return self.filter_resources(resources)
+                return resources
 
         if query is None:
             query = {}
 
         resources = self.augment(self.source.resources(query))
         self._cache.save(key, resources)
-        return self.filter_resources(resources)
+        return resources
+
+    def iter_resources(self, query=None):
+        """Iterate over batches of filtered resources.
+
+        Used for streaming execution, resources are enumerated, augmented
+        and filtered a page at a time, bypassing the cache and any run
+        snapshot so the full resource set is never held in memory.
+        """
+        query = self.prepare_query(query)
+        if query is None:
+            query = {}
+        batches = (
+            self.prune_resources(self.augment(page))
+            for page in self.source.iter_resources(query) if page)
+        return self.iter_filter_resources(batches)
 
     def get_resources(self, ids, cache=True):
-        key = {'region': self.config.region,
-               'resource': str(self.__class__.__name__),
-               'q': None}
+        key = self.get_cache_key(None)
         if cache and self._cache.load():
             resources = self._cache.get(key)
             if resources is not None:
@@ -406,13 +934,17 @@ class QueryResourceManager(ResourceManager):
         return self.config.account_id
 
     def get_arns(self, resources):
+        id_key = self.get_model().id
+        generate_arn = None
         arns = []
         for r in resources:
-            _id = r[self.get_model().id]
+            _id = r[id_key]
             if 'arn' in _id[:3]:
                 arns.append(_id)
-            else:
-                arns.append(self.generate_arn(_id))
+                continue
+            if generate_arn is None:
+                generate_arn = self.generate_arn
+            arns.append(generate_arn(_id))
         return arns
 
     @property
@@ -435,7 +967,7 @@ class ChildResourceManager(QueryResourceManager):
     @property
     def source_type(self):
         source = self.data.get('source', 'describe-child')
-        if source == 'describe':
+        if source in ('describe', 'describe-sharded'):
             source = 'describe-child'
         return source
 
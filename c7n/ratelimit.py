@@ -0,0 +1,216 @@
+# Copyright 2017 Capital One Services, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Client side api rate limiting.
+
+All api calls made via clients from :func:`c7n.utils.local_session`
+share a token bucket per (account, region, service). Buckets start
+unlimited, on the first throttle response the bucket's rate is set
+below the observed request rate and from then on adapts AIMD style,
+additive increase on success and multiplicative decrease on throttle.
+Once the rate climbs back to the maximum the bucket is unlimited again.
+
+This complements rather than replaces per call site retries
+(:func:`c7n.utils.get_retry`), throttled calls are still retried but
+the rate of new calls across all threads is reduced.
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from collections import deque
+import logging
+import threading
+import time
+
+log = logging.getLogger('custodian.ratelimit')
+
+THROTTLE_CODES = set((
+    'Throttling',
+    'ThrottlingException',
+    'ThrottledException',
+    'RequestThrottled',
+    'RequestThrottledException',
+    'RequestLimitExceeded',
+    'Client.RequestLimitExceeded',
+    'TooManyRequestsException',
+    'PriorRequestNotComplete',
+    'SlowDown'))
+
+
+class RateLimiter(object):
+    """AIMD token bucket."""
+
+    # Rates are in calls per second.
+    min_rate = 0.5
+    max_rate = 500.0
+    # Rate increase per second of successful calls
+    increase = 1.0
+    # Rate multiplier on throttle
+    decrease = 0.5
+    # Number of recent calls used to estimate the request rate.
+    window = 50
+
+    def __init__(self, key):
+        self.key = key
+        self.rate = None
+        self.tokens = 0.0
+        self.last = time.time()
+        self.recent = deque(maxlen=self.window)
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.throttles = 0
+        self.wait_time = 0.0
+
+    def observed_rate(self):
+        if len(self.recent) < 2:
+            return self.max_rate
+        elapsed = self.recent[-1] - self.recent[0]
+        if not elapsed:
+            return self.max_rate
+        return (len(self.recent) - 1) / elapsed
+
+    def acquire(self):
+        with self.lock:
+            now = time.time()
+            self.calls += 1
+            self.recent.append(now)
+            if self.rate is None:
+                return 0
+            self.tokens = min(
+                self.rate, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            # Reserve a token, waiting for it if the bucket is empty.
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0
+            delay = -self.tokens / self.rate
+            self.wait_time += delay
+        time.sleep(delay)
+        return delay
+
+    def success(self):
+        with self.lock:
+            if self.rate is None:
+                return
+            self.rate += self.increase / self.rate
+            if self.rate >= self.max_rate:
+                log.debug("rate limit removed %s", self.key)
+                self.rate = None
+
+    def throttle(self):
+        with self.lock:
+            self.throttles += 1
+            if self.rate is None:
+                self.rate = self.tokens = self.observed_rate()
+                self.last = time.time()
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self.tokens = min(self.tokens, 0)
+            log.debug("throttled %s rate:%0.2f", self.key, self.rate)
+
+    def get_stats(self):
+        return {
+            'calls': self.calls,
+            'throttles': self.throttles,
+            'wait_time': self.wait_time,
+            'rate': self.rate}
+
+
+class RateLimiters(object):
+    """Registry of rate limiters, shared by every session."""
+
+    def __init__(self):
+        self.limiters = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.limiters:
+                self.limiters[key] = RateLimiter(key)
+            return self.limiters[key]
+
+    def get_stats(self):
+        with self.lock:
+            return {k: l.get_stats() for k, l in self.limiters.items()}
+
+    def totals(self):
+        totals = {'calls': 0, 'throttles': 0, 'wait_time': 0.0}
+        for s in self.get_stats().values():
+            for k in totals:
+                totals[k] += s[k]
+        return totals
+
+    def report(self):
+        for (account, region, service), s in sorted(self.get_stats().items()):
+            if not s['throttles'] and not s['wait_time']:
+                continue
+            log.info(
+                "api service:%s region:%s calls:%d throttles:%d "
+                "wait_time:%0.2f", service, region, s['calls'],
+                s['throttles'], s['wait_time'])
+
+    def attach(self, session, account=None):
+        """Register rate limiting event handlers on a boto3 session.
+
+        Must be called prior to creating clients from the session.
+        """
+        account = account or ''
+        events = getattr(session, 'events', None)
+        if events is None:
+            return session
+
+        def limiter(model, context):
+            return self.get((
+                account, context.get('client_region'),
+                model.service_model.endpoint_prefix))
+
+        def before_call(model, context, **kw):
+            limiter(model, context).acquire()
+
+        def needs_retry(response, operation, request_dict, **kw):
+            if not _is_throttle(response):
+                return
+            context = request_dict.get('context', {})
+            context['c7n_throttled'] = True
+            limiter(operation, context).throttle()
+
+        def after_call(parsed, model, context, **kw):
+            if not _is_throttle((None, parsed)):
+                limiter(model, context).success()
+            elif not context.pop('c7n_throttled', False):
+                # Not seen via retries, ie. retries disabled.
+                limiter(model, context).throttle()
+
+        events.register(
+            'before-call', before_call, unique_id='c7n-ratelimit-before-call')
+        events.register(
+            'needs-retry', needs_retry, unique_id='c7n-ratelimit-needs-retry')
+        events.register(
+            'after-call', after_call, unique_id='c7n-ratelimit-after-call')
+        return session
+
+
+def _is_throttle(response):
+    if not response or not isinstance(response[1], dict):
+        return False
+    return response[1].get('Error', {}).get('Code') in THROTTLE_CODES
+
+
+def session_account(factory):
+    """Best effort account key for a session factory."""
+    role = getattr(factory, 'assume_role', None)
+    if role:
+        parts = role.split(':')
+        return len(parts) > 4 and parts[4] or role
+    return getattr(factory, 'profile', None)
+
+
+limiters = RateLimiters()
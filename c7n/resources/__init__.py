@@ -16,13 +16,30 @@
 #
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import importlib
 import time
 
 
 LOADED = False
 
 
-def load_resources():
+def load_resources(resource_types=None):
+    """Import resource modules, registering their resource types.
+
+    Given resource types, only the modules defining them are imported,
+    using the generated :py:data:`c7n.resources.resource_map.ResourceMap`.
+    Types not in the map, ie. from external plugins, load everything.
+    """
+    if resource_types is not None:
+        from c7n.resources.resource_map import ResourceMap
+        modules = set()
+        for resource_type in resource_types:
+            if resource_type not in ResourceMap:
+                return load_resources()
+            modules.add(ResourceMap[resource_type])
+        for m in sorted(modules):
+            importlib.import_module(m)
+        return
 
     global LOADED
     if LOADED:
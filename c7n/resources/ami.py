@@ -46,15 +46,16 @@ class AMI(QueryResourceManager):
         name = 'Name'
         dimension = None
         date = 'CreationDate'
+        shard_spec = ('is-public', 'image-type')
 
     filter_registry = filters
     action_registry = actions
 
-    def resources(self, query=None):
+    def prepare_query(self, query):
         query = query or {}
         if query.get('Owners') is None:
             query['Owners'] = ['self']
-        return super(AMI, self).resources(query=query)
+        return query
 
 
 @actions.register('deregister')
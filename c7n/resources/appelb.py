@@ -27,7 +27,8 @@ import c7n.filters.vpc as net_filters
 from c7n import tags
 from c7n.manager import resources
 
-from c7n.query import QueryResourceManager, DescribeSource, ConfigSource
+from c7n.query import (
+    QueryResourceManager, DescribeSource, ConfigSource, IncrementalConfigSource)
 from c7n.utils import (
     local_session, chunks, type_schema, get_retry, set_annotation)
 
@@ -70,10 +71,12 @@ class AppELB(QueryResourceManager):
                 "elasticloadbalancing:DescribeTags")
 
     def get_source(self, source_type):
-        if source_type == 'describe':
+        if source_type in ('describe', 'describe-sharded'):
             return DescribeAppElb(self)
         elif source_type == 'config':
             return ConfigAppElb(self)
+        elif source_type == 'config-incremental':
+            return IncrementalConfigSource(self)
         raise ValueError("Unsupported source: %s for %s" % (
             source_type, self.resource_type.config_type))
 
@@ -92,6 +95,9 @@ class DescribeAppElb(DescribeSource):
 
 class ConfigAppElb(ConfigSource):
 
+    # Tags are not present on batch configuration items
+    batch_get = False
+
     def load_resource(self, item):
         resource = super(ConfigAppElb, self).load_resource(item)
         resource['Tags'] = [{u'Key': t['key'], u'Value': t['value']}
@@ -54,11 +54,13 @@ class AWSLambda(QueryResourceManager):
             self.session_factory,
             self.executor_factory,
             self.retry,
-            self.log)))
+            self.log,
+            self.detail_concurrency)))
 
 
 def _lambda_function_tags(
-        model, functions, session_factory, executor_factory, retry, log):
+        model, functions, session_factory, executor_factory, retry, log,
+        max_workers=2):
     """ Augment Lambda function with their respective tags
     """
 
@@ -76,7 +78,7 @@ def _lambda_function_tags(
         function['Tags'] = tag_list
         return function
 
-    with executor_factory(max_workers=2) as w:
+    with executor_factory(max_workers=max_workers) as w:
         return list(w.map(process_tags, functions))
 
 
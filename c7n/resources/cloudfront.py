@@ -35,6 +35,7 @@ class Distribution(QueryResourceManager):
         date = 'LastModifiedTime'
         dimension = "DistributionId"
         universal_taggable = True
+        universal_tag_augment = True
         filter_name = None
 
     augment = universal_augment
@@ -67,6 +68,7 @@ class StreamingDistribution(QueryResourceManager):
         date = 'LastModifiedTime'
         dimension = "DistributionId"
         universal_taggable = True
+        universal_tag_augment = True
         filter_name = None
 
     augment = universal_augment
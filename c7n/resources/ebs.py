@@ -64,6 +64,7 @@ class Snapshot(QueryResourceManager):
         name = 'SnapshotId'
         date = 'StartTime'
         dimension = None
+        shard_spec = ('encrypted',)
 
         default_report_fields = (
             'SnapshotId',
@@ -77,11 +78,11 @@ class Snapshot(QueryResourceManager):
     filter_registry = FilterRegistry('ebs-snapshot.filters')
     action_registry = ActionRegistry('ebs-snapshot.actions')
 
-    def resources(self, query=None):
+    def prepare_query(self, query):
         query = query or {}
         if query.get('OwnerIds') is None:
             query['OwnerIds'] = ['self']
-        return super(Snapshot, self).resources(query=query)
+        return query
 
 
 @Snapshot.filter_registry.register('age')
@@ -385,6 +386,7 @@ class EBS(QueryResourceManager):
         dimension = 'VolumeId'
         metrics_namespace = 'AWS/EBS'
         config_type = "AWS::EC2::Volume"
+        shard_spec = ('availability-zone', 'encrypted')
         default_report_fields = (
             'VolumeId',
             'Attachments[0].InstanceId',
@@ -62,6 +62,7 @@ class EC2(query.QueryResourceManager):
         dimension = 'InstanceId'
         config_type = "AWS::EC2::Instance"
         shape = "Instance"
+        shard_spec = ('availability-zone',)
 
         default_report_fields = (
             'CustodianDate',
@@ -83,12 +84,12 @@ class EC2(query.QueryResourceManager):
         super(EC2, self).__init__(ctx, data)
         self.queries = QueryFilter.parse(self.data.get('query', []))
 
-    def resources(self, query=None):
+    def prepare_query(self, query):
         q = self.resource_query()
         if q is not None:
             query = query or {}
             query['Filters'] = q
-        return super(EC2, self).resources(query=query)
+        return query
 
     def resource_query(self):
         qf = []
@@ -109,8 +110,12 @@ class EC2(query.QueryResourceManager):
     def get_source(self, source_type):
         if source_type == 'describe':
             return DescribeEC2(self)
+        elif source_type == 'describe-sharded':
+            return ShardedDescribeEC2(self)
         elif source_type == 'config':
             return query.ConfigSource(self)
+        elif source_type == 'config-incremental':
+            return query.IncrementalConfigSource(self)
         raise ValueError('invalid source %s' % source_type)
 
 
@@ -168,6 +173,10 @@ class DescribeEC2(query.DescribeSource):
         return resources
 
 
+class ShardedDescribeEC2(DescribeEC2, query.ShardedDescribeSource):
+    """EC2 describe source enumerating instances per availability zone."""
+
+
 @filters.register('security-group')
 class SecurityGroupFilter(net_filters.SecurityGroupFilter):
 
@@ -34,6 +34,7 @@ class ElasticFileSystem(QueryResourceManager):
         type = 'file-system'
         # resource type for resource tagging api
         resource_type = 'elasticfilesystem:file-system'
+        universal_tag_augment = True
         detail_spec = None
         filter_name = 'FileSystemId'
         filter_type = 'scalar'
@@ -35,6 +35,7 @@ class KinesisStream(QueryResourceManager):
         date = None
         dimension = 'StreamName'
         universal_taggable = True
+        universal_tag_augment = True
 
     def augment(self, resources):
         return universal_augment(
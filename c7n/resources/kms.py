@@ -32,13 +32,14 @@ class KeyBase(object):
     permissions = ('kms:ListResourceTags',)
 
     def augment(self, resources):
-        client = local_session(
-            self.session_factory).client('kms')
-        for r in resources:
+
+        def _augment(r):
+            client = local_session(self.session_factory).client('kms')
             key_id = r.get('AliasArn') or r.get('KeyArn')
             info = client.describe_key(KeyId=key_id)['KeyMetadata']
             r.update(info)
 
+            tags = []
             try:
                 tags = client.list_resource_tags(KeyId=key_id)['Tags']
             except ClientError as e:
@@ -51,7 +52,11 @@ class KeyBase(object):
             for t in tags:
                 tag_list.append({'Key': t['TagKey'], 'Value': t['TagValue']})
             r['Tags'] = tag_list
-        return resources
+            return r
+
+        with self.executor_factory(
+                max_workers=self.detail_concurrency) as w:
+            return list(w.map(_augment, resources))
 
 
 @resources.register('kms')
@@ -66,7 +66,8 @@ from c7n.filters.offhours import OffHour, OnHour
 from c7n.filters.health import HealthEventFilter
 import c7n.filters.vpc as net_filters
 from c7n.manager import resources
-from c7n.query import QueryResourceManager, DescribeSource, ConfigSource
+from c7n.query import (
+    QueryResourceManager, DescribeSource, ConfigSource, IncrementalConfigSource)
 from c7n import tags
 from c7n.tags import universal_augment, register_universal_tags
 
@@ -99,6 +100,7 @@ class RDS(QueryResourceManager):
         date = 'InstanceCreateTime'
         dimension = 'DBInstanceIdentifier'
         config_type = 'AWS::RDS::DBInstance'
+        universal_tag_augment = True
 
         default_report_fields = (
             'DBInstanceIdentifier',
@@ -129,10 +131,12 @@ class RDS(QueryResourceManager):
         return self._generate_arn
 
     def get_source(self, source_type):
-        if source_type == 'describe':
+        if source_type in ('describe', 'describe-sharded'):
             return DescribeRDS(self)
         elif source_type == 'config':
             return ConfigRDS(self)
+        elif source_type == 'config-incremental':
+            return IncrementalConfigSource(self)
         raise ValueError("Unsupported source: %s for %s" % (
             source_type, self.resource_type.config_type))
 
@@ -146,6 +150,9 @@ class DescribeRDS(DescribeSource):
 
 class ConfigRDS(ConfigSource):
 
+    # Tags are not present on batch configuration items
+    batch_get = False
+
     def load_resource(self, item):
         resource = super(ConfigRDS, self).load_resource(item)
         resource['Tags'] = [{u'Key': t['key'], u'Value': t['value']}
@@ -887,10 +894,12 @@ class RDSSnapshot(QueryResourceManager):
         return self._generate_arn
 
     def get_source(self, source_type):
-        if source_type == 'describe':
+        if source_type in ('describe', 'describe-sharded'):
             return DescribeRDSSnapshot(self)
         elif source_type == 'config':
             return ConfigRDSSnapshot(self)
+        elif source_type == 'config-incremental':
+            return IncrementalConfigSource(self)
         raise ValueError("Unsupported source: %s for %s" % (
             source_type, self.resource_type.config_type))
 
@@ -910,6 +919,9 @@ class DescribeRDSSnapshot(DescribeSource):
 
 class ConfigRDSSnapshot(ConfigSource):
 
+    # Tags are not present on batch configuration items
+    batch_get = False
+
     def load_resource(self, item):
         resource = super(ConfigRDSSnapshot, self).load_resource(item)
         resource['Tags'] = [{u'Key': t['key'], u'Value': t['value']}
@@ -0,0 +1,128 @@
+# Copyright 2017 Capital One Services, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Generated by tools/dev/genresourcemap.py, do not edit.
+"""Resource type name to defining module, for loading resources lazily."""
+
+ResourceMap = {
+    'account': 'c7n.resources.account',
+    'acm-certificate': 'c7n.resources.acm',
+    'alarm': 'c7n.resources.cw',
+    'ami': 'c7n.resources.ami',
+    'app-elb': 'c7n.resources.appelb',
+    'app-elb-target-group': 'c7n.resources.appelb',
+    'asg': 'c7n.resources.asg',
+    'batch-compute': 'c7n.resources.batch',
+    'batch-definition': 'c7n.resources.batch',
+    'cache-cluster': 'c7n.resources.elasticache',
+    'cache-snapshot': 'c7n.resources.elasticache',
+    'cache-subnet-group': 'c7n.resources.elasticache',
+    'cfn': 'c7n.resources.cfn',
+    'cloud-directory': 'c7n.resources.directory',
+    'cloudsearch': 'c7n.resources.cloudsearch',
+    'cloudtrail': 'c7n.resources.cloudtrail',
+    'codebuild': 'c7n.resources.code',
+    'codecommit': 'c7n.resources.code',
+    'codepipeline': 'c7n.resources.code',
+    'customer-gateway': 'c7n.resources.vpc',
+    'datapipeline': 'c7n.resources.datapipeline',
+    'directconnect': 'c7n.resources.directconnect',
+    'directory': 'c7n.resources.directory',
+    'distribution': 'c7n.resources.cloudfront',
+    'dynamodb-stream': 'c7n.resources.dynamodb',
+    'dynamodb-table': 'c7n.resources.dynamodb',
+    'ebs': 'c7n.resources.ebs',
+    'ebs-snapshot': 'c7n.resources.ebs',
+    'ec2': 'c7n.resources.ec2',
+    'ecr': 'c7n.resources.ecr',
+    'ecs': 'c7n.resources.ecs',
+    'efs': 'c7n.resources.efs',
+    'efs-mount-target': 'c7n.resources.efs',
+    'elasticbeanstalk': 'c7n.resources.elasticbeanstalk',
+    'elasticsearch': 'c7n.resources.elasticsearch',
+    'elb': 'c7n.resources.elb',
+    'emr': 'c7n.resources.emr',
+    'eni': 'c7n.resources.vpc',
+    'event-rule': 'c7n.resources.cw',
+    'firehose': 'c7n.resources.kinesis',
+    'gamelift-build': 'c7n.resources.gamelift',
+    'gamelift-fleet': 'c7n.resources.gamelift',
+    'glacier': 'c7n.resources.glacier',
+    'health-event': 'c7n.resources.health',
+    'healthcheck': 'c7n.resources.route53',
+    'hostedzone': 'c7n.resources.route53',
+    'hsm': 'c7n.resources.hsm',
+    'hsm-client': 'c7n.resources.hsm',
+    'hsm-hapg': 'c7n.resources.hsm',
+    'iam-certificate': 'c7n.resources.iam',
+    'iam-group': 'c7n.resources.iam',
+    'iam-policy': 'c7n.resources.iam',
+    'iam-profile': 'c7n.resources.iam',
+    'iam-role': 'c7n.resources.iam',
+    'iam-user': 'c7n.resources.iam',
+    'identity-pool': 'c7n.resources.cognito',
+    'internet-gateway': 'c7n.resources.vpc',
+    'iot': 'c7n.resources.iot',
+    'key-pair': 'c7n.resources.vpc',
+    'kinesis': 'c7n.resources.kinesis',
+    'kinesis-analytics': 'c7n.resources.kinesis',
+    'kms': 'c7n.resources.kms',
+    'kms-key': 'c7n.resources.kms',
+    'lambda': 'c7n.resources.awslambda',
+    'launch-config': 'c7n.resources.asg',
+    'log-group': 'c7n.resources.cw',
+    'ml-model': 'c7n.resources.ml',
+    'nat-gateway': 'c7n.resources.vpc',
+    'network-acl': 'c7n.resources.vpc',
+    'network-addr': 'c7n.resources.vpc',
+    'opswork-cm': 'c7n.resources.opsworks',
+    'opswork-stack': 'c7n.resources.opsworks',
+    'peering-connection': 'c7n.resources.vpc',
+    'r53domain': 'c7n.resources.route53',
+    'rds': 'c7n.resources.rds',
+    'rds-cluster': 'c7n.resources.rdscluster',
+    'rds-cluster-param-group': 'c7n.resources.rdsparamgroup',
+    'rds-cluster-snapshot': 'c7n.resources.rdscluster',
+    'rds-param-group': 'c7n.resources.rdsparamgroup',
+    'rds-snapshot': 'c7n.resources.rds',
+    'rds-subnet-group': 'c7n.resources.rds',
+    'rds-subscription': 'c7n.resources.rds',
+    'redshift': 'c7n.resources.redshift',
+    'redshift-snapshot': 'c7n.resources.redshift',
+    'redshift-subnet-group': 'c7n.resources.redshift',
+    'rest-api': 'c7n.resources.apigw',
+    'route-table': 'c7n.resources.vpc',
+    'rrset': 'c7n.resources.route53',
+    's3': 'c7n.resources.s3',
+    'security-group': 'c7n.resources.vpc',
+    'shield-attack': 'c7n.resources.shield',
+    'shield-protection': 'c7n.resources.shield',
+    'simpledb': 'c7n.resources.simpledb',
+    'snowball': 'c7n.resources.snowball',
+    'snowball-cluster': 'c7n.resources.snowball',
+    'sns': 'c7n.resources.sns',
+    'sqs': 'c7n.resources.sqs',
+    'step-machine': 'c7n.resources.sfn',
+    'storage-gateway': 'c7n.resources.storagegw',
+    'streaming-distribution': 'c7n.resources.cloudfront',
+    'subnet': 'c7n.resources.vpc',
+    'support-case': 'c7n.resources.support',
+    'user-pool': 'c7n.resources.cognito',
+    'vpc': 'c7n.resources.vpc',
+    'vpc-endpoint': 'c7n.resources.vpc',
+    'vpn-connection': 'c7n.resources.vpc',
+    'vpn-gateway': 'c7n.resources.vpc',
+    'waf': 'c7n.resources.waf',
+    'waf-regional': 'c7n.resources.waf'
+}
@@ -47,6 +47,7 @@ import math
 import os
 import time
 import ssl
+import threading
 
 import six
 
@@ -97,12 +98,37 @@ class S3(query.QueryResourceManager):
     filter_registry = filters
     action_registry = actions
 
+    # Number of concurrent bucket assemblies, api calls are rate limited
+    # per account via each thread's session.
+    detail_concurrency = 20
+
     def __init__(self, ctx, data):
         super(S3, self).__init__(ctx, data)
         self.log_dir = ctx.log_dir
 
+    def get_augment_methods(self):
+        """Return the S3_AUGMENT_TABLE entries the policy reads.
+
+        Bucket sub resources are selected from the policy's projection,
+        see :meth:`get_augment_projection`. Location is always fetched to
+        address regional endpoints.
+        """
+        keys = self.get_augment_projection()
+        if keys is None:
+            return list(S3_AUGMENT_TABLE)
+        return [m for m in S3_AUGMENT_TABLE
+                if m[1] == 'Location' or m[1] in keys]
+
+    def get_augment_key(self):
+        if not isinstance(self.source, DescribeS3):
+            return None
+        methods = self.get_augment_methods()
+        if len(methods) == len(S3_AUGMENT_TABLE):
+            return None
+        return sorted([m[1] for m in methods])
+
     def get_source(self, source_type):
-        if source_type == 'describe':
+        if source_type in ('describe', 'describe-sharded'):
             return DescribeS3(self)
         elif source_type == 'config':
             return ConfigS3(self)
@@ -119,11 +145,14 @@ class S3(query.QueryResourceManager):
 class DescribeS3(query.DescribeSource):
 
     def augment(self, buckets):
+        methods = self.manager.get_augment_methods()
         with self.manager.executor_factory(
-                max_workers=min((10, len(buckets) + 1))) as w:
+                max_workers=min((
+                    self.manager.detail_concurrency, len(buckets) + 1))) as w:
             results = w.map(
                 assemble_bucket,
-                zip(itertools.repeat(self.manager.session_factory), buckets))
+                zip(itertools.repeat(self.manager.session_factory), buckets,
+                    itertools.repeat(methods)))
             results = list(filter(None, results))
             return results
 
@@ -395,17 +424,36 @@ S3_AUGMENT_TABLE = (
 )
 
 
+# Thread local s3 clients by region for the thread's session.
+S3_CLIENTS = threading.local()
+
+
+def region_client(session, region=None):
+    """Return a thread local s3 client for the session and region."""
+    if getattr(S3_CLIENTS, 'session', None) is not session:
+        S3_CLIENTS.session = session
+        S3_CLIENTS.clients = {}
+    client = S3_CLIENTS.clients.get(region)
+    if client is None:
+        client = S3_CLIENTS.clients[region] = session.client(
+            's3', region_name=region)
+    return client
+
+
 def assemble_bucket(item):
-    """Assemble a document representing all the config state around a bucket.
+    """Assemble a document representing the config state around a bucket.
+
+    item is a (session factory, bucket) tuple, optionally followed by
+    the S3_AUGMENT_TABLE entries to fetch, by default all of them.
 
     TODO: Refactor this, the logic here feels quite muddled.
     """
-    factory, b = item
-    s = factory()
-    c = s.client('s3')
+    factory, b = item[:2]
+    s = local_session(factory)
+    c = region_client(s)
     # Bucket Location, Current Client Location, Default Location
     b_location = c_location = location = "us-east-1"
-    methods = list(S3_AUGMENT_TABLE)
+    methods = list(item[2] if len(item) > 2 else S3_AUGMENT_TABLE)
     for m, k, default, select in methods:
         try:
             method = getattr(c, m)
@@ -449,9 +497,9 @@ def assemble_bucket(item):
                 b_location = "eu-west-1"
                 v['LocationConstraint'] = 'eu-west-1'
             if v and v != c_location:
-                c = s.client('s3', region_name=b_location)
+                c = region_client(s, b_location)
             elif c_location != location:
-                c = s.client('s3', region_name=location)
+                c = region_client(s, location)
         b[k] = v
     return b
 
@@ -500,6 +548,8 @@ class S3Metrics(MetricsFilter):
     mismatch, and additional required dimension.
     """
 
+    resource_keys = ()
+
     def get_dimensions(self, resource):
         return [
             {'Name': 'BucketName',
@@ -524,6 +574,7 @@ class S3CrossAccountFilter(CrossAccountAccessFilter):
                   - type: cross-account
     """
     permissions = ('s3:GetBucketPolicy',)
+    resource_keys = ('Policy',)
 
     def get_accounts(self):
         """add in elb access by default
@@ -618,6 +669,7 @@ class GlobalGrantsFilter(Filter):
 
     GLOBAL_ALL = "http://acs.amazonaws.com/groups/global/AllUsers"
     AUTH_ALL = "http://acs.amazonaws.com/groups/global/AuthenticatedUsers"
+    resource_keys = ('Acl', 'Website')
 
     def process(self, buckets, event=None):
         with self.executor_factory(max_workers=5) as w:
@@ -674,6 +726,7 @@ class HasStatementFilter(Filter):
     schema = type_schema(
         'has-statement',
         statement_ids={'type': 'array', 'items': {'type': 'string'}})
+    resource_keys = ('Policy',)
 
     def process(self, buckets, event=None):
         return list(filter(None, map(self.process_bucket, buckets)))
@@ -718,6 +771,7 @@ class EncryptionEnabledFilter(Filter):
     """
     schema = type_schema(
         'no-encryption-statement')
+    resource_keys = ('Policy',)
 
     def get_permissions(self):
         perms = self.manager.get_resource_manager('s3').get_permissions()
@@ -775,6 +829,7 @@ class MissingPolicyStatementFilter(Filter):
         'missing-policy-statement',
         aliases=('missing-statement',),
         statement_ids={'type': 'array', 'items': {'type': 'string'}})
+    resource_keys = ('Policy',)
 
     def __call__(self, b):
         p = b.get('Policy')
@@ -798,6 +853,7 @@ class NoOp(BucketActionBase):
 
     schema = type_schema('no-op')
     permissions = ('s3:ListAllMyBuckets',)
+    resource_keys = ()
 
     def process(self, buckets):
         return None
@@ -825,6 +881,7 @@ class RemovePolicyStatement(RemovePolicyBase):
     """
 
     permissions = ("s3:PutBucketPolicy", "s3:DeleteBucketPolicy")
+    resource_keys = ('Policy',)
 
     def process(self, buckets):
         with self.executor_factory(max_workers=3) as w:
@@ -891,6 +948,7 @@ class ToggleVersioning(BucketActionBase):
         'toggle-versioning',
         enabled={'type': 'boolean'})
     permissions = ("s3:PutBucketVersioning",)
+    resource_keys = ('Versioning',)
 
     # mfa delete enablement looks like it needs the serial and a current token.
     def process(self, resources):
@@ -943,6 +1001,7 @@ class ToggleLogging(BucketActionBase):
         target_bucket={'type': 'string'},
         target_prefix={'type': 'string'})
     permissions = ("s3:PutBucketLogging",)
+    resource_keys = ('Logging',)
 
     def process(self, resources):
         enabled = self.data.get('enabled', True)
@@ -1000,6 +1059,7 @@ class AttachLambdaEncrypt(BucketActionBase):
         # and event sources, hard to disamgibuate punt for now.
         "lambda:*",
     )
+    resource_keys = ('Notification',)
 
     def __init__(self, data=None, manager=None):
         self.data = data or {}
@@ -1099,6 +1159,7 @@ class EncryptionRequiredPolicy(BucketActionBase):
 
     permissions = ("s3:GetBucketPolicy", "s3:PutBucketPolicy")
     schema = type_schema('encryption-policy')
+    resource_keys = ('Policy',)
 
     def __init__(self, data=None, manager=None):
         self.data = data or {}
@@ -1232,6 +1293,7 @@ class ScanBucket(BucketActionBase):
             'key_processor': 'process_version'
         }
     }
+    resource_keys = ('Versioning',)
 
     def __init__(self, data, manager=None):
         super(ScanBucket, self).__init__(data, manager)
@@ -1416,6 +1478,7 @@ class EncryptExtantKeys(ScanBucket):
     metrics = [
         ('Total Keys', {'Scope': 'Account'}),
         ('Unencrypted', {'Scope': 'Account'})]
+    resource_keys = ('Versioning',)
 
     def __init__(self, data, manager=None):
         super(EncryptExtantKeys, self).__init__(data, manager)
@@ -1643,6 +1706,7 @@ class LogTarget(Filter):
             's3', 'elb', 'cloudtrail']}},
         self={'type': 'boolean'},
         value={'type': 'boolean'})
+    resource_keys = ('Logging',)
 
     def get_permissions(self):
         perms = self.manager.get_resource_manager('elb').get_permissions()
@@ -1746,6 +1810,7 @@ class RemoveWebsiteHosting(BucketActionBase):
     schema = type_schema('remove-website-hosting')
 
     permissions = ('s3:DeleteBucketWebsite',)
+    resource_keys = ()
 
     def process(self, buckets):
         session = local_session(self.manager.session_factory)
@@ -1776,6 +1841,7 @@ class DeleteGlobalGrants(BucketActionBase):
         grantees={'type': 'array', 'items': {'type': 'string'}})
 
     permissions = ('s3:PutBucketAcl',)
+    resource_keys = ('Acl', 'Website')
 
     def process(self, buckets):
         with self.executor_factory(max_workers=5) as w:
@@ -1843,6 +1909,8 @@ class BucketTag(Tag):
                     value: us-east-1
     """
 
+    resource_keys = ('Tags',)
+
     def process_resource_set(self, resource_set, tags):
         modify_bucket_tags(self.manager.session_factory, resource_set, tags)
 
@@ -1870,6 +1938,7 @@ class MarkBucketForOp(TagDelayedAction):
 
     schema = type_schema(
         'mark-for-op', rinherit=TagDelayedAction.schema)
+    resource_keys = ('Tags',)
 
     def process_resource_set(self, resource_set, tags):
         modify_bucket_tags(self.manager.session_factory, resource_set, tags)
@@ -1895,6 +1964,7 @@ class RemoveBucketTag(RemoveTag):
 
     schema = type_schema(
         'unmark', aliases=('remove-tag',), tags={'type': 'array'})
+    resource_keys = ('Tags',)
 
     def process_resource_set(self, resource_set, tags):
         modify_bucket_tags(
@@ -1908,6 +1978,7 @@ class DataEvents(Filter):
     permissions = (
         'cloudtrail:DescribeTrails',
         'cloudtrail:GetEventSelectors')
+    resource_keys = ()
 
     def get_event_buckets(self, client, trails):
         """Return a mapping of bucket name to cloudtrail.
@@ -1953,6 +2024,7 @@ class Inventory(ValueFilter):
     schema = type_schema('inventory', rinherit=ValueFilter.schema)
 
     permissions = ('s3:GetInventoryConfiguration',)
+    resource_keys = ()
 
     def process(self, buckets, event=None):
         results = []
@@ -2002,6 +2074,7 @@ class SetInventory(BucketActionBase):
             'IsMultipartUploaded', 'ReplicationStatus']}})
 
     permissions = ('s3:PutInventoryConfiguration', 's3:GetInventoryConfiguration')
+    resource_keys = ()
 
     def process(self, buckets):
         with self.executor_factory(max_workers=2) as w:
@@ -2111,6 +2184,7 @@ class DeleteBucket(ScanBucket):
             'key_processor': 'process_version'
         }
     }
+    resource_keys = ('Replication', 'Versioning')
 
     def process_delete_enablement(self, b):
         """Prep a bucket for deletion.
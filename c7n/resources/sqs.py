@@ -70,7 +70,8 @@ class SQS(QueryResourceManager):
             return queue
 
         self.log.debug('retrieving details for %d queues' % len(resources))
-        with self.executor_factory(max_workers=4) as w:
+        with self.executor_factory(
+                max_workers=self.detail_concurrency) as w:
             return list(filter(None, w.map(_augment, resources)))
 
 
@@ -15,6 +15,8 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 
 import itertools
 import operator
+import os
+import threading
 import zlib
 
 import jmespath
@@ -23,13 +25,13 @@ from c7n.actions import BaseAction, ModifyVpcSecurityGroupsAction
 from c7n.filters import (
     DefaultVpcBase, Filter, FilterValidationError, ValueFilter)
 import c7n.filters.vpc as net_filters
-from c7n.filters.related import RelatedResourceFilter
+from c7n.filters.related import RelatedResourceFilter, get_related_resources
 from c7n.filters.revisions import Diff
 from c7n.filters.locked import Locked
-from c7n import query
+from c7n import query, snapshot
 from c7n.manager import resources
 from c7n.utils import (
-    chunks, local_session, type_schema, get_retry, parse_cidr)
+    chunks, dumps, local_session, type_schema, get_retry, parse_cidr)
 
 
 @resources.register('vpc')
@@ -185,7 +187,8 @@ class SecurityGroupFilter(RelatedResourceFilter):
         vpc_ids = [vpc['VpcId'] for vpc in resources]
         vpc_group_ids = {
             g['GroupId'] for g in
-            self.manager.get_resource_manager('security-group').resources()
+            get_related_resources().resources(
+                self.manager.get_resource_manager('security-group'))
             if g.get('VpcId', '') in vpc_ids
         }
         return vpc_group_ids
@@ -439,6 +442,128 @@ class SecurityGroupPatch(object):
                        IpPermissions=[r for r in delta['added']])
 
 
+class SecurityGroupGraph(object):
+    """Security group reference graph for a region.
+
+    Maps security group ids to the resources referencing them, network
+    interfaces, launch configurations, lambda functions and the rules of
+    other security groups. References from peered vpcs and stale
+    references are looked up on demand, per group and per vpc
+    respectively, and cached.
+    """
+
+    def __init__(self):
+        self.refs = {}
+        self.peered = {}
+        self.stale = {}
+        self.built = False
+        self.lock = threading.Lock()
+
+    def add(self, group_id, kind, resource_id):
+        self.refs.setdefault(group_id, []).append((kind, resource_id))
+
+    def is_used(self, group_id):
+        return group_id in self.refs
+
+    def references(self, group_id):
+        return self.refs.get(group_id, [])
+
+    def get_peered(self, client, group_ids):
+        """Return the subset of group ids referenced from peered vpcs."""
+        with self.lock:
+            missing = [g for g in group_ids if g not in self.peered]
+            for group_set in chunks(missing, 200):
+                peered = dict([(g, []) for g in group_set])
+                for sg_ref in client.describe_security_group_references(
+                        GroupId=group_set)['SecurityGroupReferenceSet']:
+                    peered[sg_ref['GroupId']].append(
+                        ('peering', sg_ref['VpcPeeringConnectionId']))
+                self.peered.update(peered)
+            return set([g for g in group_ids if self.peered[g]])
+
+    def get_stale(self, client, vpc_id):
+        """Return the stale security groups of a vpc."""
+        with self.lock:
+            if vpc_id not in self.stale:
+                self.stale[vpc_id] = client.describe_stale_security_groups(
+                    VpcId=vpc_id).get('StaleSecurityGroupSet', [])
+            return self.stale[vpc_id]
+
+    def export(self):
+        """Return the graph as a json serializable dict."""
+        groups = {}
+        for source in (self.refs, self.peered):
+            for g, refs in source.items():
+                groups.setdefault(g, []).extend(
+                    [{'type': kind, 'id': rid} for kind, rid in refs])
+        return {'groups': groups, 'peering-checked': sorted(self.peered)}
+
+    def build(self, manager):
+        """Add references from resources in the manager's region."""
+        graph = self
+        related = get_related_resources()
+
+        def get_resources(resource_type):
+            return related.resources(manager.get_resource_manager(resource_type))
+
+        for nic in get_resources('eni'):
+            for g in nic['Groups']:
+                graph.add(g['GroupId'], 'eni', nic['NetworkInterfaceId'])
+        for sg in get_resources('security-group'):
+            for perm_type in ('IpPermissions', 'IpPermissionsEgress'):
+                for p in sg.get(perm_type, []):
+                    for g in p.get('UserIdGroupPairs', ()):
+                        graph.add(g['GroupId'], 'security-group', sg['GroupId'])
+        for func in get_resources('lambda'):
+            if 'VpcConfig' not in func:
+                continue
+            for g in func['VpcConfig']['SecurityGroupIds']:
+                graph.add(g, 'lambda', func['FunctionName'])
+        # Note assuming we also have launch config garbage collection
+        # enabled.
+        for cfg in get_resources('launch-config'):
+            for g in itertools.chain(
+                    cfg['SecurityGroups'], cfg['ClassicLinkVPCSecurityGroups']):
+                graph.add(g, 'launch-config', cfg['LaunchConfigurationName'])
+        self.built = True
+        manager.log.debug(
+            "security group graph region:%s groups referenced:%d",
+            manager.config.region, len(self.refs))
+        return self
+
+
+class SecurityGroupGraphs(object):
+    """Run scoped security group graphs per region and account."""
+
+    def __init__(self):
+        self.graphs = {}
+        self.lock = threading.Lock()
+        self.key_locks = {}
+
+    def get(self, manager, build=True):
+        k = (manager.config.region, getattr(manager.config, 'account_id', None))
+        with self.lock:
+            lock = self.key_locks.setdefault(k, threading.Lock())
+            graph = self.graphs.setdefault(k, SecurityGroupGraph())
+        with lock:
+            if build and not graph.built:
+                graph.build(manager)
+        return graph
+
+
+def get_sg_graph(manager, build=True):
+    """Return the run's security group graph for the manager's region.
+
+    Resource references are only scanned if build is set.
+    """
+    active = snapshot.active()
+    if active is None:
+        graph = SecurityGroupGraph()
+        return build and graph.build(manager) or graph
+    return active.get_scoped('sg-graph', SecurityGroupGraphs).get(
+        manager, build)
+
+
 class SGUsage(Filter):
 
     def get_permissions(self):
@@ -447,73 +572,39 @@ class SGUsage(Filter):
              for m in
              ['lambda', 'eni', 'launch-config', 'security-group']]))
 
-    def filter_peered_refs(self, resources):
+    def get_graph(self):
+        return get_sg_graph(self.manager)
+
+    def export_graph(self, graph):
+        """Write the graph to the policy output for offline analysis."""
+        log_dir = self.manager.ctx.log_dir
+        if not log_dir:
+            return
+        with open(os.path.join(log_dir, 'sg-graph.json'), 'w') as fh:
+            fh.write(dumps(graph.export(), indent=2))
+
+    def filter_peered_refs(self, resources, graph=None):
         if not resources:
             return resources
+        graph = graph or self.get_graph()
         # Check that groups are not referenced across accounts
         client = local_session(self.manager.session_factory).client('ec2')
-        peered_ids = set()
-        for resource_set in chunks(resources, 200):
-            for sg_ref in client.describe_security_group_references(
-                    GroupId=[r['GroupId'] for r in resource_set]
-            )['SecurityGroupReferenceSet']:
-                peered_ids.add(sg_ref['GroupId'])
+        peered_ids = graph.get_peered(client, [r['GroupId'] for r in resources])
         self.log.debug(
             "%d of %d groups w/ peered refs", len(peered_ids), len(resources))
         return [r for r in resources if r['GroupId'] not in peered_ids]
 
     def scan_groups(self):
-        used = set()
-        for kind, scanner in (
-                ("nics", self.get_eni_sgs),
-                ("sg-perm-refs", self.get_sg_refs),
-                ('lambdas', self.get_lambda_sgs),
-                ("launch-configs", self.get_launch_config_sgs),
-        ):
-            sg_ids = scanner()
-            new_refs = sg_ids.difference(used)
-            used = used.union(sg_ids)
-            self.log.debug(
-                "%s using %d sgs, new refs %s total %s",
-                kind, len(sg_ids), len(new_refs), len(used))
-
-        return used
-
-    def get_launch_config_sgs(self):
-        # Note assuming we also have launch config garbage collection
-        # enabled.
-        sg_ids = set()
-        for cfg in self.manager.get_resource_manager('launch-config').resources():
-            for g in cfg['SecurityGroups']:
-                sg_ids.add(g)
-            for g in cfg['ClassicLinkVPCSecurityGroups']:
-                sg_ids.add(g)
-        return sg_ids
-
-    def get_lambda_sgs(self):
-        sg_ids = set()
-        for func in self.manager.get_resource_manager('lambda').resources():
-            if 'VpcConfig' not in func:
-                continue
-            for g in func['VpcConfig']['SecurityGroupIds']:
-                sg_ids.add(g)
-        return sg_ids
-
-    def get_eni_sgs(self):
-        sg_ids = set()
-        for nic in self.manager.get_resource_manager('eni').resources():
-            for g in nic['Groups']:
-                sg_ids.add(g['GroupId'])
-        return sg_ids
+        return set(self.get_graph().refs)
 
-    def get_sg_refs(self):
-        sg_ids = set()
-        for sg in self.manager.get_resource_manager('security-group').resources():
-            for perm_type in ('IpPermissions', 'IpPermissionsEgress'):
-                for p in sg.get(perm_type, []):
-                    for g in p.get('UserIdGroupPairs', ()):
-                        sg_ids.add(g['GroupId'])
-        return sg_ids
+    def get_unused(self, resources):
+        graph = self.get_graph()
+        unused = [
+            r for r in resources
+            if not graph.is_used(r['GroupId']) and 'VpcId' in r]
+        unused = unused and self.filter_peered_refs(unused, graph) or []
+        self.export_graph(graph)
+        return unused
 
 
 @SecurityGroup.filter_registry.register('unused')
@@ -542,11 +633,7 @@ class UnusedSecurityGroup(SGUsage):
     schema = type_schema('unused')
 
     def process(self, resources, event=None):
-        used = self.scan_groups()
-        unused = [
-            r for r in resources
-            if r['GroupId'] not in used and 'VpcId' in r]
-        return unused and self.filter_peered_refs(unused) or []
+        return self.get_unused(resources)
 
 
 @SecurityGroup.filter_registry.register('used')
@@ -569,11 +656,7 @@ class UsedSecurityGroup(SGUsage):
     schema = type_schema('used')
 
     def process(self, resources, event=None):
-        used = self.scan_groups()
-        unused = [
-            r for r in resources
-            if r['GroupId'] not in used and 'VpcId' in r]
-        unused = set([g['GroupId'] for g in self.filter_peered_refs(unused)])
+        unused = set([g['GroupId'] for g in self.get_unused(resources)])
         return [r for r in resources if r['GroupId'] not in unused]
 
 
@@ -606,9 +689,9 @@ class Stale(Filter):
         results = []
         self.log.debug("Querying %d vpc for stale refs", len(vpc_ids))
         stale_count = 0
+        graph = get_sg_graph(self.manager, build=False)
         for vpc_id in vpc_ids:
-            stale_groups = client.describe_stale_security_groups(
-                VpcId=vpc_id).get('StaleSecurityGroupSet', ())
+            stale_groups = graph.get_stale(client, vpc_id)
 
             stale_count += len(stale_groups)
             for s in stale_groups:
@@ -772,10 +855,7 @@ class SGPermission(Filter):
             if not ip_perms:
                 return False
 
-            match_range = self.data['Cidr']
-            match_range['key'] = 'CidrIp'
-            vf = ValueFilter(match_range)
-            vf.annotate = False
+            vf = self.get_cidr_filter()
             for ip_range in ip_perms:
                 found = vf(ip_range)
                 if found:
@@ -784,6 +864,17 @@ class SGPermission(Filter):
                     found = False
         return found
 
+    def get_cidr_filter(self):
+        # Built once per filter so the configured ranges are resolved
+        # and indexed once rather than for every permission.
+        vf = getattr(self, '_cidr_filter', None)
+        if vf is None:
+            match_range = dict(self.data['Cidr'])
+            match_range['key'] = 'CidrIp'
+            vf = self._cidr_filter = ValueFilter(match_range, self.manager)
+            vf.annotate = False
+        return vf
+
     def process_self_reference(self, perm, sg_id):
         found = None
         if 'UserIdGroupPairs' in perm and 'SelfReference' in self.data:
@@ -979,10 +1070,12 @@ class NetworkInterface(query.QueryResourceManager):
         id_prefix = "eni-"
 
     def get_source(self, source_type):
-        if source_type == 'describe':
+        if source_type in ('describe', 'describe-sharded'):
             return DescribeENI(self)
         elif source_type == 'config':
             return query.ConfigSource(self)
+        elif source_type == 'config-incremental':
+            return query.IncrementalConfigSource(self)
         raise ValueError("invalid source %s" % source_type)
 
 
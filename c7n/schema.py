@@ -33,6 +33,7 @@ import logging
 
 from jsonschema import Draft4Validator as Validator
 from jsonschema.exceptions import best_match
+import six
 
 from c7n.manager import resources
 from c7n.resources import load_resources
@@ -41,7 +42,7 @@ from c7n.filters import ValueFilter, EventFilter, AgeFilter
 
 def validate(data, schema=None):
     if schema is None:
-        schema = generate()
+        schema = generate(load_policy_resources(data))
         Validator.check_schema(schema)
     validator = Validator(schema)
 
@@ -75,6 +76,28 @@ def validate(data, schema=None):
     ]))
 
 
+def load_policy_resources(data):
+    """Load the resource types referenced by policy data.
+
+    Returns the referenced types, or None if any of them are unknown in
+    which case every resource type is loaded, so a schema generated for
+    the result reports the same errors as the full schema.
+    """
+    policies = isinstance(data, dict) and data.get('policies') or ()
+    resource_types = set()
+    for p in isinstance(policies, list) and policies or ():
+        if not isinstance(p, dict) or not isinstance(
+                p.get('resource'), six.string_types):
+            return load_resources()
+        resource_types.add(p['resource'])
+    if not resource_types:
+        return load_resources()
+    load_resources(resource_types)
+    if not resource_types.issubset(resources.keys()):
+        return load_resources()
+    return resource_types
+
+
 def specific_error(error):
     """Try to find the best error for humans to resolve
 
@@ -156,12 +179,15 @@ def generate(resource_types=()):
                 'region': {'type': 'string'},
                 'resource': {'type': 'string'},
                 'max-resources': {'type': 'integer'},
+                'prune-keys': {'type': 'boolean'},
                 'comment': {'type': 'string'},
                 'comments': {'type': 'string'},
                 'description': {'type': 'string'},
                 'tags': {'type': 'array', 'items': {'type': 'string'}},
                 'mode': {'$ref': '#/definitions/policy-mode'},
-                'source': {'enum': ['describe', 'config']},
+                'source': {'enum': [
+                    'describe', 'describe-sharded', 'config',
+                    'config-incremental']},
                 'actions': {
                     'type': 'array',
                 },
@@ -0,0 +1,185 @@
+# Copyright 2017 Capital One Services, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Run scoped resource snapshot.
+
+Within a single ``custodian run`` many policies typically target the
+same resource type in the same region. Rather than have each policy
+enumerate and augment the resources again, policies are grouped by
+(resource type, region, account, source, query) and each group is
+fetched once. Every policy receives its own deep copy of the group's
+resources, so annotations and actions from one policy never leak into
+another.
+
+When constructed with the run's policies, augments for a resource type
+fetch the union of the data used by the run's policies of that type,
+see :meth:`ResourceSnapshot.get_projection`.
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import copy
+import json
+import logging
+import threading
+import time
+
+from c7n.utils import DateTimeEncoder
+
+log = logging.getLogger('custodian.snapshot')
+
+_active = None
+
+
+def active():
+    """Return the currently active run snapshot, if any."""
+    return _active
+
+
+class ResourceSnapshot(object):
+    """Shared resource enumerations for the duration of a run.
+
+    Usage::
+
+      with ResourceSnapshot(policies) as snapshot:
+          for p in policies:
+              p()
+          snapshot.report()
+    """
+
+    def __init__(self, policies=()):
+        self.groups = {}
+        self.stats = {}
+        self.scoped = {}
+        self.projections = {}
+        self.pruned = {}
+        self.managers = []
+        self._policies = set()
+        self._lock = threading.Lock()
+        self._group_locks = {}
+        self._previous = None
+        for p in policies:
+            self.add_policy(p)
+
+    def __enter__(self):
+        global _active
+        self._previous = _active
+        _active = self
+        return self
+
+    def __exit__(self, exc_type=None, exc_value=None, exc_traceback=None):
+        global _active
+        _active = self._previous
+        self._previous = None
+
+    def add_policy(self, policy):
+        """Add a policy's manager and its resource keys to the run."""
+        manager = policy.resource_manager
+        self.managers.append(manager)
+        get_projection = getattr(manager, 'get_projection', None)
+        projection = get_projection and get_projection() or None
+        self._policies.add(id(policy.data))
+        self.pruned[manager.type] = self.pruned.get(
+            manager.type, True) and bool(policy.data.get('prune-keys'))
+        if manager.type in self.projections and (
+                self.projections[manager.type] is None):
+            return
+        if projection is None:
+            self.projections[manager.type] = None
+        else:
+            self.projections[manager.type] = self.projections.get(
+                manager.type, set()).union(projection)
+
+    def get_projection(self, manager, pruned=False):
+        """Return the resource keys used by the run's policies of the type.
+
+        None, for complete resources, when any of them may use arbitrary
+        keys and for managers outside of the run's policies, ie. related
+        resource lookups. With pruned, also None unless all of them
+        enable prune-keys.
+        """
+        if id(manager.data) not in self._policies:
+            return None
+        if pruned and not self.pruned.get(manager.type):
+            return None
+        return self.projections.get(manager.type)
+
+    @staticmethod
+    def group_key(manager, query):
+        """Snapshot group key for a resource manager's query."""
+        config = manager.config
+        key = {
+            'resource': manager.type,
+            'region': config.region,
+            'account_id': getattr(config, 'account_id', None),
+            'profile': getattr(config, 'profile', None),
+            'assume_role': getattr(config, 'assume_role', None),
+            'source': manager.source_type,
+            'q': query}
+        augment_key = manager.get_augment_key()
+        if augment_key is not None:
+            key['augment'] = augment_key
+        return key
+
+    def get_scoped(self, name, factory):
+        """Return other run scoped state, created via factory on first use."""
+        with self._lock:
+            if name not in self.scoped:
+                self.scoped[name] = factory()
+            return self.scoped[name]
+
+    def _group_lock(self, k):
+        with self._lock:
+            return self._group_locks.setdefault(k, threading.Lock())
+
+    def get(self, key, fetch):
+        """Return a private copy of the resources for the group key.
+
+        The group is fetched via the ``fetch`` callable on first use,
+        concurrent requests for the same group wait on that fetch.
+        """
+        k = json.dumps(key, sort_keys=True, cls=DateTimeEncoder)
+        with self._group_lock(k):
+            if k not in self.groups:
+                t = time.time()
+                self.groups[k] = fetch()
+                self.stats[k] = {
+                    'key': key,
+                    'count': len(self.groups[k]),
+                    'fetch_time': time.time() - t,
+                    'copy_time': 0.0,
+                    'policies': 0}
+            stats = self.stats[k]
+            t = time.time()
+            resources = copy.deepcopy(self.groups[k])
+            stats['copy_time'] += time.time() - t
+            stats['policies'] += 1
+        return resources
+
+    def get_stats(self):
+        """Per group statistics, ordered by fetch time descending."""
+        return sorted(
+            self.stats.values(), key=lambda s: s['fetch_time'], reverse=True)
+
+    def report(self):
+        saved = 0.0
+        for s in self.get_stats():
+            saved += s['fetch_time'] * (s['policies'] - 1)
+            log.info(
+                "snapshot resource:%s region:%s source:%s count:%d policies:%d "
+                "fetch_time:%0.2f copy_time:%0.2f",
+                s['key']['resource'], s['key']['region'], s['key']['source'],
+                s['count'], s['policies'], s['fetch_time'], s['copy_time'])
+        if self.stats:
+            log.info(
+                "snapshot groups:%d estimated time saved:%0.2f",
+                len(self.stats), saved)
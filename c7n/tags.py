@@ -26,12 +26,19 @@ from concurrent.futures import as_completed
 from datetime import datetime, timedelta
 from dateutil.parser import parse
 from dateutil.tz import tzutc
+from botocore.exceptions import ClientError
 
-import itertools
+import functools
+import json
+import logging
+import math
+import threading
 
 from c7n.actions import BaseAction as Action, AutoTagUser
-from c7n.filters import Filter, OPERATORS, FilterValidationError
-from c7n import utils
+from c7n.filters import Filter, OPERATORS, FilterValidationError, COST_MEMORY
+from c7n import snapshot, utils
+
+log = logging.getLogger('custodian.tags')
 
 DEFAULT_TAG = "maid_status"
 
@@ -75,34 +82,285 @@ def register_universal_tags(filters, actions):
     actions.register('remove-tag', UniversalUntag)
 
 
+def universal_resource_type(model):
+    """Return the resource groups tagging api type filter for a model."""
+    resource_type = getattr(model, 'resource_type', None)
+    if not resource_type:
+        resource_type = model.service
+        if model.type:
+            resource_type += ":" + model.type
+    return resource_type
+
+
+class TagMap(object):
+    """Run scoped index of resource tags by arn, via the tagging api.
+
+    Tags are indexed per (region, account). The first lookup for a region
+    queries the tagging api once for all of the run's resource types that
+    augment tags from it (declared via ``universal_tag_augment`` on the
+    resource model), other types are queried on first use. Each type is
+    queried at most once per run, tags reflect that point in time as do
+    the resources in the run snapshot.
+
+    Indexed tags are shared between all consumers and must not be modified.
+    """
+
+    def __init__(self, managers=()):
+        self.indexes = {}
+        self.lock = threading.Lock()
+        self.key_locks = {}
+        self.pending = {}
+        self.stats = {'lookups': 0, 'queries': 0}
+        for m in managers:
+            self.add_manager(m)
+
+    @staticmethod
+    def index_key(manager):
+        config = manager.config
+        return (
+            config.region,
+            getattr(config, 'account_id', None),
+            getattr(config, 'profile', None),
+            getattr(config, 'assume_role', None))
+
+    def add_manager(self, manager):
+        """Include the manager's resource type in its region's first query."""
+        model = manager.get_model()
+        if getattr(model, 'universal_tag_augment', False):
+            self.pending.setdefault(self.index_key(manager), set()).add(
+                universal_resource_type(model))
+
+    def _get_index(self, manager):
+        k = self.index_key(manager)
+        with self.lock:
+            if k not in self.indexes:
+                self.indexes[k] = {'types': set(), 'tags': {}}
+                self.key_locks[k] = threading.Lock()
+            return k, self.indexes[k], self.key_locks[k]
+
+    def get(self, manager):
+        """Return a mapping of arn to tags for the manager's region."""
+        k, index, lock = self._get_index(manager)
+        resource_type = universal_resource_type(manager.get_model())
+        with lock:
+            self.stats['lookups'] += 1
+            if resource_type not in index['types']:
+                with self.lock:
+                    types = self.pending.pop(k, set())
+                types.add(resource_type)
+                types.difference_update(index['types'])
+                self._query_types(
+                    manager, resource_type, sorted(types), index)
+            return index['tags']
+
+    def _query_types(self, manager, resource_type, types, index):
+        """Query the types, marking those queried as indexed.
+
+        The tagging api fails the whole query if it rejects any of the
+        types, on error each type is queried on its own. Types that still
+        fail are left for their own lookup, the manager's type raises.
+        """
+        try:
+            self._query(manager, types, index['tags'])
+        except ClientError:
+            if len(types) == 1:
+                raise
+            log.warning(
+                "Tagging api query for %s failed, querying per type",
+                ", ".join(types))
+        else:
+            index['types'].update(types)
+            return
+
+        error = None
+        for t in types:
+            try:
+                self._query(manager, [t], index['tags'])
+            except ClientError as e:
+                if t == resource_type:
+                    error = e
+                else:
+                    log.warning("Tagging api query for %s failed: %s", t, e)
+                continue
+            index['types'].add(t)
+        if error is not None:
+            raise error
+
+    def _query(self, manager, types, tags):
+        client = utils.local_session(
+            manager.session_factory).client('resourcegroupstaggingapi')
+        paginator = client.get_paginator('get_resources')
+        for page in paginator.paginate(ResourceTypeFilters=types):
+            for r in page['ResourceTagMappingList']:
+                tags[r['ResourceARN']] = r['Tags']
+        self.stats['queries'] += 1
+
+
+def get_tag_map():
+    """Return the run's tag map, or a new one outside a run."""
+    active = snapshot.active()
+    if active is None:
+        return TagMap()
+    return active.get_scoped(
+        'tags', functools.partial(TagMap, active.managers))
+
+
 def universal_augment(self, resources):
     # Resource Tagging API Support
     # https://goo.gl/uccKc9
 
-    client = utils.local_session(
-        self.session_factory).client('resourcegroupstaggingapi')
-
-    paginator = client.get_paginator('get_resources')
+    projection = self.get_augment_projection(pruned=True)
+    if projection is not None and 'Tags' not in projection:
+        return resources
 
-    resource_type = getattr(self.get_model(), 'resource_type', None)
-    if not resource_type:
-        resource_type = self.get_model().service
-        if self.get_model().type:
-            resource_type += ":" + self.get_model().type
-
-    resource_tag_map_list = list(itertools.chain(
-        *[p['ResourceTagMappingList'] for p in paginator.paginate(
-            ResourceTypeFilters=[resource_type])]))
-    resource_tag_map = {r['ResourceARN']: r for r in resource_tag_map_list}
-    for r in resources:
-        arn = self.get_arns([r])[0]
-        t = resource_tag_map.get(arn)
+    tag_map = get_tag_map().get(self)
+    for r, arn in zip(resources, self.get_arns(resources)):
+        t = tag_map.get(arn)
         if t:
-            r['Tags'] = t['Tags']
+            r['Tags'] = [dict(tag) for tag in t]
 
     return resources
 
 
+class TagOperations(object):
+    """Run scoped buffer of tag api calls, coalesced across policies.
+
+    Tag, untag and mark-for-op actions in a run often apply the same tags
+    to overlapping resources of one or more types. With the run option
+    ``coalesce_tags`` set to ``on``, their api calls are buffered per
+    (region, account, service, operation, parameters) and issued once at
+    the end of the run with the largest batch the api allows. With
+    ``report``, actions execute as usual and only the savings coalescing
+    would have made are reported.
+    """
+
+    # (service, operation) -> (resource id parameter, max batch size)
+    apis = {
+        ('ec2', 'create_tags'): ('Resources', 1000),
+        ('ec2', 'delete_tags'): ('Resources', 1000),
+        ('resourcegroupstaggingapi', 'tag_resources'): ('ResourceARNList', 20),
+        ('resourcegroupstaggingapi', 'untag_resources'): (
+            'ResourceARNList', 20),
+    }
+
+    def __init__(self, mode='on'):
+        self.mode = mode
+        self.groups = {}
+        self.lock = threading.Lock()
+
+    def add(self, manager, retry, service, operation, ids, batch_size,
+            **params):
+        """Buffer an api call on ids, which the action would issue in
+        chunks of batch_size.
+        """
+        k = (TagMap.index_key(manager), service, operation,
+             json.dumps(params, sort_keys=True))
+        with self.lock:
+            if k not in self.groups:
+                self.groups[k] = {
+                    'manager': manager, 'retry': retry, 'params': params,
+                    'ids': set(), 'requested': 0, 'calls': 0}
+            group = self.groups[k]
+            group['ids'].update(ids)
+            group['requested'] += len(ids)
+            group['calls'] += int(math.ceil(len(ids) / float(batch_size)))
+
+    def flush(self, log):
+        """Issue the buffered operations, in report mode just report them."""
+        with self.lock:
+            groups, self.groups = self.groups, {}
+        self.report(groups, log)
+        if self.mode != 'on':
+            return
+        for k, group in sorted(groups.items()):
+            service, operation = k[1:3]
+            id_param, batch_size = self.apis[(service, operation)]
+            client = utils.local_session(
+                group['manager'].session_factory).client(service)
+            for id_set in utils.chunks(sorted(group['ids']), size=batch_size):
+                params = dict(group['params'])
+                params[id_param] = id_set
+                try:
+                    response = group['retry'](
+                        getattr(client, operation), **params)
+                except Exception as e:
+                    log.error(
+                        "Exception with tags: %s on resources: %s \n %s" % (
+                            group['params'], ", ".join(id_set), e))
+                    continue
+                for arn, f in (response or {}).get(
+                        'FailedResourcesMap', {}).items():
+                    log.error(
+                        "Exception with tags: %s on resource: %s "
+                        "ErrorCode:%s StatusCode:%s ErrorMessage:%s" % (
+                            group['params'], arn, f.get('ErrorCode'),
+                            f.get('StatusCode'), f.get('ErrorMessage')))
+
+    def report(self, groups, log):
+        calls = coalesced = 0
+        for k in sorted(groups):
+            group = groups[k]
+            n = int(math.ceil(
+                len(group['ids']) / float(self.apis[k[1:3]][1])))
+            calls += group['calls']
+            coalesced += n
+            log.info(
+                "tag operations service:%s operation:%s region:%s "
+                "resources:%d unique:%d calls:%d coalesced:%d",
+                k[1], k[2], k[0][0], group['requested'], len(group['ids']),
+                group['calls'], n)
+        if groups:
+            log.info(
+                "tag operations groups:%d calls:%d coalesced:%d %s:%d",
+                len(groups), calls, coalesced,
+                self.mode == 'on' and 'saved' or 'would save',
+                calls - coalesced)
+
+
+def get_tag_operations(manager):
+    """Return the run's tag operations when coalescing is enabled."""
+    mode = getattr(manager.config, 'coalesce_tags', None)
+    active = snapshot.active()
+    if mode not in ('on', 'report') or active is None:
+        return None
+    return active.get_scoped(
+        'tag-operations', functools.partial(TagOperations, mode))
+
+
+def flush_tag_operations(log):
+    """Issue the tag operations buffered by the run's policies."""
+    active = snapshot.active()
+    operations = active and active.scoped.get('tag-operations')
+    if operations is not None:
+        operations.flush(log)
+
+
+def _coalesce_tag_operation(action, base, service, operation, resources,
+                            batch_size, **params):
+    """Buffer an action's tag api call on resources for the run.
+
+    Returns True if the call was buffered and must not be made by the
+    action. Only actions using the base implementation's api call are
+    coalesced, resource specific overrides always execute directly.
+    """
+    impl = type(action).process_resource_set
+    if getattr(impl, '__func__', impl) is not getattr(base, '__func__', base):
+        return False
+    operations = get_tag_operations(action.manager)
+    if operations is None:
+        return False
+    if service == 'ec2':
+        retry = action.manager.retry
+        id_key = action.manager.get_model().id
+        ids = [r[id_key] for r in resources]
+    else:
+        retry = universal_tag_retry
+        ids = action.manager.get_arns(resources)
+    operations.add(
+        action.manager, retry, service, operation, ids, batch_size, **params)
+    return operations.mode == 'on'
+
+
 def _common_tag_processer(executor_factory, batch_size, concurrency,
                           process_resource_set, id_key, resources, tags,
                           log):
@@ -252,6 +510,8 @@ class TagActionFilter(Filter):
         op={'type': 'string'})
 
     current_date = None
+    cost = COST_MEMORY
+    resource_keys = ('Tags',)
 
     def validate(self):
         op = self.data.get('op')
@@ -264,12 +524,7 @@ class TagActionFilter(Filter):
         op = self.data.get('op', 'stop')
         skew = self.data.get('skew', 0)
 
-        v = None
-        for n in i.get('Tags', ()):
-            if n['Key'] == tag:
-                v = n['Value']
-                break
-
+        v = utils.get_tag_index(i).tags.get(tag)
         if v is None:
             return False
         if ':' not in v or '@' not in v:
@@ -314,15 +569,13 @@ class TagCountFilter(Filter):
         'tag-count',
         count={'type': 'integer', 'minimum': 0},
         op={'enum': list(OPERATORS.keys())})
+    cost = COST_MEMORY
 
     def __call__(self, i):
         count = self.data.get('count', 10)
         op_name = self.data.get('op', 'gte')
         op = OPERATORS.get(op_name)
-        tag_count = len([
-            t['Key'] for t in i.get('Tags', [])
-            if not t['Key'].startswith('aws:')])
-        return op(tag_count, count)
+        return op(utils.get_tag_index(i).count, count)
 
 
 class Tag(Action):
@@ -371,6 +624,12 @@ class Tag(Action):
 
         batch_size = self.data.get('batch_size', self.batch_size)
 
+        if _coalesce_tag_operation(
+                self, Tag.process_resource_set, 'ec2', 'create_tags',
+                resources, batch_size,
+                Tags=tags, DryRun=self.manager.config.dryrun):
+            return
+
         _common_tag_processer(
             self.executor_factory, batch_size, self.concurrency,
             self.process_resource_set, self.id_key, resources, tags, self.log)
@@ -405,6 +664,13 @@ class RemoveTag(Action):
         tags = self.data.get('tags', [DEFAULT_TAG])
         batch_size = self.data.get('batch_size', self.batch_size)
 
+        if _coalesce_tag_operation(
+                self, RemoveTag.process_resource_set, 'ec2', 'delete_tags',
+                resources, batch_size,
+                Tags=[{'Key': k for k in tags}],
+                DryRun=self.manager.config.dryrun):
+            return
+
         _common_tag_processer(
             self.executor_factory, batch_size, self.concurrency,
             self.process_resource_set, self.id_key, resources, tags, self.log)
@@ -576,6 +842,13 @@ class TagDelayedAction(Action):
 
         batch_size = self.data.get('batch_size', self.batch_size)
 
+        if _coalesce_tag_operation(
+                self, TagDelayedAction.process_resource_set,
+                'ec2', 'create_tags',
+                resources, batch_size,
+                Tags=tags, DryRun=self.manager.config.dryrun):
+            return
+
         _common_tag_processer(
             self.executor_factory, batch_size, self.concurrency,
             self.process_resource_set, self.id_key, resources, tags, self.log)
@@ -741,6 +1014,12 @@ class UniversalTag(Tag):
 
         batch_size = self.data.get('batch_size', self.batch_size)
 
+        if _coalesce_tag_operation(
+                self, UniversalTag.process_resource_set,
+                'resourcegroupstaggingapi', 'tag_resources',
+                resources, batch_size, Tags=tags):
+            return
+
         _common_tag_processer(
             self.executor_factory, batch_size, self.concurrency,
             self.process_resource_set, self.id_key, resources, tags, self.log)
@@ -773,6 +1052,18 @@ class UniversalUntag(RemoveTag):
     batch_size = 20
     permissions = ('resourcegroupstaggingapi:UntagResources',)
 
+    def process(self, resources):
+        tags = self.data.get('tags', [DEFAULT_TAG])
+        batch_size = self.data.get('batch_size', self.batch_size)
+
+        if _coalesce_tag_operation(
+                self, UniversalUntag.process_resource_set,
+                'resourcegroupstaggingapi', 'untag_resources',
+                resources, batch_size, TagKeys=tags):
+            return
+
+        return super(UniversalUntag, self).process(resources)
+
     def process_resource_set(self, resource_set, tag_keys):
         client = utils.local_session(
             self.manager.session_factory).client('resourcegroupstaggingapi')
@@ -844,6 +1135,12 @@ class UniversalTagDelayedAction(TagDelayedAction):
 
         batch_size = self.data.get('batch_size', self.batch_size)
 
+        if _coalesce_tag_operation(
+                self, UniversalTagDelayedAction.process_resource_set,
+                'resourcegroupstaggingapi', 'tag_resources',
+                resources, batch_size, Tags=tags):
+            return
+
         _common_tag_processer(
             self.executor_factory, batch_size, self.concurrency,
             self.process_resource_set, self.id_key, resources, tags, self.log)
@@ -15,6 +15,7 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 
 from botocore.exceptions import ClientError
 
+import bisect
 import boto3
 import copy
 from datetime import datetime
@@ -29,6 +30,8 @@ import time
 import ipaddress
 import six
 
+from c7n.ratelimit import limiters as rate_limiters, session_account
+
 # Try to place nice in lambda exec environment
 # where we don't require yaml
 try:
@@ -225,13 +228,18 @@ CONN_CACHE = threading.local()
 
 
 def local_session(factory):
-    """Cache a session thread local for up to 45m"""
+    """Cache a session thread local for up to 45m
+
+    Sessions share client side rate limits per account, region and
+    service, see :mod:`c7n.ratelimit`.
+    """
     s = getattr(CONN_CACHE, 'session', None)
     t = getattr(CONN_CACHE, 'time', 0)
     n = time.time()
     if s is not None and t + (60 * 45) > n:
         return s
     s = factory()
+    rate_limiters.attach(s, session_account(factory))
     CONN_CACHE.session = s
     CONN_CACHE.time = n
     return s
@@ -242,6 +250,17 @@ def reset_session_cache():
     setattr(CONN_CACHE, 'time', 0)
 
 
+def declared_resource_keys(obj):
+    """Return the resource keys declared on a filter's or action's own class.
+
+    Declarations aren't inherited, subclasses commonly read additional
+    resource data, so undeclared classes return None (unknown).
+    """
+    if 'resource_keys' not in type(obj).__dict__:
+        return None
+    return obj.resource_keys
+
+
 def annotation(i, k):
     return i.get(k, ())
 
@@ -267,6 +286,95 @@ def set_annotation(i, k, v):
         i[k] = v
 
 
+class TagIndex(object):
+    """Tag lookups for a resource.
+
+    ``tags`` maps tag keys to values, ``normalized`` maps lower cased
+    keys to values. Where a key occurs more than once the first
+    occurrence wins, matching a linear scan of the tag list.
+    """
+
+    __slots__ = ('tags', 'normalized', 'count')
+
+    def __init__(self, tags):
+        self.tags = {}
+        self.normalized = {}
+        # Number of user tags, ie. excluding aws: system tags
+        self.count = 0
+        for t in reversed(tags):
+            k, v = t.get('Key'), t.get('Value')
+            self.tags[k] = v
+            if isinstance(k, six.string_types):
+                self.normalized[k.lower()] = v
+                if not k.startswith('aws:'):
+                    self.count += 1
+
+
+def _invalidate(method):
+    def invalidating(self, *args, **kw):
+        self._index = None
+        return method(self, *args, **kw)
+    invalidating.__name__ = method.__name__
+    return invalidating
+
+
+class TagList(list):
+    """A resource's tag list carrying its lazily built :class:`TagIndex`.
+
+    Serializes as a plain list, mutating the list discards the index.
+    Modifying tag entries in place is not detected.
+    """
+
+    _index = None
+
+    append = _invalidate(list.append)
+    extend = _invalidate(list.extend)
+    insert = _invalidate(list.insert)
+    remove = _invalidate(list.remove)
+    pop = _invalidate(list.pop)
+    sort = _invalidate(list.sort)
+    reverse = _invalidate(list.reverse)
+    __setitem__ = _invalidate(list.__setitem__)
+    __delitem__ = _invalidate(list.__delitem__)
+    __iadd__ = _invalidate(list.__iadd__)
+    __imul__ = _invalidate(list.__imul__)
+    if six.PY2:
+        __setslice__ = _invalidate(list.__setslice__)
+        __delslice__ = _invalidate(list.__delslice__)
+    else:
+        clear = _invalidate(list.clear)
+
+    def __reduce__(self):
+        return (TagList, (list(self),))
+
+    def get_index(self):
+        if self._index is None:
+            self._index = TagIndex(self)
+        return self._index
+
+
+if yaml:
+    yaml.SafeDumper.add_representer(
+        TagList, yaml.representer.SafeRepresenter.represent_list)
+
+
+EMPTY_TAGS = TagIndex(())
+
+
+def get_tag_index(resource):
+    """Return the tag index for a resource, building it on first use.
+
+    The resource's tag list is swapped for an equivalent :class:`TagList`
+    so the index is built once and shared by all filters and outputs.
+    """
+    tags = resource.get('Tags')
+    if not tags:
+        return EMPTY_TAGS
+    if not isinstance(tags, TagList):
+        tags = resource['Tags'] = TagList(tags)
+    return tags.get_index()
+
+
 def parse_s3(s3_path):
     if not s3_path.startswith('s3://'):
         raise ValueError("invalid s3 path")
@@ -355,8 +463,27 @@ def backoff_delays(start, stop, factor=2.0, jitter=False):
         cur = cur * factor
 
 
+# Parsed cidrs keyed by their text, rules and configured ranges
+# tend to repeat the same handful of values across resources.
+_cidr_cache = {}
+_cidr_cache_size = 4096
+
+
 def parse_cidr(value):
     """Process cidr ranges."""
+    if not isinstance(value, six.string_types):
+        return _parse_cidr(value)
+    try:
+        return _cidr_cache[value]
+    except KeyError:
+        pass
+    if len(_cidr_cache) >= _cidr_cache_size:
+        _cidr_cache.clear()
+    v = _cidr_cache[value] = _parse_cidr(value)
+    return v
+
+
+def _parse_cidr(value):
     klass = IPv4Network
     if '/' not in value:
         klass = ipaddress.ip_address
@@ -367,6 +494,79 @@ def parse_cidr(value):
     return v
 
 
+class CidrSet(object):
+    """An index over a set of cidrs for containment and overlap queries.
+
+    Ranges are stored per ip version as sorted, non overlapping integer
+    intervals, ranges nested in another are folded into the outer one, so
+    a query is a bisect over the starts rather than a scan of the set.
+
+    Containment has the same semantics as checking each configured cidr
+    in turn, a network spanning two adjacent configured ranges is not
+    contained in either of them.
+    """
+
+    def __init__(self, cidrs=()):
+        self.invalid = []
+        self.starts = {}
+        self.ends = {}
+        intervals = {}
+        for c in cidrs:
+            n = c
+            if not isinstance(c, (ipaddress._BaseNetwork, ipaddress._BaseAddress)):
+                n = parse_cidr(c)
+            if n is None:
+                self.invalid.append(c)
+                continue
+            intervals.setdefault(n.version, []).append(self.interval(n))
+        for version, ranges in intervals.items():
+            starts = self.starts[version] = []
+            ends = self.ends[version] = []
+            for start, end in sorted(ranges):
+                if ends and start <= ends[-1]:
+                    ends[-1] = max(ends[-1], end)
+                    continue
+                starts.append(start)
+                ends.append(end)
+
+    def __len__(self):
+        return sum(map(len, self.starts.values()))
+
+    @staticmethod
+    def interval(n):
+        if isinstance(n, ipaddress._BaseNetwork):
+            return int(n.network_address), int(n.broadcast_address)
+        return int(n), int(n)
+
+    def _find(self, n, point):
+        starts = self.starts.get(n.version)
+        if not starts:
+            return None
+        idx = bisect.bisect_right(starts, point) - 1
+        if idx < 0:
+            return None
+        return idx
+
+    def __contains__(self, n):
+        if isinstance(n, six.string_types):
+            n = parse_cidr(n)
+        if not isinstance(n, (ipaddress._BaseNetwork, ipaddress._BaseAddress)):
+            return False
+        start, end = self.interval(n)
+        idx = self._find(n, start)
+        return idx is not None and self.ends[n.version][idx] >= end
+
+    def overlaps(self, n):
+        """Whether any configured range shares an address with `n`."""
+        if isinstance(n, six.string_types):
+            n = parse_cidr(n)
+        if not isinstance(n, (ipaddress._BaseNetwork, ipaddress._BaseAddress)):
+            return False
+        start, end = self.interval(n)
+        idx = self._find(n, end)
+        return idx is not None and self.ends[n.version][idx] >= start
+
+
 class IPv4Network(ipaddress.IPv4Network):
 
     # Override for net 2 net containment comparison
@@ -17,8 +17,11 @@ from unittest import TestCase
 from c7n import cache
 from argparse import Namespace
 from six.moves import cPickle as pickle
-import tempfile
 import mock
+import os
+import shutil
+import tempfile
+import time
 
 
 class TestCache(TestCase):
@@ -44,100 +47,130 @@ class TestCache(TestCase):
 
 
 class FileCacheManagerTest(TestCase):
-    def setUp(self):
-        self.test_config = Namespace(
-            cache_period=60, cache='test-cloud-custodian.cache')
-        self.test_cache = cache.FileCacheManager(self.test_config)
-        self.test_key = 'test'
-        self.bad_key = 'bad'
-        self.test_value = [1, 2, 3]
+
+    def get_cache(self, **kw):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        config = dict(
+            cache_period=60, cache=os.path.join(temp_dir, 'c7n.cache'))
+        config.update(kw)
+        return cache.FileCacheManager(Namespace(**config))
 
     def test_get_set(self):
-        t = tempfile.NamedTemporaryFile()
-        self.addCleanup(t.close)
-        c = cache.FileCacheManager(Namespace(cache_period=60, cache=t.name))
-        self.assertFalse(c.load())
+        c = self.get_cache()
+        self.assertEqual(c.get({'region': 'us-west-2'}), None)
+        self.assertTrue(c.load())
         k1 = {'region': 'us-west-2', 'resource': 'ec2'}
-        c.save(k1, range(5))
-        self.assertEqual(c.get(k1), range(5))
+        c.save(k1, list(range(5)))
+        self.assertEqual(c.get(k1), list(range(5)))
         k2 = {'region': 'eu-west-1', 'resource': 'asg'}
-        c.save(k2, range(2))
-        self.assertEqual(c.get(k1), range(5))
-        self.assertEqual(c.get(k2), range(2))
+        c.save(k2, list(range(2)))
+        self.assertEqual(c.get(k1), list(range(5)))
+        self.assertEqual(c.get(k2), list(range(2)))
+        self.assertEqual(
+            len(os.listdir(c.cache_path)), 2)
 
-        c2 = cache.FileCacheManager(Namespace(cache_period=60, cache=t.name))
+        c2 = cache.FileCacheManager(c.config)
         self.assertTrue(c2.load())
-        self.assertEqual(c2.get(k1), range(5))
-        self.assertEqual(c2.get(k2), range(2))
+        self.assertEqual(c2.data, {})
+        self.assertEqual(c2.get(k1), list(range(5)))
+        self.assertEqual(list(c2.data.keys()), [c2.get_key_path(k1)])
+        self.assertEqual(c2.get(k2), list(range(2)))
 
-    def test_get(self):
-        #mock the pick and set it to the data variable
-        test_pickle = pickle.dumps(
-            {pickle.dumps(self.test_key): self.test_value}, protocol=2)
-        self.test_cache.data = pickle.loads(test_pickle)
-
-        #assert
-        self.assertEquals(self.test_cache.get(self.test_key), self.test_value)
-        self.assertEquals(self.test_cache.get(self.bad_key), None)
+    def test_save_rewrites_single_key(self):
+        c = self.get_cache()
+        k1 = {'region': 'us-west-2', 'resource': 'ec2'}
+        k2 = {'region': 'us-west-2', 'resource': 'asg'}
+        c.save(k1, [1])
+        c.save(k2, [2])
+        mtime = os.stat(c.get_key_path(k1)).st_mtime
+        with mock.patch.object(cache.pickle, 'dump') as mock_dump:
+            c.save(k2, [3])
+            # header and value for the saved key only
+            self.assertEqual(mock_dump.call_count, 2)
+        self.assertEqual(os.stat(c.get_key_path(k1)).st_mtime, mtime)
+        self.assertEqual(
+            [n for n in os.listdir(c.cache_path) if n.startswith('.tmp')], [])
+
+    def test_account_keys(self):
+        c = self.get_cache(account_id='123')
+        c2 = cache.FileCacheManager(Namespace(
+            cache_period=60, cache=c.cache_path, account_id='456'))
+        c.save('test', [1])
+        self.assertEqual(c2.get('test'), None)
+        self.assertEqual(cache.FileCacheManager(c.config).get('test'), [1])
+
+    def test_expiration(self):
+        c = self.get_cache()
+        c.save('short', [1], ttl=-1)
+        c.save('long', [2])
+        c2 = cache.FileCacheManager(c.config)
+        self.assertEqual(c2.get('short'), None)
+        self.assertEqual(c2.get('long'), [2])
+
+        # readers with a shorter period treat older entries as expired
+        c3 = cache.FileCacheManager(Namespace(
+            cache_period=0.0001, cache=c.cache_path))
+        later = time.time() + 60
+        with mock.patch.object(cache.time, 'time') as mock_time:
+            mock_time.return_value = later
+            self.assertEqual(c3.get('long'), None)
 
     def test_load(self):
-        t = tempfile.NamedTemporaryFile(suffix='.cache')
-        load_config = Namespace(
-            cache_period=0,
-            cache=t.name,
-        )
-        load_cache = cache.FileCacheManager(load_config)
-        self.assertFalse(load_cache.load())
-        load_cache.data = {'key': 'value'}
-        self.assertTrue(load_cache.load())
+        c = self.get_cache(cache_period=0)
+        self.assertFalse(c.load())
+        c.save('test', [1])
+        self.assertFalse(os.path.exists(c.cache_path))
+
+        c = self.get_cache()
+        self.assertTrue(c.load())
+        self.assertTrue(os.path.isdir(c.cache_path))
+
+    def test_load_old_cache_file(self):
+        c = self.get_cache()
+        with open(c.cache_path, 'wb') as fh:
+            pickle.dump({'key': 'value'}, fh, protocol=2)
+        self.assertTrue(c.load())
+        self.assertTrue(os.path.isdir(c.cache_path))
+
+    def test_corrupt_entry(self):
+        c = self.get_cache()
+        c.save('test', [1])
+        with open(c.get_key_path('test'), 'wb') as fh:
+            fh.write(b'garbage')
+        self.assertEqual(cache.FileCacheManager(c.config).get('test'), None)
+        with open(c.get_key_path('test'), 'wb') as fh:
+            fh.write(b'')
+        self.assertEqual(cache.FileCacheManager(c.config).get('test'), None)
+
+    def test_evict_lru(self):
+        c = self.get_cache(cache_max_size=1)
+        blob = 'x' * (400 * 1024)
+        c.save('a', blob)
+        c.save('b', blob)
+        now = time.time()
+        os.utime(c.get_key_path('a'), (now - 100, now - 100))
+        os.utime(c.get_key_path('b'), (now - 50, now - 50))
+        # reading a marks it as recently used
+        cache.FileCacheManager(c.config).get('a')
+        c.save('c', blob)
+        self.assertTrue(os.path.exists(c.get_key_path('a')))
+        self.assertFalse(os.path.exists(c.get_key_path('b')))
+        self.assertTrue(os.path.exists(c.get_key_path('c')))
+        self.assertEqual(c.get('b'), None)
 
     @mock.patch.object(cache.os, 'makedirs')
-    @mock.patch.object(cache.os.path, 'exists')
-    @mock.patch.object(cache.pickle, 'dump')
-    @mock.patch.object(cache.pickle, 'dumps')
-    def test_save_exists(self, mock_dumps, mock_dump, mock_exists, mock_mkdir):
-        #path exists then we dont need to create the folder
-        mock_exists.return_value = True
-        #tempfile to hold the pickle
-        temp_cache_file = tempfile.NamedTemporaryFile()
-        self.test_cache.cache_path = temp_cache_file.name
-        #make the call
-        self.test_cache.save(self.test_key, self.test_value)
-
-        #assert if file already exists
-        self.assertFalse(mock_mkdir.called)
-        self.assertTrue(mock_dumps.called)
-        self.assertTrue(mock_dump.called)
-
-        #mkdir should NOT be called, but pickles should
-        self.assertEquals(mock_mkdir.call_count,0)
-        self.assertEquals(mock_dump.call_count,1)
-        self.assertEquals(mock_dumps.call_count,1)
+    def test_save_directory_error(self, mock_mkdir):
+        c = self.get_cache()
+        mock_mkdir.side_effect = OSError('Error')
+        c.save('test', [1])
+        self.assertTrue(mock_mkdir.called)
+        self.assertEqual(c.get('test'), None)
 
-    @mock.patch.object(cache.os, 'makedirs')
-    @mock.patch.object(cache.os.path, 'exists')
     @mock.patch.object(cache.pickle, 'dump')
-    @mock.patch.object(cache.pickle, 'dumps')
-    def test_save_doesnt_exists(
-            self, mock_dumps, mock_dump, mock_exists, mock_mkdir):
-        temp_cache_file = tempfile.NamedTemporaryFile()
-        self.test_cache.cache_path = temp_cache_file.name
-
-        #path doesnt exists then we will create the folder
-        #raise some sort of exception in the try
-        mock_exists.return_value = False
+    def test_save_error(self, mock_dump):
+        c = self.get_cache()
         mock_dump.side_effect = Exception('Error')
-        mock_mkdir.side_effect = Exception('Error')
-
-        #make the call
-        self.test_cache.save(self.test_key, self.test_value)
-
-        #assert if file doesnt exists
-        self.assertTrue(mock_mkdir.called)
-        self.assertTrue(mock_dumps.called)
-        self.assertTrue(mock_dump.called)
-
-        #all 3 should be called once
-        self.assertEquals(mock_mkdir.call_count, 1)
-        self.assertEquals(mock_dump.call_count, 1)
-        self.assertEquals(mock_dumps.call_count, 1)
+        c.save('test', [1])
+        self.assertEqual(os.listdir(c.cache_path), [])
+        self.assertEqual(c.get('test'), None)
@@ -16,6 +16,10 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 import json
 import os
 import sys
+import threading
+import time
+
+from collections import Counter
 
 from argparse import ArgumentTypeError
 from c7n import cli, version, commands, utils
@@ -441,6 +445,83 @@ class RunTest(CliTest):
         )
 
 
+class ParallelRunTest(CliTest):
+
+    def test_parallel_run(self):
+        session_factory = self.replay_flight_data(
+            'test_ec2_state_transition_age_filter'
+        )
+
+        from c7n.policy import PolicyCollection
+        self.patch(
+            PolicyCollection, 'session_factory',
+            staticmethod(lambda x=None: session_factory))
+
+        temp_dir = self.get_temp_dir()
+        yaml_file = self.write_policy_file({
+            'policies': [{
+                'name': 'ec2-state-transition-age-%d' % i,
+                'resource': 'ec2',
+                'filters': [
+                    {'State.Name': 'running'},
+                    {'type': 'state-age', 'days': 30},
+                ]} for i in range(3)]
+        })
+        output = self.capture_logging('custodian.commands')
+        self.run_and_expect_success(
+            [
+                'custodian', 'run',
+                '--cache', temp_dir + '/cache',
+                '--parallel', '2',
+                '-s', temp_dir,
+                yaml_file,
+            ],
+        )
+        self.assertIn('parallel run policies:3 workers:2', output.getvalue())
+        for i in range(3):
+            self.assertTrue(os.path.exists(os.path.join(
+                temp_dir, 'ec2-state-transition-age-%d' % i,
+                'resources.json')))
+
+    def test_service_concurrency(self):
+        lock = threading.Lock()
+        active = Counter()
+        peak = Counter()
+
+        class FakePolicy(object):
+
+            def __init__(self, name, service):
+                self.name = name
+                self.service = service
+                self.options = utils.Bag(region='us-east-1')
+                self.resource_manager = utils.Bag(
+                    get_model=lambda: utils.Bag(service=service))
+
+            def __call__(self):
+                with lock:
+                    active[self.service] += 1
+                    peak[self.service] = max(
+                        peak[self.service], active[self.service])
+                time.sleep(0.05)
+                with lock:
+                    active[self.service] -= 1
+                if self.name == 'bad':
+                    raise ValueError('bad')
+
+        policies = [FakePolicy('ec2-%d' % i, 'ec2') for i in range(4)]
+        policies.extend([FakePolicy('s3-%d' % i, 's3') for i in range(2)])
+        policies.append(FakePolicy('bad', 'sqs'))
+        output = self.capture_logging('custodian.commands')
+        exit_code = commands._run_parallel(
+            utils.Bag(parallel=4, service_concurrency=1, debug=False),
+            policies)
+        self.assertEqual(exit_code, 2)
+        self.assertEqual(peak, Counter({'ec2': 1, 's3': 1, 'sqs': 1}))
+        self.assertIn('Error while executing policy bad', output.getvalue())
+        self.assertIn('Traceback', output.getvalue())
+        self.assertIn("raise ValueError('bad')", output.getvalue())
+
+
 class MetricsTest(CliTest):
 
     def test_metrics(self):
@@ -73,6 +73,169 @@ class TestOrFilter(unittest.TestCase):
             [])
 
 
+class RecordingFilter(base_filters.Filter):
+
+    def __init__(self, data=None, manager=None):
+        super(RecordingFilter, self).__init__(data or {'type': 'record'}, manager)
+        self.seen = []
+
+    def process(self, resources, event=None):
+        self.seen.extend(resources)
+        return resources
+
+
+class ExpensiveFilter(RecordingFilter):
+
+    def get_cost(self):
+        return base_filters.COST_RESOURCE_API
+
+
+class TestFilterPlan(unittest.TestCase):
+
+    def test_plan_cheap_first(self):
+        metrics = filters.factory({
+            'type': 'metrics', 'name': 'CPUUtilization', 'value': 1})
+        health = filters.factory({'type': 'health-event'})
+        state = filters.factory({'State.Name': 'running'})
+        tag = filters.factory({'tag:Env': 'present'})
+        self.assertEqual(metrics.get_cost(), base_filters.COST_RESOURCE_API)
+        self.assertEqual(
+            base_filters.plan_filters([metrics, health, state, tag]),
+            [state, tag, health, metrics])
+
+    def test_plan_dependencies(self):
+        metrics = filters.factory({
+            'type': 'metrics', 'name': 'CPUUtilization', 'value': 1})
+        annotation = filters.factory({
+            'type': 'value', 'key': '"c7n.metrics"', 'value': 'present'})
+        state = filters.factory({'State.Name': 'running'})
+        self.assertEqual(
+            base_filters.plan_filters([metrics, annotation, state]),
+            [state, metrics, annotation])
+
+    def test_plan_barriers(self):
+        metrics = filters.factory({
+            'type': 'metrics', 'name': 'CPUUtilization', 'value': 1})
+        unknown = RecordingFilter()
+        count = filters.factory({
+            'type': 'value', 'value_type': 'resource_count',
+            'op': 'gt', 'value': 1})
+        state = filters.factory({'State.Name': 'running'})
+        self.assertEqual(unknown.get_cost(), None)
+        self.assertEqual(count.get_cost(), None)
+        for f in (unknown, count):
+            self.assertEqual(
+                base_filters.plan_filters([metrics, f, state]),
+                [metrics, f, state])
+
+    def test_subclass_cost_not_inherited(self):
+
+        class Fetching(base_filters.ValueFilter):
+            pass
+
+        self.assertEqual(Fetching({'key': 'x', 'value': 1}).get_cost(), None)
+
+    def test_or_annotations(self):
+        manager = Bag(get_model=lambda: Bag(id='InstanceId'))
+        f = filters.factory({
+            'or': [{'Color': 'blue'}, {'Shape': 'square'}]}, manager)
+        recorder = RecordingFilter()
+        f.filters.append(recorder)
+        resources = [
+            instance(InstanceId='i-1', Color='blue', Shape='square'),
+            instance(InstanceId='i-2', Color='green', Shape='square'),
+            instance(InstanceId='i-3', Color='red')]
+        self.assertEqual(
+            [r['InstanceId'] for r in f.process(resources)],
+            ['i-1', 'i-2', 'i-3'])
+        self.assertEqual(
+            [r['InstanceId'] for r in recorder.seen], ['i-1', 'i-2', 'i-3'])
+        self.assertEqual(
+            resources[0]['c7n:MatchedFilters'], ['Color', 'Shape'])
+
+    def test_or_skip_matched(self):
+        manager = Bag(
+            get_model=lambda: Bag(id='InstanceId'), filters=[], actions=[])
+        f = filters.factory({'or': [{'Color': 'blue'}]}, manager)
+        recorder = ExpensiveFilter()
+        f.filters.append(recorder)
+        resources = [
+            instance(InstanceId='i-1', Color='blue'),
+            instance(InstanceId='i-2', Color='green')]
+        self.assertEqual(
+            [r['InstanceId'] for r in f.process(resources)], ['i-1', 'i-2'])
+        self.assertEqual(
+            [r['InstanceId'] for r in recorder.seen], ['i-2'])
+
+    def test_or_skip_matched_annotations(self):
+        # an action without known resource keys may read the annotation
+        manager = Bag(
+            get_model=lambda: Bag(id='InstanceId'), filters=[],
+            actions=[Bag(get_resource_keys=lambda: None)])
+        f = filters.factory({'or': [{'Color': 'blue'}]}, manager)
+        recorder = ExpensiveFilter()
+        recorder.annotations = ('c7n:Expensive',)
+        f.filters.append(recorder)
+        resources = [
+            instance(InstanceId='i-1', Color='blue'),
+            instance(InstanceId='i-2', Color='green')]
+        f.process(resources)
+        self.assertEqual(
+            [r['InstanceId'] for r in recorder.seen], ['i-1', 'i-2'])
+
+
+class TestResourceKeys(unittest.TestCase):
+
+    def test_key_roots(self):
+        key_roots = base_filters.key_roots
+        self.assertEqual(key_roots('tag:Env'), ('Tags',))
+        self.assertEqual(key_roots('State.Name'), ('State',))
+        self.assertEqual(key_roots("Tags[?Key=='Env'].Value"), ('Tags',))
+        self.assertEqual(key_roots('length(Tags)'), ('Tags',))
+        self.assertEqual(
+            key_roots('Versioning.Status || Policy'), ('Policy', 'Versioning'))
+        self.assertEqual(
+            key_roots('Logging.Target == Name'), ('Logging', 'Name'))
+        self.assertEqual(
+            key_roots('[Acl, Policy][0]'), ('Acl', 'Policy'))
+        self.assertEqual(key_roots('sort_by(Tags, &Key)[0]'), ('Tags',))
+        self.assertEqual(key_roots('@'), None)
+        self.assertEqual(key_roots('"c7n.metrics"'), None)
+        self.assertEqual(key_roots('Tags[?'), None)
+
+    def test_value_filter_keys(self):
+        self.assertEqual(
+            filters.factory({'tag:Env': 'absent'}).get_resource_keys(),
+            ('Tags',))
+        self.assertEqual(
+            filters.factory({
+                'type': 'value', 'key': 'LaunchTime', 'value_type': 'expr',
+                'value': 'Placement.AvailabilityZone'}).get_resource_keys(),
+            ('LaunchTime', 'Placement'))
+        self.assertEqual(
+            filters.factory({
+                'type': 'value', 'value_type': 'resource_count',
+                'op': 'gt', 'value': 1}).get_resource_keys(),
+            ())
+
+    def test_group_keys(self):
+        f = filters.factory({'or': [
+            {'State.Name': 'running'},
+            {'not': [{'tag:Env': 'absent'}]}]})
+        self.assertEqual(f.get_resource_keys(), ('State', 'Tags'))
+        f.filters.append(RecordingFilter())
+        self.assertEqual(f.get_resource_keys(), None)
+
+    def test_subclass_keys_not_inherited(self):
+
+        class Related(base_filters.ValueFilter):
+            pass
+
+        self.assertEqual(
+            Related({'type': 'related', 'key': 'x', 'value': 1}).get_resource_keys(),
+            None)
+
+
 class TestAndFilter(unittest.TestCase):
 
     def test_and(self):
@@ -247,6 +410,27 @@ class TestRegexValue(unittest.TestCase):
                 Architecture='x86_64')),
             False)
 
+    def test_regex_compiled(self):
+        f = filters.factory(
+            {'type': 'value',
+             'key': 'tag:Name',
+             'value': 'web-.*',
+             'op': 'regex'})
+        self.assertTrue(f(instance(Tags=[{'Key': 'Name', 'Value': 'WEB-01'}])))
+        self.assertFalse(f(instance(Tags=[{'Key': 'Name', 'Value': 'db-01'}])))
+        self.assertFalse(f(instance(Tags=[{'Key': 'Name', 'Value': 42}])))
+        self.assertIsNot(f._op, base_filters.OPERATORS['regex'])
+
+        # value types which modify the value fallback to the operator
+        f = filters.factory(
+            {'type': 'value',
+             'key': 'InstanceId',
+             'value': '^i-.*',
+             'value_type': 'swap',
+             'op': 'regex'})
+        f(instance())
+        self.assertIs(f._op, base_filters.OPERATORS['regex'])
+
 
 class TestValueTypes(BaseFilterTest):
 
@@ -295,6 +479,30 @@ class TestValueTypes(BaseFilterTest):
         }
         self.assertFilter(fdata, instance(), True)
 
+    def test_cidr_list(self):
+        fdata = {
+            'type': 'value',
+            'key': 'PrivateIpAddress',
+            'value_type': 'cidr',
+            'op': 'in',
+            'value': ['10.0.0.0/8', '172.16.0.0/12']}
+
+        def i(d):
+            return instance(PrivateIpAddress=d)
+
+        self.assertFilter(fdata, i('172.31.10.5'), True)
+        self.assertFilter(fdata, i('192.168.1.1'), False)
+        self.assertFilter(fdata, i('garbage'), False)
+
+        fdata['op'] = 'not-in'
+        self.assertFilter(fdata, i('172.31.10.5'), False)
+        self.assertFilter(fdata, i('192.168.1.1'), True)
+
+        fdata['key'] = 'CidrBlock'
+        fdata['op'] = 'intersect'
+        self.assertFilter(fdata, instance(CidrBlock='172.0.0.0/8'), True)
+        self.assertFilter(fdata, instance(CidrBlock='192.168.0.0/16'), False)
+
     def test_age(self):
         now = datetime.now(tz=tz.tzutc())
         three_months = now - timedelta(90)
@@ -317,6 +525,20 @@ class TestValueTypes(BaseFilterTest):
         self.assertFilter(fdata, i(now), True)
         self.assertFilter(fdata, i(now.isoformat()), True)
 
+    def test_age_threshold_cached(self):
+        f = filters.factory({
+            'type': 'value',
+            'key': 'LaunchTime',
+            'op': 'less-than',
+            'value_type': 'age',
+            'value': 32})
+        now = datetime.now(tz=tz.tzutc())
+        self.assertTrue(f(instance(LaunchTime=now)))
+        threshold = f.get_threshold(32)
+        self.assertFalse(f(instance(LaunchTime=now - timedelta(60))))
+        self.assertIs(f.get_threshold(32), threshold)
+        self.assertEqual(list(f._thresholds), [(32, False)])
+
     def test_expiration(self):
 
         now = datetime.now(tz=tz.tzutc())
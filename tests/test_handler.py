@@ -13,6 +13,7 @@
 # limitations under the License.
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+from datetime import datetime
 import json
 import logging
 import os
@@ -77,3 +78,128 @@ class HandleTest(BaseTest):
             pass
         else:
             self.fail("should have raised an error")
+
+    def test_handler_warm_invocation(self):
+        self.run_dir = tempfile.mkdtemp()
+        cur_dir = os.path.abspath(os.getcwd())
+        os.chdir(self.run_dir)
+
+        def cleanup():
+            os.chdir(cur_dir)
+            shutil.rmtree(self.run_dir)
+
+        self.addCleanup(cleanup)
+        self.change_environment(C7N_OUTPUT_DIR=self.run_dir)
+
+        from c7n import handler
+        from c7n.policy import PolicyCollection
+
+        policy_execution = []
+        self.patch(
+            Policy, 'push',
+            lambda self, event, context: policy_execution.append(self))
+        loads = []
+        from c7n import resources
+        self.patch(
+            resources, 'load_resources', lambda *args: loads.append(True))
+        collections = []
+        from_data = PolicyCollection.from_data
+
+        def record(data, options):
+            collections.append(data)
+            return from_data(data, options)
+        self.patch(PolicyCollection, 'from_data', staticmethod(record))
+
+        def write_config(name):
+            with open(os.path.join(self.run_dir, 'config.json'), 'w') as fh:
+                json.dump(
+                    {'policies': [{'resource': 'asg', 'name': name}],
+                     'resource_modules': ['c7n.resources.asg']}, fh)
+
+        parsed = []
+        self.patch(
+            handler, 'load_policy_resources',
+            lambda config: parsed.append(config))
+
+        write_config('autoscaling')
+        for i in range(3):
+            self.assertEqual(handler.dispatch_event({'detail': {}}, None), True)
+        # the config is parsed once, policies are rebuilt per invocation
+        self.assertEqual(len(parsed), 1)
+        self.assertEqual(len(collections), 3)
+        self.assertEqual(len(set(map(id, policy_execution))), 3)
+        self.assertEqual(loads, [])
+
+        # a changed config is reloaded
+        write_config('autoscaling-2')
+        handler.dispatch_event({'detail': {}}, None)
+        self.assertEqual(len(parsed), 2)
+        self.assertEqual(policy_execution[-1].name, 'autoscaling-2')
+
+    def test_handler_warm_marked_for_op(self):
+        self.run_dir = tempfile.mkdtemp()
+        cur_dir = os.path.abspath(os.getcwd())
+        os.chdir(self.run_dir)
+
+        def cleanup():
+            os.chdir(cur_dir)
+            shutil.rmtree(self.run_dir)
+
+        self.addCleanup(cleanup)
+        self.change_environment(C7N_OUTPUT_DIR=self.run_dir)
+
+        from c7n import handler, tags
+        self.patch(handler, '_warm', {})
+
+        now = [datetime(2017, 1, 5)]
+
+        class FakeDatetime(datetime):
+
+            @classmethod
+            def now(cls, tz=None):
+                return now[0]
+
+        self.patch(tags, 'datetime', FakeDatetime)
+
+        volume = {'VolumeId': 'vol-1', 'Tags': [{
+            'Key': 'maid_status',
+            'Value': 'Resource does not meet policy: delete@2017/01/10'}]}
+        due = []
+        self.patch(
+            Policy, 'push',
+            lambda self, event, context: due.append(
+                self.resource_manager.filters[0](volume)))
+
+        with open(os.path.join(self.run_dir, 'config.json'), 'w') as fh:
+            json.dump(
+                {'policies': [{
+                    'resource': 'ebs', 'name': 'ebs-marked',
+                    'filters': [{'type': 'marked-for-op', 'op': 'delete'}]}],
+                 'resource_modules': ['c7n.resources.ebs']}, fh)
+
+        handler.dispatch_event({'detail': {}}, None)
+        now[0] = datetime(2017, 1, 11)
+        handler.dispatch_event({'detail': {}}, None)
+        self.assertEqual(due, [False, True])
+
+    def test_account_id_cached(self):
+        from c7n import handler
+        self.patch(handler, '_warm', {})
+        calls = []
+
+        def get_account_id(session):
+            calls.append(session)
+            return '644160558196'
+        self.patch(handler, 'get_account_id_from_sts', get_account_id)
+        output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output_dir)
+        self.change_environment(C7N_OUTPUT_DIR=output_dir)
+        self.assertEqual(handler.Config.empty().account_id, None)
+        self.change_environment(
+            C7N_OUTPUT_DIR=output_dir,
+            AWS_LAMBDA_FUNCTION_NAME='custodian-test')
+        self.assertEqual(handler.Config.empty().account_id, '644160558196')
+        self.assertEqual(handler.Config.empty().account_id, '644160558196')
+        self.assertEqual(
+            handler.Config.empty(account_id='123').account_id, '123')
+        self.assertEqual(len(calls), 1)
@@ -18,13 +18,14 @@ import datetime
 import os
 import tempfile
 
-from unittest import TestCase
 from .common import load_data, BaseTest, functional
 from .test_offhours import mock_datetime_now
 
 from dateutil import parser
 
-from c7n.filters.iamaccess import check_cross_account, CrossAccountAccessFilter
+from c7n.filters.iamaccess import (
+    check_cross_account, CrossAccountAccessFilter, PolicyChecker, policy_digest)
+from c7n.filters import iamaccess
 from c7n.mu import LambdaManager, LambdaFunction, PythonPackageArchive
 from c7n.resources.sns import SNS
 from c7n.resources.iam import (
@@ -719,7 +720,7 @@ class SNSCrossAccount(BaseTest):
         self.assertEqual(resources[0]['TopicArn'], arn)
 
 
-class CrossAccountChecker(TestCase):
+class CrossAccountChecker(BaseTest):
 
     def test_not_principal_allowed(self):
         policy = {
@@ -744,3 +745,56 @@ class CrossAccountChecker(TestCase):
             violations = check_cross_account(
                 p, set(['221800032964']), False, (), None)
             self.assertEqual(bool(violations), expected)
+
+    def test_policy_digest_canonical(self):
+        policy = {'Version': '2012-10-17', 'Statement': [
+            {'Effect': 'Allow', 'Principal': '*', 'Action': 'sqs:*'}]}
+        self.assertEqual(
+            policy_digest(json.dumps(policy)),
+            policy_digest(json.dumps(policy, indent=2, sort_keys=True)))
+        self.assertEqual(policy_digest(policy), policy_digest(json.dumps(policy)))
+
+    def test_checker_memoized(self):
+        checked = []
+
+        def record(policy, *args):
+            checked.append(policy)
+            return check_cross_account(policy, *args)
+
+        policies = load_data('iam/sqs-policies.json')
+        checker = PolicyChecker(set(['221800032964']))
+        expected = [bool(checker.check(p)) for p in policies]
+        self.patch(iamaccess, 'check_cross_account', record)
+        self.assertEqual(
+            [bool(checker.check(json.dumps(p, indent=2))) for p in policies],
+            expected)
+        self.assertEqual(checked, [])
+        # Differing options are evaluated separately
+        PolicyChecker(set(['221800032964']), everyone_only=True).check(
+            policies[1])
+        self.assertEqual(len(checked), 1)
+
+    def test_checker_no_mutation(self):
+        policy = {'Statement': [
+            {'Effect': 'Allow', 'Action': 'sqs:SendMessage',
+             'Principal': {'Service': 'sns.amazonaws.com', 'AWS': '*'}}]}
+        original = json.loads(json.dumps(policy))
+        violations = PolicyChecker(set(['221800032964'])).check(policy)
+        self.assertEqual(len(violations), 1)
+        self.assertEqual(policy, original)
+        violations[0]['Effect'] = 'Deny'
+        self.assertEqual(
+            PolicyChecker(set(['221800032964'])).check(policy)[0]['Effect'],
+            'Allow')
+
+    def test_checker_actions(self):
+        policy = {'Statement': [
+            {'Effect': 'Allow', 'Principal': '*',
+             'Action': ['sqs:Get*', 'sqs:Send?essage']}]}
+        accounts = set(['221800032964'])
+        self.assertTrue(PolicyChecker(
+            accounts, check_actions=['sqs:SendMessage']).check(policy))
+        self.assertTrue(PolicyChecker(
+            accounts, check_actions=['sqs:GetQueueUrl']).check(policy))
+        self.assertFalse(PolicyChecker(
+            accounts, check_actions=['sqs:DeleteQueue']).check(policy))
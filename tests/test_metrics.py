@@ -0,0 +1,212 @@
+# Copyright 2017 Capital One Services, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from argparse import Namespace
+from datetime import datetime, timedelta
+import calendar
+import os
+import shutil
+import tempfile
+
+from c7n.filters import metrics
+from c7n.snapshot import ResourceSnapshot
+
+from .common import BaseTest, Bag
+
+
+class FakeCloudWatch(object):
+    """Returns a datapoint per query, the value being the query's
+    dimension value, over two pages."""
+
+    def __init__(self):
+        self.meta = Bag(region_name='us-east-1')
+        self.calls = []
+
+    def get_metric_data(self, **kw):
+        self.calls.append(kw)
+        now = datetime.utcnow()
+        results = []
+        for q in kw['MetricDataQueries']:
+            dim = q['MetricStat']['Metric']['Dimensions'][0]['Value']
+            if 'NextToken' in kw:
+                values = [int(dim.split('-')[-1])]
+                timestamps = [now - timedelta(1)]
+            else:
+                values = [int(dim.split('-')[-1]) * 10]
+                timestamps = [now]
+            results.append({
+                'Id': q['Id'], 'Timestamps': timestamps, 'Values': values,
+                'StatusCode': 'Complete'})
+        response = {'MetricDataResults': results}
+        if 'NextToken' not in kw:
+            response['NextToken'] = 'next'
+        return response
+
+
+class HourlyCloudWatch(object):
+    """Returns an hourly datapoint per query over the requested window,
+    Sum datapoints are 2, all others are 1."""
+
+    def __init__(self):
+        self.meta = Bag(region_name='us-east-1')
+        self.calls = []
+
+    def get_metric_data(self, **kw):
+        self.calls.append(kw)
+        start = calendar.timegm(kw['StartTime'].utctimetuple())
+        end = calendar.timegm(kw['EndTime'].utctimetuple())
+        timestamps = [
+            datetime.utcfromtimestamp(t) for t in range(start, end, 3600)]
+        results = []
+        for q in kw['MetricDataQueries']:
+            value = q['MetricStat']['Stat'] == 'Sum' and 2 or 1
+            results.append({
+                'Id': q['Id'], 'Timestamps': list(reversed(timestamps)),
+                'Values': [value] * len(timestamps), 'StatusCode': 'Complete'})
+        return {'MetricDataResults': results}
+
+
+def query(value):
+    return {'Namespace': 'AWS/EC2', 'MetricName': 'CPUUtilization',
+            'Dimensions': [{'Name': 'InstanceId', 'Value': value}],
+            'Statistic': 'Average', 'Period': 86400, 'Days': 1}
+
+
+class MetricDataFetcherTest(BaseTest):
+
+    def test_batch_and_dedupe(self):
+        client = FakeCloudWatch()
+        fetcher = metrics.MetricDataFetcher()
+        fetcher.batch_size = 2
+        end = datetime.utcnow()
+        start = end - timedelta(1)
+
+        results = fetcher.get(
+            client, [query('i-1'), query('i-2'), query('i-3'), query('i-1')],
+            start, end)
+        # two batches of two pages each
+        self.assertEqual(len(client.calls), 4)
+        self.assertEqual([r[0]['Average'] for r in results], [10, 20, 30, 10])
+        self.assertEqual([len(r) for r in results], [2, 2, 2, 2])
+
+        fetcher.get(client, [query('i-2')], start, end)
+        self.assertEqual(len(client.calls), 4)
+        self.assertEqual(
+            fetcher.stats,
+            {'queries': 5, 'fetched': 3, 'requests': 4, 'cached': 0})
+
+    def test_filter_shares_run_fetcher(self):
+        client = FakeCloudWatch()
+        self.patch(
+            metrics, 'local_session', lambda factory: Bag(client=lambda s: client))
+
+        def run_policy():
+            p = self.load_policy({
+                'name': 'ec2-cpu',
+                'resource': 'ec2',
+                'filters': [{
+                    'type': 'metrics', 'name': 'CPUUtilization', 'days': 1,
+                    'value': 15, 'op': 'greater-than'}]})
+            resources = [{'InstanceId': 'i-1'}, {'InstanceId': 'i-2'}]
+            return resources, p.resource_manager.filters[0].process(resources)
+
+        with ResourceSnapshot():
+            resources, matched = run_policy()
+            self.assertEqual([r['InstanceId'] for r in matched], ['i-2'])
+            datapoint = resources[0]['c7n.metrics'][
+                'AWS/EC2.CPUUtilization.Average'][0]
+            self.assertEqual(set(datapoint), set(('Timestamp', 'Average')))
+            self.assertEqual(datapoint['Average'], 10)
+            run_policy()
+        self.assertEqual(len(client.calls), 2)
+
+
+class MetricsCacheTest(BaseTest):
+
+    def get_fetcher(self, cache_dir):
+        config = Namespace(
+            cache=cache_dir, cache_period=15, cache_max_size=10)
+        return metrics.MetricDataFetcher(metrics.MetricsCache(config))
+
+    def test_fetch_missing_tail(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        client = HourlyCloudWatch()
+        end = datetime(2017, 6, 10, 12, 30)
+        start = end - timedelta(2)
+
+        fetcher = self.get_fetcher(cache_dir)
+        results = fetcher.get(client, [query('i-1')], start, end)
+        self.assertEqual(len(client.calls), 1)
+        self.assertEqual(client.calls[0]['StartTime'], datetime(2017, 6, 8, 12))
+        self.assertEqual(
+            len(client.calls[0]['MetricDataQueries']), 2)
+        self.assertEqual(
+            [d['Average'] for d in results[0]], [2, 2])
+        self.assertEqual(
+            results[0][0]['Timestamp'].replace(tzinfo=None),
+            datetime(2017, 6, 9, 12))
+        self.assertTrue(
+            os.listdir(os.path.join(cache_dir, 'metrics')))
+
+        # A later run only fetches from the last settled datapoint
+        fetcher = self.get_fetcher(cache_dir)
+        results = fetcher.get(
+            client, [query('i-1')], start + timedelta(hours=3),
+            end + timedelta(hours=3))
+        self.assertEqual(len(client.calls), 2)
+        self.assertEqual(
+            client.calls[1]['StartTime'], datetime(2017, 6, 10, 11))
+        self.assertEqual(
+            client.calls[1]['EndTime'], datetime(2017, 6, 10, 15))
+        self.assertEqual([d['Average'] for d in results[0]], [2, 2])
+
+        # Widening the window refetches the whole window
+        fetcher = self.get_fetcher(cache_dir)
+        fetcher.get(client, [query('i-1')], start - timedelta(1), end)
+        self.assertEqual(
+            client.calls[2]['StartTime'], datetime(2017, 6, 7, 12))
+
+    def test_evict_once_per_fetch(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        fetcher = self.get_fetcher(cache_dir)
+        evictions = []
+        self.patch(fetcher.store, 'evict', lambda: evictions.append(True))
+        end = datetime(2017, 6, 10, 12, 30)
+        fetcher.get(
+            HourlyCloudWatch(), [query('i-%d' % i) for i in range(5)],
+            end - timedelta(2), end)
+        self.assertEqual(len(evictions), 1)
+        self.assertEqual(
+            len(os.listdir(os.path.join(cache_dir, 'metrics'))), 10)
+        self.assertEqual(fetcher.store.data, {})
+
+    def test_aggregate(self):
+        hour = 3600
+        points = [{0: 5, hour: 1, 2 * hour: 3}, {0: 1, hour: 1, 2 * hour: 2}]
+        aggregate = metrics.MetricDataFetcher.aggregate
+        self.assertEqual(
+            [d['Average'] for d in aggregate(
+                'Average', 2 * hour, 0, 3 * hour, points)],
+            [1.5, 3])
+        self.assertEqual(
+            [d['Maximum'] for d in aggregate(
+                'Maximum', 2 * hour, 0, 3 * hour, points[:1])],
+            [3, 5])
+        self.assertEqual(
+            [d['Sum'] for d in aggregate(
+                'Sum', 3 * hour, 0, 2 * hour, points[:1])],
+            [6])
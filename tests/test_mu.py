@@ -57,6 +57,23 @@ class PolicyLambdaProvision(BaseTest):
         self.assertEqual(result['FunctionName'], 'custodian-sg-modified')
         self.addCleanup(mgr.remove, pl)
 
+    def test_policy_lambda_archive(self):
+        p = Policy({
+            'resource': 'security-group',
+            'name': 'sg-modified',
+            'mode': {'type': 'config-rule'},
+        }, Config.empty())
+        pl = PolicyLambda(p)
+        archive = pl.get_archive()
+        self.addCleanup(archive.remove)
+        filenames = archive.get_filenames()
+        self.assertTrue('c7n/resources/vpc.py' in filenames)
+        self.assertFalse('c7n/cli.py' in filenames)
+        self.assertFalse('c7n/reports/__init__.py' in filenames)
+        with archive.get_reader() as reader:
+            config = json.loads(reader.read('config.json').decode('utf8'))
+        self.assertEqual(config['resource_modules'], ['c7n.resources.vpc'])
+
     def test_config_rule_evaluation(self):
         session_factory = self.replay_flight_data('test_config_rule_evaluate')
         p = self.load_policy({
@@ -498,6 +515,13 @@ class PythonArchiveTest(unittest.TestCase):
         filenames = self.get_filenames('c7n')
         self.assertTrue('c7n/__init__.py' in filenames)
         self.assertTrue('c7n/resources/s3.py' in filenames)
+
+    def test_excludes(self):
+        filenames = self.get_filenames(
+            'c7n', excludes=('c7n/resources', 'c7n/cli.py'))
+        self.assertTrue('c7n/__init__.py' in filenames)
+        self.assertFalse('c7n/cli.py' in filenames)
+        self.assertFalse([f for f in filenames if f.startswith('c7n/resources')])
         self.assertTrue('c7n/ufuncs/s3crypt.py' in filenames)
 
     def test_excludes_non_py_files(self):
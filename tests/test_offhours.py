@@ -464,6 +464,47 @@ class OffHoursFilterTest(BaseTest):
                                 'Value': 'on'}])
             self.assertEqual(OnHour({})(i), True)
 
+    def test_compile_schedule(self):
+        f = OffHour({})
+        value, hours, tz = f.compile_schedule(
+            'off=(m-f,19);on=(m-f,7);tz=pt;', 'off')
+        self.assertEqual(value, 'off=(m-f,19);on=(m-f,7);tz=pt')
+        self.assertEqual(hours, sum([1 << (d * 24 + 19) for d in range(5)]))
+        self.assertEqual(tz, 'pt')
+        self.assertIs(
+            f.compile_schedule('off=(m-f,19);on=(m-f,7);tz=pt;', 'off'),
+            f.compile_schedule('off=(m-f,19);on=(m-f,7);tz=pt;', 'off'))
+
+        # tz only takes the default hours
+        self.assertEqual(f.compile_schedule('tz=pt', 'off')[1:], (hours, 'pt'))
+        self.assertEqual(
+            f.compile_schedule('off=(m-f,90);tz=et', 'off'),
+            ('off=(m-f,90);tz=et', None, None))
+
+    def test_process_now_per_tz(self):
+        t = datetime.datetime(
+            year=2015, month=12, day=1, hour=19, minute=5,
+            tzinfo=zoneinfo.gettz('America/New_York'))
+        f = OffHour({})
+        instances = [
+            instance(Tags=[{'Key': 'maid_offhours', 'Value': v}])
+            for v in ('tz=et', 'tz=et', 'off=(m-f,16);tz=pt', 'tz=pt', 'tz=zz')]
+        with mock_datetime_now(t, datetime):
+            now = datetime.datetime.now
+            calls = []
+
+            def record_now(tz=None):
+                calls.append(tz)
+                return now(tz)
+
+            with mock.patch.object(
+                    datetime.datetime, 'now', staticmethod(record_now)):
+                self.assertEqual(
+                    f.process(instances), [instances[0], instances[1], instances[3]])
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(f.parse_errors, [(instances[-1]['InstanceId'], 'tz=zz')])
+        self.assertEqual(f.now, None)
+
 
 class ScheduleParserTest(BaseTest):
     # table style test
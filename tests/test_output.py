@@ -19,9 +19,12 @@ import mock
 import unittest
 import shutil
 import os
+import tempfile
+import threading
 
 from c7n.ctx import ExecutionContext
-from c7n.output import S3Output
+from c7n.executor import ThreadPoolExecutor, policy_context
+from c7n.output import S3Output, DirectoryOutput
 
 from .common import Config, Bag
 
@@ -133,3 +136,39 @@ class S3OutputTest(unittest.TestCase):
             'policies/xyz/%s/foo.txt' % output.date_path,
             extra_args={
                 'ServerSideEncryption': 'AES256'})
+
+
+class DirectoryOutputTest(unittest.TestCase):
+
+    def test_parallel_thread_isolation(self):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        policy = Bag(name="xyz")
+        output = DirectoryOutput(
+            ExecutionContext(
+                None, policy,
+                Config.empty(output_dir=temp_dir, parallel=2)))
+
+        l = logging.getLogger('custodian.dir')
+        v = l.manager.disable
+        l.manager.disable = 0
+        self.addCleanup(setattr, l.manager, 'disable', v)
+        l.setLevel(logging.INFO)
+        self.addCleanup(l.setLevel, logging.NOTSET)
+
+        with policy_context(policy):
+            output.join_log()
+            t = threading.Thread(target=l.info, args=('other policy',))
+            t.start()
+            t.join()
+            l.info('this policy')
+            # records from the policy's own thread pools are kept
+            with ThreadPoolExecutor(max_workers=1) as w:
+                w.submit(l.info, 'policy worker').result()
+            output.leave_log()
+
+        with open(os.path.join(output.root_dir, "custodian-run.log")) as fh:
+            content = fh.read()
+        self.assertIn('this policy', content)
+        self.assertIn('policy worker', content)
+        self.assertNotIn('other policy', content)
@@ -15,7 +15,10 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 
 from datetime import datetime, timedelta
 import json
+import os
 import shutil
+import subprocess
+import sys
 import tempfile
 
 from c7n import policy, manager
@@ -86,7 +89,8 @@ class PolicyPermissions(BaseTest):
             perms,
             set(('ec2:DescribeInstances',
                  'ec2:DescribeTags',
-                 'cloudwatch:GetMetricStatistics')))
+                 'cloudwatch:GetMetricStatistics',
+                 'cloudwatch:GetMetricData')))
 
     def xtest_resource_filter_name(self):
         # resources without a filter name won't play nice in
@@ -99,6 +103,25 @@ class PolicyPermissions(BaseTest):
         if missing:
             self.fail("Missing filter name %s" % (', '.join(missing)))
 
+    def test_resource_map(self):
+        # regenerate with tools/dev/genresourcemap.py
+        from c7n.resources.resource_map import ResourceMap
+        self.assertEqual(
+            ResourceMap,
+            {k: v.__module__ for k, v in manager.resources.items()
+             if v.__module__.startswith('c7n.resources.')})
+
+    def test_resource_lazy_load(self):
+        output = subprocess.check_output([
+            sys.executable, '-c',
+            'import sys; from c7n.manager import resources; '
+            'resources.get("security-group"); '
+            'print(" ".join(sorted(m for m in sys.modules '
+            'if m.startswith("c7n.resources.") and sys.modules[m])))'])
+        self.assertEqual(
+            output.decode('utf8').split(),
+            ['c7n.resources.resource_map', 'c7n.resources.vpc'])
+
     def test_resource_augment_universal_mask(self):
         # universal tag had a potential bad patterm of masking
         # resource augmentation, scan resources to ensure
@@ -500,3 +523,46 @@ class PullModeTest(BaseTest):
         self.assertIn(
             "Skipping policy {} target-region: us-east-1 current-region: us-west-2".format(policy_name),
             lines)
+
+    def test_stream(self):
+        session_factory = self.replay_flight_data('test_ec2_stream')
+        p = self.load_policy(
+            {'name': 'ec2-dev',
+             'resource': 'ec2',
+             'filters': [{'tag:Env': 'dev'}],
+             'actions': [{'type': 'tag', 'key': 'Owner', 'value': 'ops'}]},
+            config={'stream': True, 'dryrun': True},
+            session_factory=session_factory)
+        self.assertEqual(p.run(), None)
+        with open(os.path.join(p.ctx.log_dir, 'resources.json')) as fh:
+            resources = json.load(fh)
+        self.assertEqual(
+            [r['InstanceId'] for r in resources],
+            ['i-00000001', 'i-00000003'])
+
+    def test_stream_batched_actions(self):
+        session_factory = self.replay_flight_data('test_ec2_stream')
+        p = self.load_policy(
+            {'name': 'ec2-dev',
+             'resource': 'ec2',
+             'filters': [{'tag:Env': 'dev'}]},
+            config={'stream': True},
+            session_factory=session_factory)
+        batches = []
+        self.patch(
+            p.resource_manager, 'actions',
+            [Bag(name='record', process=lambda rs: batches.append(
+                [r['InstanceId'] for r in rs]))])
+        p.run()
+        self.assertEqual(batches, [['i-00000001'], ['i-00000003']])
+
+    def test_stream_max_resources(self):
+        session_factory = self.replay_flight_data('test_ec2_stream')
+        p = self.load_policy(
+            {'name': 'ec2-dev',
+             'resource': 'ec2',
+             'max-resources': 1,
+             'filters': [{'tag:Env': 'dev'}]},
+            config={'stream': True},
+            session_factory=session_factory)
+        self.assertRaises(RuntimeError, p.run)
@@ -13,13 +13,21 @@
 # limitations under the License.
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import json
 import logging
+import os
 
+import boto3
+from botocore.exceptions import ClientError
+from botocore.stub import Stubber
+
+from c7n import query
 from c7n.query import ResourceQuery
 from c7n.resources.ec2 import EC2
 from c7n.resources.vpc import InternetGateway
+from c7n.utils import get_retry
 
-from .common import BaseTest
+from .common import BaseTest, Bag
 
 
 class ResourceQueryTest(BaseTest):
@@ -79,3 +87,409 @@ class QueryResourceManagerTest(BaseTest):
         self.assertEqual(len(resources), 1)
         resources = p.resource_manager.get_resources(['igw-5bce113f'])
         self.assertEqual(resources, [])
+
+    def test_augment_detail_concurrency(self):
+        p = self.load_policy(
+            {'name': 'sqs-check', 'resource': 'sqs'})
+        chunks = []
+
+        def augment(manager, model, detail_spec, resource_set):
+            chunks.append(list(resource_set))
+            return resource_set
+
+        self.patch(query, '_scalar_augment', augment)
+        manager = p.resource_manager
+        source = query.DescribeSource(manager)
+        resources = ['q-%d' % i for i in range(40)]
+
+        self.patch(manager, 'detail_concurrency', 16)
+        self.assertEqual(source.augment(list(resources)), resources)
+        self.assertEqual(len(chunks), 14)
+        self.assertEqual(max(map(len, chunks)), 3)
+
+        chunks[:] = []
+        self.patch(manager, 'detail_concurrency', 2)
+        source.augment(list(resources))
+        self.assertEqual([len(c) for c in chunks], [20, 20])
+
+
+class ProjectionTest(BaseTest):
+
+    def test_projection(self):
+        p = self.load_policy({
+            'name': 'sns-check', 'resource': 'sns',
+            'filters': [{'tag:Env': 'absent'}, {'Owner': 'x'}]})
+        self.assertEqual(
+            p.resource_manager.get_projection(),
+            set(['Tags', 'Owner', 'TopicArn', 'DisplayName',
+                 'SubscriptionsConfirmed', 'SubscriptionsPending',
+                 'SubscriptionsDeleted']))
+        p = self.load_policy({'name': 'sns-check', 'resource': 'sns'})
+        self.assertEqual(p.resource_manager.get_projection(), None)
+        p = self.load_policy({
+            'name': 'sns-check', 'resource': 'sns',
+            'filters': [{'type': 'cross-account'}]})
+        self.assertEqual(p.resource_manager.get_projection(), None)
+
+    def test_augment_detail_skipped(self):
+        calls = []
+
+        def augment(manager, model, detail_spec, resource_set):
+            calls.append(list(resource_set))
+            return resource_set
+
+        self.patch(query, '_scalar_augment', augment)
+        data = {
+            'name': 'sns-check', 'resource': 'sns',
+            'filters': [{'TopicArn': 'arn:aws:sns:us-east-1:644160558196:a'}]}
+        resources = [{'TopicArn': 'arn:aws:sns:us-east-1:644160558196:a'}]
+        # Without prune-keys outputs hold complete resources.
+        manager = self.load_policy(data).resource_manager
+        self.assertEqual(manager.get_augment_key(), None)
+        manager.source.augment(resources)
+        self.assertEqual(len(calls), 1)
+        calls[:] = []
+
+        manager = self.load_policy(dict(data, **{'prune-keys': True})).resource_manager
+        self.patch(manager.get_model(), 'default_report_fields', ('TopicArn',))
+        self.patch(manager.get_model(), 'name', 'TopicArn')
+        self.assertEqual(manager.get_augment_key(), ['TopicArn'])
+        self.assertEqual(manager.source.augment(resources), resources)
+        self.assertEqual(calls, [])
+        # Resources lacking a used key are augmented.
+        resources.append({})
+        manager.source.augment(resources)
+        self.assertEqual(sum(map(len, calls)), 2)
+
+    def test_prune_keys(self):
+        session_factory = self.replay_flight_data('test_query_manager')
+        p = self.load_policy(
+            {'name': 'igw-check',
+             'resource': 'internet-gateway',
+             'prune-keys': True,
+             'filters': [{
+                 'InternetGatewayId': 'igw-2e65104a'}]},
+            session_factory=session_factory)
+        resources = p.run()
+        self.assertEqual(len(resources), 1)
+        self.assertEqual(
+            sorted(resources[0].keys()),
+            ['InternetGatewayId', 'c7n:MatchedFilters'])
+
+    def test_projection_multiple_roots(self):
+        p = self.load_policy(
+            {'name': 'igw-check',
+             'resource': 'internet-gateway',
+             'prune-keys': True,
+             'filters': [{
+                 'type': 'value', 'key': 'Attachments || Tags',
+                 'value': 'present'}]})
+        self.assertEqual(
+            p.resource_manager.get_projection(),
+            set(['Attachments', 'InternetGatewayId', 'Tags']))
+        self.assertEqual(
+            p.resource_manager.prune_resources([
+                {'InternetGatewayId': 'igw-1', 'Attachments': [],
+                 'Tags': [], 'OwnerId': '123'}]),
+            [{'InternetGatewayId': 'igw-1', 'Attachments': [], 'Tags': []}])
+
+
+class FakeEC2(object):
+
+    volumes = [
+        {'VolumeId': 'vol-1', 'AvailabilityZone': 'us-east-1a',
+         'Encrypted': True},
+        {'VolumeId': 'vol-2', 'AvailabilityZone': 'us-east-1b',
+         'Encrypted': False},
+        {'VolumeId': 'vol-3', 'AvailabilityZone': 'us-east-1b',
+         'Encrypted': True}]
+
+    def __init__(self):
+        self.calls = []
+
+    def can_paginate(self, op):
+        return False
+
+    def describe_availability_zones(self):
+        return {'AvailabilityZones': [
+            {'ZoneName': 'us-east-1a'}, {'ZoneName': 'us-east-1b'}]}
+
+    def describe_volumes(self, Filters=()):
+        self.calls.append(Filters)
+        results = []
+        for v in self.volumes:
+            values = {'availability-zone': v['AvailabilityZone'],
+                      'encrypted': str(v['Encrypted']).lower()}
+            if all(values[f['Name']] in f['Values'] for f in Filters):
+                results.append(v)
+        return {'Volumes': results}
+
+
+class ShardedQueryTest(BaseTest):
+
+    def get_manager(self, client):
+        self.patch(
+            query, 'local_session', lambda factory: Bag(client=lambda s: client))
+        p = self.load_policy(
+            {'name': 'ebs-sharded', 'resource': 'ebs',
+             'source': 'describe-sharded'})
+        return p.resource_manager
+
+    def test_sharded_filter(self):
+        client = FakeEC2()
+        manager = self.get_manager(client)
+        resources = manager.source.resources({})
+        self.assertEqual(
+            sorted([r['VolumeId'] for r in resources]),
+            ['vol-1', 'vol-2', 'vol-3'])
+        self.assertEqual(len(client.calls), 4)
+        self.assertIn(
+            'ec2:DescribeAvailabilityZones', manager.get_permissions())
+
+    def test_sharded_existing_filter(self):
+        client = FakeEC2()
+        manager = self.get_manager(client)
+        resources = manager.source.resources({'Filters': [
+            {'Name': 'availability-zone', 'Values': ['us-east-1b']}]})
+        self.assertEqual(
+            sorted([r['VolumeId'] for r in resources]), ['vol-2', 'vol-3'])
+        self.assertEqual(len(client.calls), 2)
+
+    def test_sharded_pages(self):
+        client = FakeEC2()
+        manager = self.get_manager(client)
+        pages = list(manager.source.iter_resources({}))
+        self.assertEqual(len(pages), 4)
+        self.assertEqual(
+            sorted([r['VolumeId'] for p in pages for r in p]),
+            ['vol-1', 'vol-2', 'vol-3'])
+
+    def test_sharded_source_override(self):
+        # Types with their own sources and no shard spec describe as usual.
+        for resource, source in (
+                ('rds', 'DescribeRDS'),
+                ('rds-snapshot', 'DescribeRDSSnapshot')):
+            p = self.load_policy(
+                {'name': 'sharded', 'resource': resource,
+                 'source': 'describe-sharded'})
+            self.assertEqual(
+                type(p.resource_manager.source).__name__, source)
+
+
+class FakeConfig(object):
+
+    def __init__(self, versions, changed=()):
+        self.versions = versions
+        self.changed = changed
+        self.fetched = []
+
+    def get_paginator(self, op):
+        ids = [{'resourceId': i} for i in sorted(self.versions)]
+        return Bag(paginate=lambda **kw: Bag(
+            build_full_result=lambda: {'resourceIdentifiers': ids}))
+
+    def get_resource_config_history(self, resourceId, **kw):
+        self.fetched.append(resourceId)
+        return {'configurationItems': [{'configuration': {
+            'instanceId': resourceId, 'version': self.versions[resourceId]}}]}
+
+
+
+class FakeSelectConfig(FakeConfig):
+
+    def select_resource_config(self, Expression):
+        return {'Results': [
+            json.dumps({'resourceId': i}) for i in self.changed]}
+
+
+class FakeBatchConfig(FakeConfig):
+
+    def __init__(self, versions, unprocessed=(), error=None):
+        super(FakeBatchConfig, self).__init__(versions)
+        self.unprocessed = unprocessed
+        self.error = error
+        self.batches = []
+
+    def batch_get_resource_config(self, resourceKeys):
+        if self.error:
+            raise ClientError({'Error': {'Code': self.error}}, 'BatchGet')
+        self.batches.append([k['resourceId'] for k in resourceKeys])
+        return {
+            'baseConfigurationItems': [
+                {'resourceId': k['resourceId'], 'configuration': json.dumps({
+                    'instanceId': k['resourceId'],
+                    'version': self.versions[k['resourceId']]})}
+                for k in resourceKeys
+                if k['resourceId'] not in self.unprocessed],
+            'unprocessedResourceKeys': [
+                k for k in resourceKeys
+                if k['resourceId'] in self.unprocessed]}
+
+
+class ConfigSourceTest(BaseTest):
+
+    def get_source(self, client):
+        self.patch(
+            query, 'local_session', lambda factory: Bag(client=lambda s: client))
+        p = self.load_policy(
+            {'name': 'ec2-config', 'resource': 'ec2', 'source': 'config'})
+        return p.resource_manager.source
+
+    def test_batch_get_resources(self):
+        ids = ['i-%03d' % i for i in range(150)]
+        client = FakeBatchConfig(
+            dict.fromkeys(ids, 1), unprocessed=('i-001',))
+        resources = self.get_source(client).get_resources(ids)
+        self.assertEqual(
+            sorted([r['InstanceId'] for r in resources]), ids)
+        self.assertEqual([len(b) for b in client.batches], [100, 50])
+        self.assertEqual(client.fetched, ['i-001'])
+
+    def test_batch_unsupported(self):
+        client = FakeBatchConfig({'i-1': 1, 'i-2': 1}, error='ValidationException')
+        source = self.get_source(client)
+        resources = source.get_resources(['i-1', 'i-2'])
+        self.assertEqual(len(resources), 2)
+        self.assertEqual(client.fetched, ['i-1', 'i-2'])
+        self.assertFalse(source.batch_get)
+
+    def test_get_resources_error(self):
+        client = FakeBatchConfig({'i-1': 1}, error='ThrottlingException')
+        source = self.get_source(client)
+        self.assertRaises(ClientError, source.get_resources, ['i-1'])
+        # Full enumeration logs and skips failed batches.
+        self.assertEqual(source.resources(), [])
+
+
+class IncrementalConfigTest(BaseTest):
+
+    def get_resources(self, client, cache_dir):
+        self.patch(
+            query, 'local_session', lambda factory: Bag(client=lambda s: client))
+        p = self.load_policy(
+            {'name': 'ec2-config', 'resource': 'ec2',
+             'source': 'config-incremental'},
+            config={'cache': cache_dir, 'cache_period': 300})
+        return [(r['InstanceId'], r['Version'])
+                for r in p.resource_manager.source.resources()]
+
+    def test_incremental_inventory(self):
+        cache_dir = os.path.join(self.get_temp_dir(), 'c7n.cache')
+        client = FakeSelectConfig({'i-1': 1, 'i-2': 1})
+        self.assertEqual(
+            self.get_resources(client, cache_dir), [('i-1', 1), ('i-2', 1)])
+        self.assertEqual(client.fetched, ['i-1', 'i-2'])
+
+        # i-2 removed, i-1 changed and i-3 added
+        client = FakeSelectConfig({'i-1': 2, 'i-3': 1}, changed=['i-1'])
+        self.assertEqual(
+            self.get_resources(client, cache_dir), [('i-1', 2), ('i-3', 1)])
+        self.assertEqual(client.fetched, ['i-1', 'i-3'])
+
+        client = FakeSelectConfig({'i-1': 3, 'i-3': 3})
+        self.assertEqual(
+            self.get_resources(client, cache_dir), [('i-1', 2), ('i-3', 1)])
+        self.assertEqual(client.fetched, [])
+
+    def test_full_refresh_without_select(self):
+        cache_dir = os.path.join(self.get_temp_dir(), 'c7n.cache')
+        self.get_resources(FakeSelectConfig({'i-1': 1}), cache_dir)
+        client = FakeConfig({'i-1': 2})
+        self.assertEqual(self.get_resources(client, cache_dir), [('i-1', 2)])
+        self.assertEqual(client.fetched, ['i-1'])
+
+
+class StreamingQueryTest(BaseTest):
+
+    def test_iter_resources(self):
+        session_factory = self.replay_flight_data('test_ec2_stream')
+        p = self.load_policy(
+            {'name': 'ec2-dev',
+             'resource': 'ec2',
+             'filters': [{'tag:Env': 'dev'}]},
+            session_factory=session_factory)
+        batches = list(p.resource_manager.iter_resources())
+        self.assertEqual(
+            [[r['InstanceId'] for r in b] for b in batches],
+            [['i-00000001'], ['i-00000003']])
+
+    def test_iter_resources_retry(self):
+        client = boto3.Session(region_name='us-east-1').client('ec2')
+        stubber = Stubber(client)
+        stubber.add_client_error(
+            'describe_instances', 'RequestLimitExceeded')
+        stubber.add_response(
+            'describe_instances',
+            {'Reservations': [{'Instances': [{'InstanceId': 'i-1'}]}],
+             'NextToken': 'page-2'})
+        stubber.add_client_error(
+            'describe_instances', 'RequestLimitExceeded')
+        stubber.add_response(
+            'describe_instances',
+            {'Reservations': [{'Instances': [{'InstanceId': 'i-2'}]}]},
+            {'NextToken': 'page-2'})
+        stubber.activate()
+        self.patch(
+            query, 'local_session', lambda factory: Bag(client=lambda s: client))
+        p = self.load_policy({'name': 'ec2-all', 'resource': 'ec2'})
+        self.patch(
+            p.resource_manager, 'retry',
+            get_retry(('RequestLimitExceeded',), min_delay=0))
+        batches = list(p.resource_manager.source.iter_resources({}))
+        self.assertEqual(
+            [[r['InstanceId'] for r in b] for b in batches],
+            [['i-1'], ['i-2']])
+        stubber.assert_no_pending_responses()
+
+    def test_iter_pages_more_results(self):
+        client = boto3.Session(region_name='us-east-1').client('s3')
+        stubber = Stubber(client)
+        stubber.add_response(
+            'list_objects',
+            {'Contents': [{'Key': 'a'}], 'IsTruncated': True},
+            {'Bucket': 'xyz'})
+        stubber.add_client_error('list_objects', 'SlowDown')
+        stubber.add_response(
+            'list_objects',
+            {'Contents': [{'Key': 'b'}], 'IsTruncated': False},
+            {'Bucket': 'xyz', 'Marker': 'a'})
+        stubber.activate()
+        pages = query.ResourceQuery(None)._iter_client_enum(
+            client, 'list_objects', {'Bucket': 'xyz'}, 'Contents[].Key',
+            get_retry(('SlowDown',), min_delay=0))
+        self.assertEqual(list(pages), [['a'], ['b']])
+        stubber.assert_no_pending_responses()
+
+    def test_iter_filter_materialize(self):
+        p = self.load_policy(
+            {'name': 'ec2-dev',
+             'resource': 'ec2',
+             'filters': [
+                 {'tag:Env': 'dev'},
+                 {'type': 'value', 'value_type': 'resource_count',
+                  'op': 'eq', 'value': 2},
+                 {'InstanceId': 'i-1'}]})
+        self.assertEqual(
+            [f.streaming for f in p.resource_manager.filters],
+            [True, False, True])
+        batches = [
+            [{'InstanceId': 'i-1', 'Tags': [{'Key': 'Env', 'Value': 'dev'}]},
+             {'InstanceId': 'i-2', 'Tags': []}],
+            [{'InstanceId': 'i-3', 'Tags': [{'Key': 'Env', 'Value': 'dev'}]}]]
+        results = list(p.resource_manager.iter_filter_resources(iter(batches)))
+        self.assertEqual(
+            [[r['InstanceId'] for r in b] for b in results], [['i-1']])
+
+    def test_boolean_streaming(self):
+        p = self.load_policy(
+            {'name': 'ec2-dev',
+             'resource': 'ec2',
+             'filters': [
+                 {'or': [{'tag:Env': 'dev'}, {'tag:Env': 'prod'}]},
+                 {'not': [{'tag:Env': 'dev'}]},
+                 {'and': [{'tag:Env': 'dev'}]},
+                 {'and': [{'type': 'value', 'value_type': 'resource_count',
+                           'op': 'eq', 'value': 2}]}]})
+        self.assertEqual(
+            [f.streaming for f in p.resource_manager.filters],
+            [False, False, True, False])
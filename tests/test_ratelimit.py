@@ -0,0 +1,90 @@
+# Copyright 2017 Capital One Services, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from botocore.exceptions import ClientError
+import mock
+
+from c7n import ratelimit, utils
+from c7n.ratelimit import RateLimiter, RateLimiters, session_account
+
+from .common import BaseTest, Bag
+
+
+class RateLimiterTest(BaseTest):
+
+    def test_unlimited(self):
+        limiter = RateLimiter(('', 'us-east-1', 'ec2'))
+        with mock.patch.object(ratelimit.time, 'sleep') as sleep:
+            for i in range(100):
+                self.assertEqual(limiter.acquire(), 0)
+            limiter.success()
+        self.assertFalse(sleep.called)
+        self.assertEqual(limiter.get_stats()['rate'], None)
+        self.assertEqual(limiter.calls, 100)
+
+    def test_aimd(self):
+        limiter = RateLimiter(('', 'us-east-1', 'ec2'))
+        limiter.recent.extend([0, 1, 2, 3, 4])
+        limiter.throttle()
+        # half the observed rate of one call per second
+        self.assertEqual(limiter.rate, 0.5)
+        with mock.patch.object(ratelimit.time, 'sleep') as sleep:
+            delay = limiter.acquire()
+        self.assertTrue(delay > 0)
+        sleep.assert_called_once_with(delay)
+        self.assertEqual(limiter.wait_time, delay)
+
+        limiter.rate = 10
+        limiter.success()
+        self.assertEqual(limiter.rate, 10.1)
+        limiter.throttle()
+        self.assertEqual(limiter.rate, 5.05)
+        self.assertEqual(limiter.throttles, 2)
+
+        limiter.rate = limiter.max_rate - 0.001
+        limiter.success()
+        self.assertEqual(limiter.rate, None)
+
+    def test_min_rate(self):
+        limiter = RateLimiter(('', 'us-east-1', 'ec2'))
+        limiter.rate = limiter.min_rate
+        limiter.throttle()
+        self.assertEqual(limiter.rate, limiter.min_rate)
+
+    def test_session_account(self):
+        self.assertEqual(
+            session_account(Bag(
+                assume_role='arn:aws:iam::644160558196:role/custodian')),
+            '644160558196')
+        self.assertEqual(
+            session_account(Bag(assume_role=None, profile='dev')), 'dev')
+        self.assertEqual(session_account(lambda: None), None)
+
+    def test_session_throttle(self):
+        limiters = RateLimiters()
+        self.patch(utils, 'rate_limiters', limiters)
+        utils.reset_session_cache()
+        self.addCleanup(utils.reset_session_cache)
+
+        factory = self.replay_flight_data('test_ratelimit_throttle')
+        client = utils.local_session(factory).client('ec2')
+        self.assertRaises(ClientError, client.describe_instances)
+        client.describe_instances()
+
+        stats = limiters.get_stats()
+        self.assertEqual(list(stats.keys()), [('', 'us-east-1', 'ec2')])
+        self.assertEqual(stats[('', 'us-east-1', 'ec2')]['throttles'], 1)
+        self.assertEqual(limiters.totals()['throttles'], 1)
+        self.assertTrue(stats[('', 'us-east-1', 'ec2')]['rate'] is not None)
@@ -0,0 +1,113 @@
+# Copyright 2017 Capital One Services, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from c7n.filters.related import RelatedResources
+from c7n.resources.vpc import SecurityGroup
+from c7n.snapshot import ResourceSnapshot
+
+from .common import BaseTest, Bag
+
+
+class FakeManager(object):
+
+    source_type = 'describe'
+
+    def __init__(self, ids):
+        self.ids = ids
+        self.config = Bag(region='us-east-1', account_id='123')
+        self.calls = []
+
+    def get_model(self):
+        return Bag(id='GroupId')
+
+    def get_resources(self, ids):
+        self.calls.append(('get', sorted(ids)))
+        return [{'GroupId': i} for i in ids if i in self.ids]
+
+    def resources(self):
+        self.calls.append(('resources',))
+        return [{'GroupId': i} for i in self.ids]
+
+
+class RelatedResourcesTest(BaseTest):
+
+    def test_get_by_id(self):
+        manager = FakeManager(['sg-1', 'sg-2', 'sg-3'])
+        related = RelatedResources()
+        self.assertEqual(
+            sorted(related.get(manager, ['sg-1', 'sg-9'], 10)),
+            ['sg-1'])
+        self.assertEqual(
+            sorted(related.get(manager, ['sg-1', 'sg-2', 'sg-9'], 10)),
+            ['sg-1', 'sg-2'])
+        self.assertEqual(
+            manager.calls, [('get', ['sg-1', 'sg-9']), ('get', ['sg-2'])])
+
+    def test_enumerate_once(self):
+        manager = FakeManager(['sg-1', 'sg-2', 'sg-3'])
+        related = RelatedResources()
+        self.assertEqual(
+            sorted(related.get(manager, ['sg-1', 'sg-2', 'sg-4'], 2)),
+            ['sg-1', 'sg-2'])
+        self.assertEqual(sorted(related.get(manager, ['sg-3'], 2)), ['sg-3'])
+        self.assertEqual(len(related.resources(manager)), 3)
+        self.assertEqual(manager.calls, [('resources',)])
+        self.assertEqual(related.stats['enumerations'], 1)
+
+    def test_filters_share_run_index(self):
+        calls = []
+
+        def get_resources(self, ids, cache=True):
+            calls.append(ids)
+            return [{'GroupId': i, 'GroupName': 'default'} for i in ids]
+
+        self.patch(SecurityGroup, 'get_resources', get_resources)
+        resources = [{'InstanceId': 'i-1', 'SecurityGroups': [
+            {'GroupId': 'sg-1'}]}]
+
+        def run_filter():
+            p = self.load_policy({
+                'name': 'ec2-default-sg',
+                'resource': 'ec2',
+                'filters': [{
+                    'type': 'security-group', 'key': 'GroupName',
+                    'value': 'default'}]})
+            return p.resource_manager.filters[0].process(resources)
+
+        with ResourceSnapshot():
+            self.assertEqual(len(run_filter()), 1)
+            self.assertEqual(len(run_filter()), 1)
+        self.assertEqual(calls, [['sg-1']])
+
+    def test_vpc_security_groups_config_source(self):
+        sources = []
+
+        def resources(self):
+            sources.append(self.source_type)
+            return [{'GroupId': 'sg-1', 'VpcId': 'vpc-1'},
+                    {'GroupId': 'sg-2', 'VpcId': 'vpc-2'}]
+
+        self.patch(SecurityGroup, 'resources', resources)
+        p = self.load_policy({
+            'name': 'vpc-sg',
+            'resource': 'vpc',
+            'source': 'config',
+            'filters': [{
+                'type': 'security-group', 'key': 'GroupName',
+                'value': 'default'}]})
+        self.assertEqual(
+            p.resource_manager.filters[0].get_related_ids([{'VpcId': 'vpc-1'}]),
+            {'sg-1'})
+        self.assertEqual(sources, ['config'])
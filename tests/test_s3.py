@@ -333,6 +333,67 @@ class BucketDelete(BaseTest):
         self.assertFalse(bname in buckets)
 
 
+class BucketAugment(BaseTest):
+
+    def get_augment_keys(self, data):
+        p = self.load_policy(dict(data, name='s3-augment', resource='s3'))
+        return sorted([
+            m[1] for m in p.resource_manager.get_augment_methods()])
+
+    def test_augment_selection(self):
+        self.assertEqual(
+            self.get_augment_keys({
+                'filters': [
+                    {'tag:Env': 'absent'},
+                    {'or': [
+                        {'type': 'missing-statement',
+                         'statement_ids': ['RequireEncryptedPutObject']},
+                        {'Name': 'foo'}]}],
+                'actions': [{'type': 'toggle-versioning'}]}),
+            ['Location', 'Policy', 'Tags', 'Versioning'])
+        self.assertEqual(
+            self.get_augment_keys({'filters': [{'Name': 'foo'}]}),
+            ['Location'])
+
+    def test_augment_complete(self):
+        complete = sorted([m[1] for m in s3.S3_AUGMENT_TABLE])
+        # Policies without filters or actions get complete buckets.
+        self.assertEqual(self.get_augment_keys({}), complete)
+        # As do those with filters or actions reading arbitrary keys.
+        self.assertEqual(
+            self.get_augment_keys({
+                'filters': [{'Name': 'foo'}],
+                'actions': [{'type': 'notify', 'to': ['x'],
+                             'transport': {'type': 'sqs', 'queue': 'x'}}]}),
+            complete)
+
+    def test_augment_key(self):
+        p = self.load_policy({
+            'name': 's3-augment', 'resource': 's3',
+            'filters': [{'tag:Env': 'absent'}]})
+        manager = p.resource_manager
+        self.assertEqual(manager.get_augment_key(), ['Location', 'Tags'])
+        self.assertEqual(
+            manager.get_cache_key(None)['augment'], ['Location', 'Tags'])
+        p = self.load_policy({'name': 's3-augment', 'resource': 's3'})
+        self.assertNotIn('augment', p.resource_manager.get_cache_key(None))
+
+    def test_assemble_selected(self):
+        self.patch(s3.S3, 'executor_factory', MainThreadExecutor)
+        calls = []
+
+        def record(item):
+            calls.append([m[1] for m in item[2]])
+            return item[1]
+
+        self.patch(s3, 'assemble_bucket', record)
+        p = self.load_policy({
+            'name': 's3-augment', 'resource': 's3',
+            'filters': [{'tag:Env': 'absent'}]})
+        p.resource_manager.source.augment([{'Name': 'a'}, {'Name': 'b'}])
+        self.assertEqual(calls, [['Location', 'Tags'], ['Location', 'Tags']])
+
+
 class BucketTag(BaseTest):
 
     def test_tag_bucket(self):
@@ -483,10 +544,10 @@ class S3ConfigSource(ConfigTest):
                     }]
                 })
 
+        # Without filters or actions buckets are fully assembled.
         p = self.load_policy({
             'name': 's3-inv',
-            'resource': 's3',
-            'filters': [{'Name': bname}]}, session_factory=session_factory)
+            'resource': 's3'}, session_factory=session_factory)
 
         manager = p.get_resource_manager()
         resource_a = manager.get_resources([bname])[0]
@@ -18,7 +18,8 @@ from json import dumps
 from jsonschema.exceptions import best_match
 
 from c7n.manager import resources
-from c7n.schema import Validator, validate, generate, specific_error
+from c7n.schema import (
+    Validator, validate, generate, specific_error, load_policy_resources)
 from .common import BaseTest
 
 
@@ -53,6 +54,32 @@ class SchemaTest(BaseTest):
         except Exception:
             self.fail("Invalid schema")
 
+    def test_load_policy_resources(self):
+        self.assertEqual(
+            load_policy_resources({'policies': [
+                {'name': 'x', 'resource': 'ec2'},
+                {'name': 'y', 'resource': 'security-group'}]}),
+            set(['ec2', 'security-group']))
+        self.assertEqual(
+            load_policy_resources({'policies': [
+                {'name': 'x', 'resource': 'ec2'},
+                {'name': 'y', 'resource': 'ec3'}]}),
+            None)
+        self.assertEqual(load_policy_resources({'policies': []}), None)
+        self.assertEqual(
+            load_policy_resources({'policies': [{'name': 'x'}]}), None)
+
+    def test_validate_partial_schema(self):
+        data = {'policies': [
+            {'name': 'x', 'resource': 'ec2',
+             'filters': [{'type': 'instance-uptime', 'days': 1}]}]}
+        self.assertEqual(validate(data), [])
+        data['policies'][0]['filters'][0]['type'] = 'instance-downtime'
+        errors = validate(data)
+        self.assertEqual(errors[1], 'x')
+        self.assertEqual(
+            errors[0].message, validate(data, generate())[0].message)
+
     def test_schema_serialization(self):
         try:
             dumps(generate())
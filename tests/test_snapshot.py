@@ -0,0 +1,117 @@
+# Copyright 2017 Capital One Services, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import logging
+
+from c7n import snapshot
+from c7n.snapshot import ResourceSnapshot
+
+from .common import BaseTest
+
+
+class ResourceSnapshotTest(BaseTest):
+
+    def test_active_scope(self):
+        self.assertEqual(snapshot.active(), None)
+        with ResourceSnapshot() as s:
+            self.assertEqual(snapshot.active(), s)
+            with ResourceSnapshot() as s2:
+                self.assertEqual(snapshot.active(), s2)
+            self.assertEqual(snapshot.active(), s)
+        self.assertEqual(snapshot.active(), None)
+
+    def test_get_copies(self):
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            return [{'Id': 'a', 'Tags': []}]
+
+        s = ResourceSnapshot()
+        r1 = s.get({'resource': 'x'}, fetch)
+        r1[0]['Tags'].append({'Key': 'Env', 'Value': 'Dev'})
+        r2 = s.get({'resource': 'x'}, fetch)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(r2, [{'Id': 'a', 'Tags': []}])
+        s.get({'resource': 'y'}, fetch)
+        self.assertEqual(len(calls), 2)
+        stats = {st['key']['resource']: st for st in s.get_stats()}
+        self.assertEqual(stats['x']['policies'], 2)
+        self.assertEqual(stats['y']['policies'], 1)
+
+    def test_policies_share_group(self):
+        session_factory = self.replay_flight_data('test_query_manager')
+        policies = [self.load_policy(
+            {'name': 'igw-%d' % i,
+             'resource': 'internet-gateway',
+             'filters': [{'InternetGatewayId': 'igw-2e65104a'}]},
+            session_factory=session_factory) for i in range(3)]
+
+        output = self.capture_logging('custodian.snapshot', level=logging.INFO)
+        with ResourceSnapshot() as s:
+            results = [p.run() for p in policies]
+            s.report()
+
+        self.assertEqual([len(r) for r in results], [1, 1, 1])
+        self.assertFalse(results[0][0] is results[1][0])
+        [stats] = s.get_stats()
+        self.assertEqual(stats['policies'], 3)
+        self.assertEqual(stats['key']['resource'], 'internet-gateway')
+        self.assertIn(
+            'snapshot resource:internet-gateway region:us-east-1 '
+            'source:describe count:1 policies:3', output.getvalue())
+
+    def test_policy_projections(self):
+        policies = [self.load_policy(
+            {'name': 'igw-%d' % i,
+             'resource': 'internet-gateway',
+             'prune-keys': True,
+             'filters': [f]}) for i, f in enumerate([
+                 {'InternetGatewayId': 'igw-2e65104a'},
+                 {'tag:Env': 'absent'}])]
+        s = ResourceSnapshot(policies)
+        for p in policies:
+            self.assertEqual(
+                s.get_projection(p.resource_manager),
+                set(['InternetGatewayId', 'Tags']))
+        # Related resource lookups get complete resources.
+        related = policies[0].resource_manager.get_resource_manager(
+            'internet-gateway')
+        self.assertEqual(s.get_projection(related), None)
+        with s:
+            self.assertEqual(
+                policies[1].resource_manager.get_augment_key(),
+                ['InternetGatewayId', 'Tags'])
+            self.assertEqual(related.get_augment_key(), None)
+
+        # Augments only omit data when every policy of the type prunes.
+        policies.append(self.load_policy(
+            {'name': 'igw-full', 'resource': 'internet-gateway',
+             'filters': [{'tag:Env': 'absent'}]}))
+        s = ResourceSnapshot(policies)
+        self.assertEqual(
+            s.get_projection(policies[0].resource_manager),
+            set(['InternetGatewayId', 'Tags']))
+        self.assertEqual(
+            s.get_projection(policies[0].resource_manager, pruned=True), None)
+        with s:
+            self.assertEqual(policies[0].resource_manager.get_augment_key(), None)
+
+        policies.append(self.load_policy(
+            {'name': 'igw-notify', 'resource': 'internet-gateway',
+             'actions': [{'type': 'notify', 'to': ['x'],
+                          'transport': {'type': 'sqs', 'queue': 'x'}}]}))
+        s = ResourceSnapshot(policies)
+        self.assertEqual(s.get_projection(policies[0].resource_manager), None)
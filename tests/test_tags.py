@@ -0,0 +1,225 @@
+# Copyright 2017 Capital One Services, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from botocore.exceptions import ClientError
+
+from c7n import tags, utils
+from c7n.snapshot import ResourceSnapshot
+
+from .common import BaseTest, Bag
+
+
+class FakeTagMap(tags.TagMap):
+
+    def __init__(self, *args, **kw):
+        super(FakeTagMap, self).__init__(*args, **kw)
+        self.queries = []
+
+    def _query(self, manager, types, index):
+        self.queries.append((manager.config.region, types))
+        for t in types:
+            index['arn:aws:%s:%s:1' % (t, manager.config.region)] = [
+                {'Key': 'Type', 'Value': t}]
+
+
+def fake_manager(service, region='us-east-1', augment=True):
+    model = Bag(service=service, type=None, universal_tag_augment=augment)
+    return Bag(
+        config=Bag(region=region, account_id='123'),
+        get_model=lambda: model)
+
+
+class TagMapTest(BaseTest):
+
+    def test_universal_resource_type(self):
+        self.assertEqual(
+            tags.universal_resource_type(Bag(service='kinesis', type='stream')),
+            'kinesis:stream')
+        self.assertEqual(
+            tags.universal_resource_type(Bag(
+                service='efs', type='file-system',
+                resource_type='elasticfilesystem:file-system')),
+            'elasticfilesystem:file-system')
+
+    def test_query_run_types_once(self):
+        kinesis = fake_manager('kinesis')
+        efs = fake_manager('efs')
+        glacier = fake_manager('glacier', augment=False)
+        west = fake_manager('kinesis', region='us-west-2')
+        tag_map = FakeTagMap([kinesis, efs, glacier, west])
+
+        self.assertIn('arn:aws:efs:us-east-1:1', tag_map.get(kinesis))
+        self.assertIn('arn:aws:kinesis:us-east-1:1', tag_map.get(efs))
+        self.assertEqual(tag_map.queries, [('us-east-1', ['efs', 'kinesis'])])
+
+        # Types outside the run's policies are queried on first use.
+        tag_map.get(glacier)
+        tag_map.get(glacier)
+        tag_map.get(west)
+        self.assertEqual(tag_map.queries, [
+            ('us-east-1', ['efs', 'kinesis']),
+            ('us-east-1', ['glacier']),
+            ('us-west-2', ['kinesis'])])
+        self.assertEqual(tag_map.stats['lookups'], 5)
+
+    def test_query_fallback_per_type(self):
+        kinesis = fake_manager('kinesis')
+        efs = fake_manager('efs')
+        glacier = fake_manager('glacier')
+
+        class PartialTagMap(FakeTagMap):
+
+            def _query(self, manager, types, index):
+                if 'glacier' in types:
+                    self.queries.append((manager.config.region, types))
+                    raise ClientError(
+                        {'Error': {'Code': 'InvalidParameterException'}},
+                        'GetResources')
+                super(PartialTagMap, self)._query(manager, types, index)
+
+        tag_map = PartialTagMap([kinesis, efs, glacier])
+        self.assertIn('arn:aws:efs:us-east-1:1', tag_map.get(kinesis))
+        self.assertEqual(tag_map.queries, [
+            ('us-east-1', ['efs', 'glacier', 'kinesis']),
+            ('us-east-1', ['efs']),
+            ('us-east-1', ['glacier']),
+            ('us-east-1', ['kinesis'])])
+
+        # the failed type isn't indexed, its own lookup raises
+        tag_map.get(efs)
+        self.assertRaises(ClientError, tag_map.get, glacier)
+        self.assertEqual(tag_map.queries[-1], ('us-east-1', ['glacier']))
+        self.assertEqual(len(tag_map.queries), 5)
+
+    def test_run_scoped(self):
+        self.assertFalse(tags.get_tag_map() is tags.get_tag_map())
+        with ResourceSnapshot():
+            self.assertTrue(tags.get_tag_map() is tags.get_tag_map())
+
+    def test_universal_augment(self):
+        p = self.load_policy({
+            'name': 'stream-tags', 'resource': 'kinesis',
+            'filters': [{'tag:Type': 'present'}]})
+        manager = p.resource_manager
+        arn = manager.generate_arn('a')
+
+        class StreamTags(tags.TagMap):
+
+            def _query(self, manager, types, index):
+                index[arn] = [{'Key': 'Type', 'Value': 'stream'}]
+
+        self.patch(tags, 'TagMap', StreamTags)
+        resources = tags.universal_augment(
+            manager, [{'StreamName': 'a'}, {'StreamName': 'b'}])
+        self.assertEqual(
+            resources,
+            [{'StreamName': 'a', 'Tags': [{'Key': 'Type', 'Value': 'stream'}]},
+             {'StreamName': 'b'}])
+
+
+class FakeTagClient(object):
+
+    def __init__(self, calls):
+        self.calls = calls
+
+    def __getattr__(self, operation):
+        def call(**params):
+            self.calls.append((operation, params))
+            return {}
+        return call
+
+
+class TagOperationsTest(BaseTest):
+
+    def setUp(self):
+        super(TagOperationsTest, self).setUp()
+        self.calls = []
+        session = Bag(client=lambda service: FakeTagClient(self.calls))
+        self.patch(utils, 'local_session', lambda factory: session)
+
+    def tag_policy(self, resource, mode='on', action=None):
+        return self.load_policy({
+            'name': '%s-tag' % resource, 'resource': resource,
+            'actions': [action or {'type': 'tag', 'key': 'Env', 'value': 'dev'}]},
+            config={'coalesce_tags': mode})
+
+    def test_coalesce_across_policies(self):
+        ec2 = self.tag_policy('ec2')
+        ebs = self.tag_policy('ebs')
+        with ResourceSnapshot() as snapshot:
+            ec2.resource_manager.actions[0].process(
+                [{'InstanceId': 'i-%d' % i} for i in range(30)])
+            ebs.resource_manager.actions[0].process(
+                [{'VolumeId': 'vol-1'}, {'VolumeId': 'vol-2'}])
+            ebs.resource_manager.actions[0].process([{'VolumeId': 'vol-1'}])
+            self.assertEqual(self.calls, [])
+            operations = snapshot.scoped['tag-operations']
+            group, = operations.groups.values()
+            self.assertEqual(group['requested'], 33)
+            self.assertEqual(group['calls'], 4)
+            tags.flush_tag_operations(ec2.log)
+        self.assertEqual(len(self.calls), 1)
+        operation, params = self.calls[0]
+        self.assertEqual(operation, 'create_tags')
+        self.assertEqual(len(params['Resources']), 32)
+        self.assertEqual(params['Tags'], [{'Key': 'Env', 'Value': 'dev'}])
+        self.assertEqual(operations.groups, {})
+
+    def test_universal_batch_size(self):
+        p = self.tag_policy('kinesis')
+        with ResourceSnapshot():
+            p.resource_manager.actions[0].process(
+                [{'StreamName': 's%d' % i} for i in range(45)])
+            tags.flush_tag_operations(p.log)
+        self.assertEqual(
+            [(op, len(params['ResourceARNList'])) for op, params in self.calls],
+            [('tag_resources', 20), ('tag_resources', 20), ('tag_resources', 5)])
+        self.assertEqual(self.calls[0][1]['Tags'], {'Env': 'dev'})
+
+    def test_report_only(self):
+        p = self.tag_policy(
+            'ebs', mode='report', action={'type': 'untag', 'tags': ['Env']})
+        with ResourceSnapshot() as snapshot:
+            p.resource_manager.actions[0].process([{'VolumeId': 'vol-1'}])
+            self.assertEqual(len(self.calls), 1)
+            self.assertEqual(
+                len(snapshot.scoped['tag-operations'].groups), 1)
+            tags.flush_tag_operations(p.log)
+        self.assertEqual(len(self.calls), 1)
+
+    def test_outside_run_or_disabled(self):
+        p = self.tag_policy('ebs')
+        p.resource_manager.actions[0].process([{'VolumeId': 'vol-1'}])
+        p = self.tag_policy('ebs', mode='off')
+        with ResourceSnapshot():
+            p.resource_manager.actions[0].process([{'VolumeId': 'vol-1'}])
+        self.assertEqual(len(self.calls), 2)
+
+    def test_override_not_coalesced(self):
+
+        class VolumeTag(tags.Tag):
+
+            def process_resource_set(self, resource_set, tags):
+                pass
+
+        p = self.tag_policy('ebs')
+        action = VolumeTag({}, p.resource_manager)
+        with ResourceSnapshot():
+            self.assertFalse(tags._coalesce_tag_operation(
+                action, tags.Tag.process_resource_set, 'ec2', 'create_tags',
+                [{'VolumeId': 'vol-1'}], 25, Tags=[]))
+            self.assertTrue(tags._coalesce_tag_operation(
+                p.resource_manager.actions[0], tags.Tag.process_resource_set,
+                'ec2', 'create_tags', [{'VolumeId': 'vol-1'}], 25, Tags=[]))
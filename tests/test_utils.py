@@ -13,6 +13,7 @@
 # limitations under the License.
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import copy
 import json
 import os
 import unittest
@@ -135,6 +136,37 @@ class UtilTest(unittest.TestCase):
         self.assertTrue(a1 in n3)
         self.assertFalse(a1 in n4)
 
+    def test_parse_cidr_cached(self):
+        self.assertIs(
+            utils.parse_cidr(u'10.0.0.0/16'), utils.parse_cidr(u'10.0.0.0/16'))
+        self.assertEqual(utils.parse_cidr(u'10.0.0.300'), None)
+        self.assertEqual(utils.parse_cidr(()), None)
+
+    def test_cidr_set(self):
+        cidrs = utils.CidrSet([
+            u'10.0.0.0/8', u'10.1.0.0/16', u'192.168.1.0/25',
+            u'192.168.1.128/25', u'172.16.0.1', u'bad', u'2001:db8::1'])
+        self.assertEqual(len(cidrs), 5)
+        self.assertEqual(cidrs.invalid, [u'bad'])
+        self.assertTrue(u'10.2.3.0/24' in cidrs)
+        self.assertTrue(u'10.2.3.4' in cidrs)
+        self.assertTrue(u'192.168.1.0/26' in cidrs)
+        self.assertTrue(u'172.16.0.1' in cidrs)
+        self.assertTrue(u'2001:db8::1' in cidrs)
+        self.assertFalse(u'2001:db8::2' in cidrs)
+        # Spans two configured ranges, neither of which contains it.
+        self.assertFalse(u'192.168.1.0/24' in cidrs)
+        self.assertFalse(u'172.16.0.0/24' in cidrs)
+        self.assertFalse(u'0.0.0.0/0' in cidrs)
+        self.assertFalse(u'11.0.0.0/8' in cidrs)
+        self.assertFalse(None in cidrs)
+
+        self.assertTrue(cidrs.overlaps(u'0.0.0.0/0'))
+        self.assertTrue(cidrs.overlaps(u'192.168.0.0/16'))
+        self.assertTrue(cidrs.overlaps(u'172.16.0.0/24'))
+        self.assertFalse(cidrs.overlaps(u'172.16.1.0/24'))
+        self.assertFalse(cidrs.overlaps(u'9.0.0.0/8'))
+
     def test_chunks(self):
         self.assertEqual(
             list(utils.chunks(range(100), size=50)),
@@ -321,3 +353,35 @@ class UtilTest(unittest.TestCase):
         json_file = os.path.join(os.path.dirname(__file__), 'data', 'ec2-instance.json')
         data = utils.load_file(json_file)
         self.assertTrue(data['InstanceId'] == 'i-1aebf7c0')
+
+
+class TagIndexTest(unittest.TestCase):
+
+    def test_tag_index(self):
+        r = {'Tags': [
+            {'Key': 'Env', 'Value': 'Dev'},
+            {'Key': 'env', 'Value': 'Prod'},
+            {'Key': 'aws:cloudformation:stack-name', 'Value': 'app'}]}
+        index = utils.get_tag_index(r)
+        self.assertEqual(index.tags['Env'], 'Dev')
+        self.assertEqual(index.normalized['env'], 'Dev')
+        self.assertEqual(index.count, 2)
+        self.assertIs(utils.get_tag_index(r), index)
+        self.assertEqual(utils.get_tag_index({}).tags, {})
+
+    def test_tag_list_serialization(self):
+        tags = [{'Key': 'Env', 'Value': 'Dev'}]
+        r = {'Tags': list(tags)}
+        utils.get_tag_index(r)
+        self.assertIsInstance(r['Tags'], utils.TagList)
+        self.assertEqual(json.loads(utils.dumps(r)), {'Tags': tags})
+        self.assertEqual(utils.yaml.safe_load(utils.yaml.safe_dump(r)), {'Tags': tags})
+        self.assertEqual(copy.deepcopy(r), {'Tags': tags})
+
+    def test_tag_list_mutation(self):
+        r = {'Tags': [{'Key': 'Env', 'Value': 'Dev'}]}
+        self.assertEqual(utils.get_tag_index(r).tags.get('Owner'), None)
+        r['Tags'].append({'Key': 'Owner', 'Value': 'kapil'})
+        self.assertEqual(utils.get_tag_index(r).tags.get('Owner'), 'kapil')
+        r['Tags'][:] = []
+        self.assertEqual(utils.get_tag_index(r).tags, {})
@@ -13,8 +13,13 @@
 # limitations under the License.
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import json
+import os
+
 from .common import BaseTest, functional
 from c7n.filters import FilterValidationError
+from c7n.resources.vpc import SecurityGroupGraph
+from c7n.snapshot import ResourceSnapshot
 
 
 class VpcTest(BaseTest):
@@ -596,6 +601,47 @@ class SecurityGroupTest(BaseTest):
         resources = p.run()
         self.assertEqual(len(resources), 1)
 
+    def test_used_unused_share_graph(self):
+        factory = self.replay_flight_data(
+            'test_security_group_used')
+        policies = [self.load_policy({
+            'name': 'sg-%s' % f,
+            'resource': 'security-group',
+            'filters': [f]}, session_factory=factory)
+            for f in ('used', 'unused')]
+        with ResourceSnapshot() as s:
+            used, unused = [p.run() for p in policies]
+            graph = list(s.scoped['sg-graph'].graphs.values())[0]
+        self.assertEqual(len(used), 3)
+        self.assertFalse(
+            set([r['GroupId'] for r in used]).intersection(
+                [r['GroupId'] for r in unused]))
+        self.assertTrue(graph.is_used('sg-f9cc4d9f'))
+        with open(os.path.join(
+                policies[1].ctx.log_dir, 'sg-graph.json')) as fh:
+            exported = json.load(fh)
+        self.assertIn('sg-f9cc4d9f', exported['groups'])
+
+    def test_graph_peered_error_not_cached(self):
+        calls = []
+
+        class Client(object):
+
+            def describe_security_group_references(self, GroupId):
+                calls.append(GroupId)
+                if len(calls) == 1:
+                    raise ValueError("throttled")
+                return {'SecurityGroupReferenceSet': [{
+                    'GroupId': 'sg-1', 'VpcPeeringConnectionId': 'pcx-1'}]}
+
+        graph = SecurityGroupGraph()
+        self.assertRaises(
+            ValueError, graph.get_peered, Client(), ['sg-1', 'sg-2'])
+        self.assertEqual(graph.peered, {})
+        self.assertEqual(
+            graph.get_peered(Client(), ['sg-1', 'sg-2']), set(['sg-1']))
+        self.assertEqual(len(calls), 2)
+
     @functional
     def test_only_ports(self):
         factory = self.replay_flight_data(
@@ -948,6 +994,40 @@ class SecurityGroupTest(BaseTest):
         manager = p.get_resource_manager()
         self.assertEqual(len(manager.filter_resources(resources)), 1)
 
+    def test_cidr_list_ingress(self):
+        p = self.load_policy({
+            'name': 'ingress-access',
+            'resource': 'security-group',
+            'filters': [
+                {'type': 'ingress',
+                 'Cidr': {
+                     'value_type': 'cidr',
+                     'op': 'not-in',
+                     'value': ['10.0.0.0/8', '192.168.0.0/16']}}
+                ]})
+
+        def group(gid, *cidrs):
+            return {
+                'GroupId': gid,
+                'IpPermissions': [{
+                    'FromPort': 443,
+                    'IpProtocol': 'tcp',
+                    'IpRanges': [{'CidrIp': c} for c in cidrs],
+                    'PrefixListIds': [],
+                    'ToPort': 443,
+                    'UserIdGroupPairs': []}],
+                'IpPermissionsEgress': []}
+
+        resources = [
+            group('sg-1', '10.1.0.0/16', '192.168.4.0/24'),
+            group('sg-2', '10.1.0.0/16', '0.0.0.0/0')]
+        manager = p.get_resource_manager()
+        matched = manager.filter_resources(resources)
+        self.assertEqual([r['GroupId'] for r in matched], ['sg-2'])
+        self.assertEqual(
+            matched[0]['MatchedIpPermissions'][0]['IpRanges'],
+            [{'CidrIp': '0.0.0.0/0'}])
+
     def test_ports_ingress(self):
         p = self.load_policy({
             'name': 'ingress-access',
@@ -22,6 +22,34 @@ from dateutil import parser
 from dateutil.tz import gettz
 
 
+class TagList(list):
+    """Resource tag list caching its key to value map.
+
+    Serializes as a plain list.
+    """
+
+    tag_map = None
+
+    def __reduce__(self):
+        return (TagList, (list(self),))
+
+
+yaml.SafeDumper.add_representer(
+    TagList, yaml.representer.SafeRepresenter.represent_list)
+
+
+def get_tag_map(resource):
+    """Return a resource's tags as a dict, built once per resource."""
+    tags = resource.get('Tags')
+    if not tags:
+        return {}
+    if not isinstance(tags, TagList):
+        tags = resource['Tags'] = TagList(tags)
+    if tags.tag_map is None:
+        tags.tag_map = {t['Key']: t['Value'] for t in tags}
+    return tags.tag_map
+
+
 def get_jinja_env():
     env = jinja2.Environment(trim_blocks=True, autoescape=False)
     env.filters['yaml_safe'] = yaml.safe_dump
@@ -68,7 +96,7 @@ def get_rendered_jinja(target, sqs_message, resources, logger):
 def get_resource_tag_targets(resource, target_tag_keys):
     if 'Tags' not in resource:
         return []
-    tags = {tag['Key']: tag['Value'] for tag in resource['Tags']}
+    tags = get_tag_map(resource)
     targets = []
     for target_tag_key in target_tag_keys:
         if target_tag_key in tags:
@@ -116,15 +144,12 @@ def format_struct(evt):
 
 
 def resource_tag(resource, k):
-    for t in resource.get('Tags', []):
-        if t['Key'] == k:
-            return t['Value']
-    return ''
+    return get_tag_map(resource).get(k, '')
 
 
 def resource_format(resource, resource_type):
     if resource_type == 'ec2':
-        tag_map = {t['Key']: t['Value'] for t in resource.get('Tags', ())}
+        tag_map = get_tag_map(resource)
         return "%s %s %s %s %s %s" % (
             resource['InstanceId'],
             resource.get('VpcId', 'NO VPC!'),
@@ -151,13 +176,13 @@ def resource_format(resource, resource_type):
             resource['DBInstanceClass'],
             resource['AllocatedStorage'])
     elif resource_type == 'asg':
-        tag_map = {t['Key']: t['Value'] for t in resource.get('Tags', ())}
+        tag_map = get_tag_map(resource)
         return "%s %s %s" % (
             resource['AutoScalingGroupName'],
             tag_map.get('Name', ''),
             "instances: %d" % (len(resource.get('Instances', []))))
     elif resource_type == 'elb':
-        tag_map = {t['Key']: t['Value'] for t in resource.get('Tags', ())}
+        tag_map = get_tag_map(resource)
         if 'ProhibitedPolicies' in resource:
             return "%s %s %s %s" % (
                 resource['LoadBalancerName'],
@@ -0,0 +1,83 @@
+# Copyright 2017 Capital One Services, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Measure custodian cli startup, one process per invocation.
+
+Compares validating a single policy file, which loads just the resource
+types it references, against importing every resource module::
+
+  python tools/dev/benchstartup.py -n 10
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+POLICY = """\
+policies:
+  - name: ec2-tag-compliance
+    resource: ec2
+    filters:
+      - "tag:Owner": absent
+"""
+
+CASES = (
+    ('import cli', ['-c', 'import c7n.cli']),
+    ('load all resources', [
+        '-c', 'from c7n.resources import load_resources; load_resources()']),
+    ('validate', ['-m', 'c7n.cli', 'validate', '{policy}']),
+    ('validate eager', [
+        '-c', 'import sys; from c7n.resources import load_resources; '
+        'load_resources(); from c7n.cli import main; '
+        'sys.argv = ["custodian", "validate", "{policy}"]; main()']),
+)
+
+
+def timed(args, count):
+    times = []
+    for i in range(count):
+        t = time.time()
+        subprocess.check_call(
+            [sys.executable] + args,
+            stdout=open(os.devnull, 'w'), stderr=subprocess.STDOUT)
+        times.append(time.time() - t)
+    times.sort()
+    return times[0], times[len(times) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument(
+        '-n', '--count', type=int, default=5, help="runs per case")
+    options = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp()
+    try:
+        policy = os.path.join(work_dir, 'policy.yml')
+        with open(policy, 'w') as fh:
+            fh.write(POLICY)
+        for name, args in CASES:
+            best, median = timed(
+                [a.format(policy=policy) for a in args], options.count)
+            print("%-20s min %0.3fs median %0.3fs" % (name, best, median))
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+# Copyright 2017 Capital One Services, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Generate c7n/resources/resource_map.py from the resource registry.
+
+Run after adding or moving a resource type::
+
+  python tools/dev/genresourcemap.py
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import io
+import os
+
+from c7n.manager import resources
+from c7n.resources import load_resources
+
+header = '''\
+# Copyright 2017 Capital One Services, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Generated by tools/dev/genresourcemap.py, do not edit.
+"""Resource type name to defining module, for loading resources lazily."""
+
+'''
+
+
+def resource_map():
+    load_resources()
+    return {name: klass.__module__ for name, klass in resources.items()
+            if klass.__module__.startswith('c7n.resources.')}
+
+
+def main():
+    lines = ["ResourceMap = {"]
+    for name, module in sorted(resource_map().items()):
+        lines.append("    %r: %r," % (str(name), str(module)))
+    lines[-1] = lines[-1].rstrip(',')
+    lines.append("}")
+    path = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(
+            os.path.abspath(__file__)))), 'c7n', 'resources', 'resource_map.py')
+    with io.open(path, 'w') as fh:
+        fh.write(header + "\n".join(lines) + "\n")
+    print("wrote %s" % path)
+
+
+if __name__ == '__main__':
+    main()